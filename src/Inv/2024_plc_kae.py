@@ -6,20 +6,16 @@ import time
 sys.path.append('../')
 
 import pandas as pd
-import chardet
 import glob
 import os
 import json
-from function.import_data import *
-from function.parseThaiDate import *
-from function.exportExcel import *
+from function.configService import get_config
+from function.parseThaiDate import convert_thai_file_to_xlsx
 
 start_time = time.time()
 
 # Load configuration
-config_path = "/Users/jinjuthatedcharoen/Documents/PPG/P'Aim/Inventory/Python/src/config.json"
-with open(config_path, 'r') as file:
-    config = json.load(file)
+config = get_config("config/config.json")  # resolved against the project root, parsed once per process
     
 # --------------------------------------------------------------------
 # 1) K.Kae PLC 2024 script: process SALE, HISMIC, ORCMII
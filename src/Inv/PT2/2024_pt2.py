@@ -8,22 +8,34 @@ sys.path.append('../../')
 
 # Standard imports
 import pandas as pd
-import chardet
 import glob
 import os
 import json
-from function.import_data import *
-from function.parseThaiDate import *
-from function.exportExcel import *
+from function.configService import get_config
+from function.import_data import load_parquet
+from function.datasetStore import read_partitions
+from function.rowDedup import dedup_columns
 
 start_time = time.time()
 
 # --------------------------------------------------------------------
 # 0 Load configuration
 # --------------------------------------------------------------------
-config_path = "../../config.json"
-with open(config_path, 'r') as file:
-    config = json.load(file)
+config = get_config("config/config.json")  # resolved against the project root, parsed once per process
+
+# Converted files are Parquet unless the converters ran in xlsx-only mode
+CONVERTED_EXT = "xlsx" if config.get("CONVERT_OUTPUT_FORMAT", "xlsx") == "xlsx" else "parquet"
+
+def drop_duplicate_rows(df, dataset):
+    # Compare only the dataset's key columns (config/dedup.json; all columns when not configured)
+    deduped = df.unique(subset=dedup_columns(dataset, df.columns), keep="first", maintain_order=True)
+    print(f"[{dataset}] dropped {df.height - deduped.height:,} duplicate rows of {df.height:,}")
+    return deduped
+
+def read_converted(file):
+    if file.endswith(".parquet"):
+        return pl.read_parquet(file)
+    return pl.read_excel(file)
 
 #%%
 # --------------------------------------------------------------------
@@ -46,10 +58,22 @@ required_inv_columns = [
     "Extended Value"
 ]
 
-# Get list of INV_VALUE Excel files
-excel_files = glob.glob(os.path.join(inv_value_pt2_folder, "*.xlsx"))
+# Read PT2 / 2024 / INV_VALUE from the partitioned combined dataset (other partitions are pruned)
+combined_store_path = "../../../../Data/Result/clean_data/Combined/combined.parquet"
 
 df_list = []
+if os.path.exists(combined_store_path):
+    store_df = read_partitions(
+        combined_store_path,
+        filters={"Year": "2024", "BU": "PT2", "DataCategory": "INV_VALUE"},
+    )
+    if not store_df.empty:
+        store_df = store_df[[col for col in required_inv_columns if col in store_df.columns] + ["Month"]]
+        store_df["End of Month"] = pd.to_numeric(store_df.pop("Month"), errors="coerce").astype("Int64")
+        df_list.append(pl.from_pandas(store_df))
+
+# Fall back to the converted files when the dataset has no PT2 partitions yet
+excel_files = [] if df_list else glob.glob(os.path.join(inv_value_pt2_folder, f"*.{CONVERTED_EXT}"))
 
 for file in excel_files:
     try:
@@ -59,7 +83,7 @@ for file in excel_files:
         month_int = time.strptime(month_str, '%b').tm_mon
 
         # Load and select required columns
-        df = pl.read_excel(file)
+        df = read_converted(file)
         df = df.select([col for col in required_inv_columns if col in df.columns])
 
         # Add [End of Month] column
@@ -98,9 +122,9 @@ required_dos_columns = [
 
 dos_item_df_list = []
 
-for file in glob.glob(os.path.join(dos_item_folder, "*.xlsx")):
+for file in glob.glob(os.path.join(dos_item_folder, f"*.{CONVERTED_EXT}")):
     try:
-        df = pl.read_excel(file)
+        df = read_converted(file)
         df = df.select([col for col in required_dos_columns if col in df.columns])
 
         # ✅ Fix: only check for null, skip string comparison
@@ -117,7 +141,7 @@ for file in glob.glob(os.path.join(dos_item_folder, "*.xlsx")):
         print(f"❌ Error reading DOS_ITEM file {file}: {e}")
 
 
-dos_item_df = pl.concat(dos_item_df_list).unique()
+dos_item_df = drop_duplicate_rows(pl.concat(dos_item_df_list), "DOS_ITEM")
 
 
 
@@ -176,18 +200,19 @@ required_other_columns = [
     "Transaction ID", "Transaction UOM", "Primary Quantity"
 ]
 
-def load_and_combine(folder, required_cols, output_parquet_path):
+def load_and_combine(folder, required_cols, output_parquet_path, dataset):
     df_list = []
-    for file in glob.glob(os.path.join(folder, "*.xlsx")):
+    for file in glob.glob(os.path.join(folder, f"*.{CONVERTED_EXT}")):
         try:
-            df = pl.read_excel(file)
+            df = read_converted(file)
             df = df.select([col for col in required_cols if col in df.columns])
-            df_list.append(df)
+            if df.width:  # ORCMII-style files have one Parquet per block; skip blocks without the columns
+                df_list.append(df)
         except Exception as e:
             print(f"❌ Error reading file {file}: {e}")
     
     # Combine and deduplicate
-    df_combined = pl.concat(df_list).unique() if df_list else pl.DataFrame()
+    df_combined = drop_duplicate_rows(pl.concat(df_list), dataset) if df_list else pl.DataFrame()
     
     # Save to parquet
     df_combined.write_parquet(output_parquet_path)
@@ -195,11 +220,11 @@ def load_and_combine(folder, required_cols, output_parquet_path):
     return df_combined
 
 # Load files
-dos_sale_df = load_and_combine(dos_sale_folder, required_dos_sale_columns, output_sale_parquet_path)
-orcmii_df = load_and_combine(orcmii_folder, required_other_columns, output_orcmii_parquet_path)
-posmis_df = load_and_combine(posmis_folder, required_other_columns, output_posmis_parquet_path)
-ssbmic_df = load_and_combine(ssbmic_folder, required_other_columns, output_ssbmic_parquet_path)
-hismic_df = load_and_combine(hismic_folder, required_other_columns, output_hismic_parquet_path)
+dos_sale_df = load_and_combine(dos_sale_folder, required_dos_sale_columns, output_sale_parquet_path, "DOS_SALE")
+orcmii_df = load_and_combine(orcmii_folder, required_other_columns, output_orcmii_parquet_path, "ORCMII")
+posmis_df = load_and_combine(posmis_folder, required_other_columns, output_posmis_parquet_path, "POSMIS")
+ssbmic_df = load_and_combine(ssbmic_folder, required_other_columns, output_ssbmic_parquet_path, "SSBMIC")
+hismic_df = load_and_combine(hismic_folder, required_other_columns, output_hismic_parquet_path, "HISMIC")
 
 # 1️⃣ Combine non-empty sources using only "Item" column
 source_dfs = [orcmii_df, posmis_df, ssbmic_df, hismic_df]
@@ -216,7 +241,7 @@ item_only_sources = [extract_item_column(df) for df in source_dfs]
 item_only_sources = [df for df in item_only_sources if df is not None]
 
 # Concatenate and drop duplicates
-combined_sources = pl.concat(item_only_sources).unique() if item_only_sources else pl.DataFrame()
+combined_sources = drop_duplicate_rows(pl.concat(item_only_sources), "ITEM_SOURCES") if item_only_sources else pl.DataFrame()
 
 # 2️⃣ Prepare comparison key: ITEM_CODE from sale, Item from sources
 dos_sale_df = dos_sale_df.with_columns([
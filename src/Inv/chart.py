@@ -7,24 +7,25 @@ sys.path.append('../')
 
 import pandas as pd
 import json
-from function.import_data import *
-from function.parseThaiDate import *
-from function.exportExcel import *
-from function.combine import *
+import matplotlib.pyplot as plt
+from function.configService import get_config
+from function.aggregateCube import refresh_cube, query_cube
+from function.datasetStore import PARTITION_COLUMNS
 
 start_time = time.time()
 
 # Load configuration
-config_path = "/Users/jinjuthatedcharoen/Documents/PPG/P'Aim/Inventory/Python/src/config.json"
-with open(config_path, 'r') as file:
-    config = json.load(file)
+config = get_config("config/config.json")  # resolved against the project root, parsed once per process
     
 
 path = "../../../Data/Result/clean_data/Combined/combined_all.parquet"
+cube_path = "../../../Data/Result/clean_data/Combined/cubes/transactions"
 
-df = load_parquet(path)
-# Group by BU and count the number of transactions for each BU
-bu_counts = df['BU'].value_counts().sort_index()
+# Transaction counts are kept in a cube; the combined file is only read, and only again when it changed
+refresh_cube(path, cube_path, dimensions=[], measures=[], patient_columns=None)
+# Count the number of transactions for each BU (set filters, e.g. {"Year": "2024"}, to narrow)
+bu_totals = query_cube(cube_path, ["BU"], measures=[], partition_cols=PARTITION_COLUMNS)
+bu_counts = bu_totals.set_index("BU")["Transactions"].sort_index()
 total = bu_counts.sum()
 
 # Create a DataFrame for the table
@@ -4,19 +4,17 @@ import time
 # Adding the parent directory to sys.path for module imports
 sys.path.append('../')
 
+import os
+import glob
 import pandas as pd
 import json
-from function.import_data import *
-from function.parseThaiDate import *
-from function.exportExcel import *
-from function.combine import *
+from function.configService import get_config
+from function.combine import combine_excel_files_to_parquet, extract_month_from_filename
 
 start_time = time.time()
 
 # Load configuration
-config_path = "/Users/jinjuthatedcharoen/Documents/PPG/P'Aim/Inventory/Python/src/config.json"
-with open(config_path, 'r') as file:
-    config = json.load(file)
+config = get_config("config/config.json")  # resolved against the project root, parsed once per process
 
 '''
     1) Combine INV_VALUE
@@ -43,12 +41,12 @@ if __name__ == "__main__":
     #                  "PLC", "PLK", "PLS", "PTN", "PTS", "PS2"]
     
     output_folder = config["combined_folder_path"]
+    # Read the converters' Parquet output directly unless they were run in xlsx-only mode
+    file_extension = "xlsx" if config.get("CONVERT_OUTPUT_FORMAT", "xlsx") == "xlsx" else "parquet"
     
-    # Specify the columns to select; change or set to None to use all columns
-    specific_columns = [
-        'SubInventory', 'SubInventory Description', 'Item', 'Item Description',
-        'Category', 'UOM', 'UOM Name', 'Quantity', 'Unit Cost', 'Extended Value'
-    ]
+    # Columns and dtypes come from the INV_VALUE entry of config/schema_registry.json;
+    # set a list here to keep only some of them
+    specific_columns = None
 
     # Process each combination of year and business unit
     combined_dfs = []
@@ -63,7 +61,7 @@ if __name__ == "__main__":
                 continue
             
             # Determine the month from one of the Excel file names in the folder (if any) and differenly by columns
-            excel_files = glob.glob(os.path.join(input_folder, "*.xlsx"))
+            excel_files = glob.glob(os.path.join(input_folder, f"*.{file_extension}"))
             if excel_files:
                 # Extract month from each file in the folder
                 month = extract_month_from_filename(os.path.basename(excel_files[0]))
@@ -75,13 +73,14 @@ if __name__ == "__main__":
             # Set a unique output filename for all selected BU (and year)
             output_filename = f"combined.parquet"
             
-            # Combine Excel files from the current folder and add extra column 'BU' and add extra column 'Month'
+            # Combine files from the current folder into the Year/BU/DataCategory/Month partitions of the dataset
             df = combine_excel_files_to_parquet(
                 input_folder,
                 output_folder,
                 output_filename=output_filename,
+                file_extension=file_extension,
                 custom_columns=specific_columns,
-                extra_columns={"BU": bu, "Month": month}
+                extra_columns={"Year": year, "BU": bu, "DataCategory": "INV_VALUE", "Month": month}
             )
             combined_dfs.append(df)
         
@@ -6,20 +6,18 @@ import time
 sys.path.append('../')
 
 import pandas as pd
-import chardet
 import glob
 import os
 import json
-from function.import_data import *
-from function.parseThaiDate import *
-from function.exportExcel import *
+from functools import partial
+from function.configService import get_config
+from function.parseThaiDate import convert_pipe_delimited_file_to_xlsx, convert_orcmii_file_to_xlsx
+from function.ingestEngine import build_ingest_tasks, run_ingest_tasks, print_ingest_summary
 
 start_time = time.time()
 
 # Load configuration
-config_path = "/Users/jinjuthatedcharoen/Documents/PPG/P'Aim/Inventory/Python/src/config.json"
-with open(config_path, 'r') as file:
-    config = json.load(file)
+config = get_config("config/config.json")  # resolved against the project root, parsed once per process
     
 if __name__ == "__main__":
     start_time = time.time()
@@ -29,23 +27,30 @@ if __name__ == "__main__":
 
     YEAR_TO_PROCESS = ["ข้อมูลคลังสินค้า 2024","ข้อมูลคลังสินค้า 2025"]   
     BU_TO_PROCESS = ["PLC"] 
+    MAX_WORKERS = config.get("INGEST_MAX_WORKERS")  # None = one worker per CPU core, 1 = run serially
+    OUTPUT_FORMAT = config.get("CONVERT_OUTPUT_FORMAT", "xlsx")  # "parquet", "xlsx" or "both"
+
+    pipe_to_output = partial(convert_pipe_delimited_file_to_xlsx, output_format=OUTPUT_FORMAT)
+    # Yearly ORCMII/HISMIC/SSBMIC/POSMIS text exports are streamed chunk by chunk when writing Parquet
+    orcmii_to_output = partial(convert_orcmii_file_to_xlsx, output_format=OUTPUT_FORMAT,
+                               streaming=config.get("ORCMII_STREAMING", False))
     
     # Define base patterns without the file extension.
     base_patterns = [
-        ("PYT_รายงานข้อมูลการรับสินค้า*", "INV_REPORT", convert_pipe_delimited_file_to_xlsx, 5),
-        ("G5_Inventory_Current_On_Hand*", "INV_ONHAND", convert_pipe_delimited_file_to_xlsx, 0),
-        ("G5_Inventory_Value_Report*", "INV_VALUE", convert_pipe_delimited_file_to_xlsx, 4),
-        ("PYT_DOS___Sale_Transaction__Ne*", "DOS_SALE", convert_pipe_delimited_file_to_xlsx, 0),
-        ("PYT_DOS___Extract_Item_Informa*", "DOS_ITEM", convert_pipe_delimited_file_to_xlsx, 0),
-        ("ORCMII JAN-DEC*", "ORCMII", convert_orcmii_file_to_xlsx, 0),
-        ("POSMIS JAN-DEC*", "POSMIS", convert_orcmii_file_to_xlsx, 0),
-        ("SSBMIC JAN-DEC*", "SSBMIC", convert_orcmii_file_to_xlsx, 0),
-        ("HISMIC JAN-DEC*", "HISMIC", convert_orcmii_file_to_xlsx, 0),
+        ("PYT_รายงานข้อมูลการรับสินค้า*", "INV_REPORT", pipe_to_output, 5),
+        ("G5_Inventory_Current_On_Hand*", "INV_ONHAND", pipe_to_output, 0),
+        ("G5_Inventory_Value_Report*", "INV_VALUE", pipe_to_output, 4),
+        ("PYT_DOS___Sale_Transaction__Ne*", "DOS_SALE", pipe_to_output, 0),
+        ("PYT_DOS___Extract_Item_Informa*", "DOS_ITEM", pipe_to_output, 0),
+        ("ORCMII JAN-DEC*", "ORCMII", orcmii_to_output, 0),
+        ("POSMIS JAN-DEC*", "POSMIS", orcmii_to_output, 0),
+        ("SSBMIC JAN-DEC*", "SSBMIC", orcmii_to_output, 0),
+        ("HISMIC JAN-DEC*", "HISMIC", orcmii_to_output, 0),
         
-        ("ORCMII*", "ORCMII", convert_orcmii_file_to_xlsx, 0),
-        ("POSMIS*", "POSMIS", convert_orcmii_file_to_xlsx, 0),
-        ("SSBMIC*", "SSBMIC", convert_orcmii_file_to_xlsx, 0),
-        ("HISMIC*", "HISMIC", convert_orcmii_file_to_xlsx, 0)
+        ("ORCMII*", "ORCMII", orcmii_to_output, 0),
+        ("POSMIS*", "POSMIS", orcmii_to_output, 0),
+        ("SSBMIC*", "SSBMIC", orcmii_to_output, 0),
+        ("HISMIC*", "HISMIC", orcmii_to_output, 0)
     ]
 
     # Specify the file extensions that want to support.
@@ -57,33 +62,18 @@ if __name__ == "__main__":
         for ext in extensions:
             patterns_and_outputs.append((base_pattern + ext, category, func, skip))
 
-    for year_folder in sorted(os.listdir(data_root)):
-        if YEAR_TO_PROCESS and year_folder not in YEAR_TO_PROCESS:
-            continue
-    
-        year_path = os.path.join(data_root, year_folder)
-        if not os.path.isdir(year_path):
-            continue
-
-        year = year_folder.split()[-1]
-
-        for bu in sorted(os.listdir(year_path)):
-            # Skip all except the ones you specified
-            if BU_TO_PROCESS and bu not in BU_TO_PROCESS:
-                continue
-    
-            bu_path = os.path.join(year_path, bu)
-            if not os.path.isdir(bu_path):
-                continue
-
-            for pattern, category, func, skip in patterns_and_outputs:
-                output_folder = os.path.join(result_root, year, bu, category)
-                os.makedirs(output_folder, exist_ok=True)
+    tasks = build_ingest_tasks(data_root, result_root, patterns_and_outputs,
+                               years_to_process=YEAR_TO_PROCESS, bus_to_process=BU_TO_PROCESS)
+    print(f"Scheduling {len(tasks)} files on {MAX_WORKERS or os.cpu_count()} worker(s)")
 
-                for file_path in glob.glob(os.path.join(bu_path, pattern)):
-                    func(file_path, output_folder, skip)
+    summary = run_ingest_tasks(tasks, max_workers=MAX_WORKERS)
+    print_ingest_summary(summary)
 
-    print("\nAll files have been converted successfully!")
+    failed = (summary["Status"] != "OK").sum() if not summary.empty else 0
+    if failed:
+        print(f"\n{failed} file(s) failed to convert, see summary above.")
+    else:
+        print("\nAll files have been converted successfully!")
     print(f"Execution time: {(time.time() - start_time)/60:.2f} minutes")
 
 # %%
@@ -0,0 +1,109 @@
+#%%
+import os
+import re
+import ast
+import sys
+import argparse
+import subprocess
+
+'''
+    Benchmark: cold-start import cost
+
+    Runs the top-level imports of each entry script (and each function module) in a
+    fresh interpreter with python -X importtime, and prints the total import time and
+    the slowest modules it pulled in. Nothing else of the script runs, so no data or
+    config is read.
+
+        python import_time.py --top 5
+        python import_time.py --repeat 5 --modules
+'''
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+ENTRY_SCRIPTS = [
+    "Inv/2024_plc_kae.py",
+    "Inv/load_data.py",
+    "Inv/clean_data.py",
+    "Inv/chart.py",
+    "Inv/PT2/2024_pt2.py",
+]
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")  # self us | cumulative us | indented name
+
+
+def top_level_imports(script_path):
+    """Source of the script's module-level import statements (sys.path tweaks are replaced by SRC_DIR)."""
+    with open(script_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    lines = [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join([f"import sys; sys.path.insert(0, {SRC_DIR!r})"] + lines)
+
+
+def _import_tree(stderr):
+    """(name, cumulative seconds, children) nodes of the outermost imports in -X importtime output."""
+    stack = []  # importtime prints each module after its children
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            depth = len(match.group(3))
+            children = []
+            while stack and stack[-1][0] > depth:
+                children.insert(0, stack.pop()[1])
+            stack.append((depth, (match.group(4), int(match.group(2)) / 1e6, children)))
+    return [node for _, node in stack]
+
+
+def _packages(nodes, parent=None):
+    """Outermost import of each package other than function (e.g. pandas, not pandas.core.frame)."""
+    for name, seconds, children in nodes:
+        root = name.split(".")[0]
+        if root not in ("function", parent):
+            yield seconds, root
+        else:
+            yield from _packages(children, root)
+
+
+def _run_importtime(code, cwd=SRC_DIR):
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, capture_output=True, text=True)
+
+
+def measure_imports(code, startup=frozenset(), cwd=SRC_DIR):
+    """
+    Import cost of code in a fresh interpreter, without the interpreter's own startup imports.
+
+    Returns:
+        tuple: (total seconds, [(seconds, package), ...] slowest first, error or None)
+    """
+    run = _run_importtime(code, cwd)
+    nodes = [node for node in _import_tree(run.stderr) if node[0] not in startup]
+    error = run.stderr.strip().splitlines()[-1] if run.returncode else None
+    return sum(node[1] for node in nodes), sorted(_packages(nodes), reverse=True), error
+
+
+def report(name, code, repeat, top, startup):
+    runs = [measure_imports(code, startup) for _ in range(repeat)]
+    best_total, modules, error = min(runs, key=lambda run: run[0])
+    slowest = ", ".join(f"{package} {seconds:.2f}s" for seconds, package in modules[:top])
+    print(f"{name:32s} {best_total:6.2f}s | {slowest}")
+    if error:
+        print(f"{'':32s} failed: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3, help="runs per entry; the fastest is reported")
+    parser.add_argument("--top", type=int, default=3, help="slowest top-level imports to list")
+    parser.add_argument("--modules", action="store_true", help="also time each function module on its own")
+    args = parser.parse_args()
+
+    startup = frozenset(node[0] for node in _import_tree(_run_importtime("pass").stderr))
+    print(f"Cold-start import time (best of {args.repeat})")
+    for script in ENTRY_SCRIPTS:
+        report(script, top_level_imports(os.path.join(SRC_DIR, script)), args.repeat, args.top, startup)
+
+    if args.modules:
+        print()
+        for file in sorted(os.listdir(os.path.join(SRC_DIR, "function"))):
+            if file.endswith(".py") and file != "__init__.py":
+                module = f"function.{file[:-3]}"
+                report(module, f"import sys; sys.path.insert(0, {SRC_DIR!r})\nimport {module}", args.repeat, args.top, startup)
+
+# %%
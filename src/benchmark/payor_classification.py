@@ -0,0 +1,94 @@
+#%%
+import sys
+import time
+import argparse
+
+# Adding the parent directory to sys.path for module imports
+sys.path.append('../')
+
+import numpy as np
+import pandas as pd
+from function.ruleClassifier import classify, load_classifications
+
+'''
+    Benchmark: payor / right classification
+
+    Compares the previous per-row implementations (site + payor concatenation with
+    a Python lambda or isin, and a double str.startswith for rights) with the
+    compiled config/filter.json classifications on a synthetic SpenDrug frame, and
+    checks that both give the same rows.
+
+        python payor_classification.py --rows 10000000
+'''
+
+
+def make_payor_frame(rows, seed=0):
+    """Synthetic rows: 8 sites, ~300 payor codes (including every configured one), ~40 right names."""
+    rng = np.random.default_rng(seed)
+    classifications = load_classifications()
+    sites = np.array(["PT1", "PT2", "PT3", "PTP", "PLS", "PTN", "PTS", "PLC"])
+
+    configured = sorted({code for c in ("payor_sso", "staff_payor") for _, code in classifications[c].pairs})
+    payors = np.array(configured + [f"{kind}-{i:04d}-000" for kind in ("FU", "GV", "CA", "IN") for i in range(60)])
+    rights = np.array([f"{prefix} {i}" for prefix in ("ครอบครัว", "พนักงาน", "แพทย์", "คลินิกพนักงาน") for i in range(3)]
+                      + [f"เงินสด {i}" for i in range(15)] + [f"ประกันสังคม {i}" for i in range(15)])
+
+    site = rng.integers(0, len(sites), rows)
+    return pd.DataFrame({
+        "Hospital Site": sites[site],
+        "Payor Code": np.where(sites[site] == "PTS", np.char.add("411-", payors[rng.integers(0, len(payors), rows)]),
+                               payors[rng.integers(0, len(payors), rows)]),
+        "Right Name": np.where(rng.random(rows) < 0.05, None, rights[rng.integers(0, len(rights), rows)]),
+    })
+
+
+def legacy_payor_sso(df):
+    codes = {f"{site}{code}" for site, code in load_classifications()["payor_sso"].pairs}
+    payor_sso = df['Hospital Site'] + df['Payor Code']
+    return payor_sso.apply(lambda x: 1 if x in codes else 0).to_numpy()
+
+
+def legacy_staff_payor(df):
+    codes = [f"{site}{code}" for site, code in load_classifications()["staff_payor"].pairs]
+    unique_value = df['Hospital Site'] + df['Payor Code']
+    filtered = df[~unique_value.isin(codes)]
+    removed = df[unique_value.isin(codes)]
+    return df.index.isin(removed.index)
+
+
+def legacy_staff_right(df):
+    prefixes = ('ครอบครัว', 'พนักงาน', 'แพทย์', 'กรรมการ ผู้บริหาร', 'คลินิกพนักงาน', 'ตรวจสุขภาพพนักงาน')
+    filtered = df[df['Right Name'].isna() | (~df['Right Name'].str.startswith(prefixes).fillna(False).astype(bool))]
+    removed = df[~df['Right Name'].isna() & df['Right Name'].str.startswith(prefixes).fillna(False).astype(bool)]
+    return df.index.isin(removed.index)
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    df = make_payor_frame(args.rows)
+    print(f"Synthetic payor frame: {len(df):,} rows")
+
+    cases = [
+        ("payor_sso", legacy_payor_sso, lambda df: classify(df, "payor_sso").astype(int)),
+        ("staff_payor", legacy_staff_payor, lambda df: classify(df, "staff_payor")),
+        ("staff_right", legacy_staff_right, lambda df: classify(df, "staff_right")),
+    ]
+    for name, legacy, compiled in cases:
+        expected, legacy_seconds = timed(legacy, df)
+        result, new_seconds = timed(compiled, df)
+
+        same = np.array_equal(np.asarray(expected, dtype=int), np.asarray(result, dtype=int))
+        print(f"{name:12s} per-row {legacy_seconds:8.2f}s | compiled {new_seconds:6.2f}s "
+              f"| x{legacy_seconds / new_seconds:,.1f} | {int(np.sum(result)):,} rows | same output: {same}"
+              f" | {args.rows / new_seconds / 1e6:,.1f}M rows/s")
+
+# %%
@@ -0,0 +1,97 @@
+#%%
+import sys
+import time
+import argparse
+
+# Adding the parent directory to sys.path for module imports
+sys.path.append('../')
+
+import numpy as np
+import pandas as pd
+from function.addColumn import add_receive_drug_column, add_update_received_drug
+from function.visitKey import factorize_key
+
+'''
+    Benchmark: receive-drug group flags
+
+    Compares the previous groupby.apply implementations of [receive_drug] and
+    [Revised Receive Drug] with the vectorized group_any versions on a synthetic
+    SpenDrug frame, and checks that both give the same output.
+
+        python receive_drug_flags.py --rows 1000000
+'''
+
+
+def make_spen_drug_frame(rows, seed=0):
+    """Synthetic SpenDrug rows: ~4 lines per visit, a few hundred doctors/clinics, Excel-serial VisitDate."""
+    rng = np.random.default_rng(seed)
+    visits = max(rows // 4, 1)
+    visit = rng.integers(0, visits, rows)
+    sites = np.array(["PT1", "PT2", "PT3", "PTP", "PLS", "PTN", "PTS", "PLC"])
+
+    return pd.DataFrame({
+        "Hospital Site": sites[visit % len(sites)],
+        "HN": (visit // 3).astype(str),
+        "VN": visit.astype(str),
+        "VisitDate": 45292 + (visit % 365),
+        "Clinic": (visit % 40).astype(str),
+        "ClinicName": np.char.add("Clinic ", (visit % 40).astype(str)),
+        "Doctor": (visit % 300).astype(str),
+        "Doctor Name": np.char.add("Doctor ", (visit % 300).astype(str)),
+        "DoctorName": np.char.add("Doctor ", (visit % 300).astype(str)),
+        "Item Type": rng.choice(["Drug", "Lab", "Service"], rows, p=[0.3, 0.4, 0.3]),
+        "Received Drug": rng.choice([0, 1], rows, p=[0.85, 0.15]),
+    })
+
+
+def legacy_add_receive_drug_column(df):
+    df = df.copy()
+    df['unique_id'] = factorize_key(df, ['Hospital Site', 'HN', 'VisitDate'])
+    drug_received = df.groupby('unique_id')['Item Type'].apply(lambda x: (x == 'Drug').any()).astype(int)
+    df['receive_drug'] = df['unique_id'].map(drug_received)
+    return df.drop(columns=['unique_id'])
+
+
+def legacy_add_update_received_drug(df):
+    df = df.copy()
+    df['unique_id'] = factorize_key(
+        df, ['Hospital Site', 'HN', 'VisitDate', 'VN', 'Clinic', 'ClinicName', 'Doctor', 'DoctorName']
+    )
+
+    def update_received_drug(group):
+        group['Revised Receive Drug'] = 1 if 1 in group['Received Drug'].values else 0
+        return group
+
+    df = df.groupby('unique_id', group_keys=False).apply(update_received_drug)
+    df['VisitDate'] = pd.to_datetime(df['VisitDate'], origin='1899-12-30', unit='D', errors='coerce')
+    df = df.drop_duplicates(['unique_id', 'Revised Receive Drug'], keep='first')
+    return df.drop(columns=['unique_id'])
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = make_spen_drug_frame(args.rows)
+    print(f"Synthetic SpenDrug frame: {len(df):,} rows")
+
+    cases = [
+        ("add_receive_drug_column", legacy_add_receive_drug_column, add_receive_drug_column, ["receive_drug"]),
+        ("add_update_received_drug", legacy_add_update_received_drug, add_update_received_drug, ["Revised Receive Drug"]),
+    ]
+    for name, legacy, vectorized, flag_cols in cases:
+        expected, legacy_seconds = timed(legacy, df)
+        result, new_seconds = timed(vectorized, df)
+
+        same = expected.index.equals(result.index) and expected[flag_cols].equals(result[flag_cols])
+        print(f"{name:26s} groupby.apply {legacy_seconds:8.2f}s | vectorized {new_seconds:6.2f}s "
+              f"| x{legacy_seconds / new_seconds:,.1f} | same output: {same}")
+
+# %%
@@ -0,0 +1,68 @@
+import os
+import time
+import pandas as pd
+from function.compactFrame import concat_frames
+
+
+class FrameAccumulator:
+    """
+    Collect DataFrames inside a file loop and materialize them once at the end.
+
+    Replaces the `all_data = pd.concat([all_data, data])` pattern, which recopies the
+    growing frame for every file. Frames are kept in a list (default) or, with
+    spill_dir, written straight to a Parquet dataset as part files so the loop holds
+    only one file in memory at a time.
+
+    Usage:
+        acc = FrameAccumulator("SpenDrug")
+        for file in files:
+            acc.add(process(pd.read_excel(file)))
+        all_data = acc.result()
+    """
+
+    def __init__(self, name, spill_dir=None):
+        self.name = name
+        self.spill_dir = spill_dir
+        self.frames = []
+        self.parts = 0
+        self.rows = 0
+        self.started = time.perf_counter()
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            for old_part in os.listdir(spill_dir):
+                if old_part.startswith("part-") and old_part.endswith(".parquet"):
+                    os.remove(os.path.join(spill_dir, old_part))
+
+    def add(self, df):
+        """Add one processed frame; empty or None frames are ignored."""
+        if df is None or df.empty:
+            return
+        self.rows += len(df)
+        if self.spill_dir:
+            df.to_parquet(os.path.join(self.spill_dir, f"part-{self.parts:05d}.parquet"), index=False)
+        else:
+            self.frames.append(df)
+        self.parts += 1
+
+    def result(self):
+        """Concatenate everything collected (reading the spilled dataset back if spilling) in one step."""
+        if self.parts == 0:
+            combined = pd.DataFrame()
+        elif self.spill_dir:
+            # Parts are read one by one and concatenated like the in-memory frames, so columns
+            # missing from some parts or with other dtypes give the same result in both modes
+            combined = concat_frames([pd.read_parquet(os.path.join(self.spill_dir, f"part-{part:05d}.parquet"))
+                                      for part in range(self.parts)])
+        else:
+            # concat_frames keeps compact (categorical) columns categorical across files
+            combined = concat_frames(self.frames)
+            self.frames = []
+
+        self.report()
+        return combined
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows / elapsed if elapsed > 0 else float("nan")
+        print(f"[{self.name}] {self.parts} file(s), {self.rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
@@ -2,6 +2,46 @@ import pandas as pd
 import numpy as np
 import re
 from datetime import datetime
+from function.compactFrame import astype_str, decode, map_categories, str_strip
+from function.dateNormalizer import normalize_dates
+from function.nameNormalizer import NameNormalizer
+from function.ruleClassifier import classify
+from function.visitKey import OPD_VISIT_KEY_COLUMNS, PATIENT_KEY_COLUMNS, factorize_key, group_any, hash_key
+
+# Targets of the "Medication Increase to N% day (Qty)" columns
+MEDICATION_INCREASE_PERCENTS = [100, 50, 20, 10, 5]
+
+# %_Med_Pre tiers: below 5 -> '< 5%', [5, 21) -> '5-20%', ..., 81 and above -> '81-100%'
+TIER_BINS = [5, 21, 41, 61, 81]
+TIER_LABELS = ['< 5%', '5-20%', '21-40%', '41-60%', '61-80%', '81-100%']
+
+# Doctor names containing one of these are kept as they are (the parentheses belong to the name)
+DOCTOR_NAME_EXCEPTIONS = [
+    "ผศ.(พิเศษ)",
+    "รศ.(พิเศษ)",
+    "เกษตรเสริมวิริยะ(เตชะพงศธร)",
+    "กลิ่นสุคนธ์(นิ่มน้อย)"
+]
+
+# Whole-name corrections applied after cleaning
+DOCTOR_NAME_REPLACEMENTS = {
+    "พญ. ัทธ์ธีรา รอดเจริญ": "พญ.นัทธ์ธีรา  รอดเจริญ",
+    "น.พ.": "นพ.",
+    "พ.ญ.": "พญ.",
+    ". ": "",
+    ") ": "",
+    "ศ.คลินิกเกียรติคุณ ": "",
+    "พลเอก ": "พล.อ.",
+    "พล ": "พล.",
+    "พญสุทธนารัตน์ อภิวันทนา": "พญ.สุทธนารัตน์ อภิวันทนา",
+    "นพสาธิต หวังวัชรกุล": "นพ.สาธิต หวังวัชรกุล",
+    "(C-Up)พญ.ศุภดา  เกษตรเสริมวิริยะ(เตชะพงศธร)": "พญ.ศุภดา เกษตรเสริมวิริยะ(เตชะพงศธร)",
+    "(OHC)พญ.ศุภดา  เกษตรเสริมวิริยะ(เตชะพงศธร)": "พญ.ศุภดา เกษตรเสริมวิริยะ(เตชะพงศธร)",
+    "พญ.ศุภดา  เกษตรเสริมวิริยะ(เตชะพงศธร)": "พญ.ศุภดา เกษตรเสริมวิริยะ(เตชะพงศธร)",
+    "ผศ.(พิเศษ)พญ.อิศราพร ตรีสิทธิ์": "ผศ.(พิเศษ) พญ.อิศราพร ตรีสิทธิ์",
+    "พญ.นารีลักษณ์  กลิ่นสุคนธ์(นิ่มน้อย)": "พญ.นารีลักษณ์ กลิ่นสุคนธ์(นิ่มน้อย)",
+    "ร.อ.น.พ.": "ร.อ.นพ."
+}
 
 def insert_columns(df, target_col, columns_to_add, position='before', default_values=None):
     """
@@ -33,27 +73,22 @@ def insert_columns(df, target_col, columns_to_add, position='before', default_va
 
 def add_receive_drug_column(df):
     df = df.copy()
-    # Ensure VisitDate is treated as a string
-    df['VisitDate'] = df['VisitDate'].astype(str)
     
-     # Ensure all relevant columns are treated as strings and replace missing values with an empty string
-    df['VisitDate'] = df['VisitDate'].astype(str).fillna('')
-    df['Hospital Site'] = df['Hospital Site'].astype(str).fillna('')
+     # Ensure all relevant columns are treated as strings (VisitDate keeps its type, the key does not need text)
+    df['Hospital Site'] = astype_str(df['Hospital Site'])
     df['HN'] = df['HN'].astype(str).fillna('')
-    df['Clinic'] = df['Clinic'].astype(str).fillna('')
-    df['ClinicName'] = df['ClinicName'].astype(str).fillna('')
+    df['Clinic'] = astype_str(df['Clinic'])
+    df['ClinicName'] = astype_str(df['ClinicName'])
     df['Doctor'] = df['Doctor'].astype(str).fillna('')
-    df['Doctor Name'] = df['Doctor Name'].astype(str).fillna('')
+    df['Doctor Name'] = astype_str(df['Doctor Name'])
     
     # # Create a unique identifier by concatenating the columns
     # df['unique_id'] = df['Hospital Site'].astype(str) + df['HN'].astype(str) + df['VisitDate'] + df['Clinic'] + df['ClinicName'] + df['Doctor'] + df['Doctor Name']
     
-    df['unique_id'] = df['Hospital Site'].astype(str) + df['HN'].astype(str) + df['VisitDate']
-    # Group by the unique identifier and check if any Item_Type is "Drug"
-    drug_received = df.groupby('unique_id')['Item Type'].apply(lambda x: (x == 'Drug').any()).astype(int)
-    
-    # Map the results back to the original DataFrame
-    df['receive_drug'] = df['unique_id'].map(drug_received)
+    # Integer key per site/HN/visit date instead of a concatenated string
+    df['unique_id'] = factorize_key(df, ['Hospital Site', 'HN', 'VisitDate'])
+    # Check per unique identifier if any Item_Type is "Drug", broadcast back to every row
+    df['receive_drug'] = group_any(df['unique_id'], df['Item Type'] == 'Drug')
     
     # Drop the temporary unique_id column
     df.drop(columns=['unique_id'], inplace=True)
@@ -64,29 +99,16 @@ def add_receive_drug_column(df):
 # Function to create a new column [Revised Receive Drug] based on group conditions
 def add_update_received_drug(df):
     df = df.copy()
-    # Create a unique identifier for each group
-    df['unique_id'] = (
-        df['Hospital Site'].astype(str) + 
-        df['HN'].astype(str) + 
-        df['VisitDate'].astype(str) + 
-        df['VN'].astype(str) + 
-        df['Clinic'].astype(str) + 
-        df['ClinicName'].astype(str) + 
-        df['Doctor'].astype(str) + 
-        df['DoctorName'].astype(str)
+    # Create a unique identifier for each group (integer-coded combination of the columns)
+    df['unique_id'] = factorize_key(
+        df, ['Hospital Site', 'HN', 'VisitDate', 'VN', 'Clinic', 'ClinicName', 'Doctor', 'DoctorName']
     )
     
-    # Function to determine the value of [Revised Receive Drug] within each group
-    def update_received_drug(group):
-        # Add a new column [Revised Receive Drug] based on the group condition
-        group['Revised Receive Drug'] = 1 if 1 in group['Received Drug'].values else 0
-        return group
-    
-    # Apply the function to each group based on the unique_id
-    df = df.groupby('unique_id', group_keys=False).apply(update_received_drug)
+    # [Revised Receive Drug] = 1 for every row of a group where any row has [Received Drug] == 1
+    df['Revised Receive Drug'] = group_any(df['unique_id'], df['Received Drug'] == 1)
     
     # Convert 'VisitDate' back to datetime type if necessary
-    df['VisitDate'] = pd.to_datetime(df['VisitDate'], origin='1899-12-30', unit='D', errors='coerce')
+    df['VisitDate'] = normalize_dates(df['VisitDate'])
     
     # Drop duplicates based on 'unique_id', keeping the first occurrence
     df = df.drop_duplicates(['unique_id', 'Revised Receive Drug'], keep='first')
@@ -118,7 +140,7 @@ def add_site_op(df):
     }
     
     # Map the site_op details based on Hospital Site
-    df['site_op'] = df['Hospital Site'].map(site_op_mapping)
+    df['site_op'] = map_categories(df['Hospital Site'], site_op_mapping)
     
     return df
 
@@ -142,70 +164,13 @@ def add_site_type(df):
     }
     
     # Map the site_op details based on Hospital Site
-    df['site_type'] = df['Hospital Site'].map(site_op_mapping)
+    df['site_type'] = map_categories(df['Hospital Site'], site_op_mapping)
     
     return df
 
 def add_payor_sso(df):
-    # Add the new column site_right_name
-    df['payor_sso'] = df['Hospital Site'] + df['Payor Code']
-    
-    payor_sso = {
-        "PLSFU-0003-000",
-        "PLSFU-0026-000",
-        "PLSFU-0008-000",
-        "PLSFU-0010-000",
-        "PLSFU-0013-000",
-        "PLSFU-0014-000",
-        "PLSFU-0015-000",
-        "PLSGV-0002-000",
-        "PLSGV-0002-001",
-        "PLSGV-0002-003",
-        "PLSGV-0006-000",
-        "PTNFU-0002-000",
-        "PTNFU-0003-000",
-        "PTNFU-0006-000",
-        "PTNFU-0009-000",
-        "PTNGV-0002-000",
-        "PTNGV-0001-000",
-        "PTNGV-0003-000",
-        "PTNGV-0003-001",
-        "PTNGV-0003-002",
-        "PTNGV-0003-003",
-        "PTNGV-0003-306",
-        "PTNGV-0003-B06",
-        "PTNGV-0003-C06",
-        "PTNGV-0003-D06",
-        "PTNGV-0003-E06",
-        "PTNGV-0006-001",
-        "PTNGV-0007-002",
-        "PTNGV-0009-004",
-        "PTNGV-0010-005",
-        "PTNGV-0011-006",
-        "PTNGV-0012-001",
-        "PTNGV-0013-001",
-        "PTNGV-0003-F06",
-        "PTNGV-0003-G06",
-        "PTNGV-0003-I06",
-        "PTNGV-0003-K06",
-        "PTNGV-0003-L06",
-        "PTNSO-0001-000",
-        "PTS411-FU-0001-000",
-        "PTS411-FU-0002-000",
-        "PTS411-FU-0007-000",
-        "PTS411-GV-0001-000",
-        "PTS411-GV-0002-000",
-        "PTS411-GV-0002-001",
-        "PTS411-GV-0002-002",
-        "PTS411-GV-0002-003",
-        "PTS411-GV-0002-100",
-        "PTS411-GV-0002-101",
-        "PTS411-GV-0011-308",
-        "PTS411-GV-0012-008"
-    }
-    
-    # Assign 1 if 'payor_sso' is in the set, otherwise 0
-    df['Payor SSO'] = df['payor_sso'].apply(lambda x: 1 if x in payor_sso else 0)
+    # Assign 1 if the ('Hospital Site', 'Payor Code') pair is an SSO payor (config/filter.json "payor_sso"), otherwise 0
+    df['Payor SSO'] = classify(df, 'payor_sso').astype(int)
     
     return df
 
@@ -231,38 +196,24 @@ def add_has_appointment_column(df):
 def parse_mixed_visitdate(series):
     """
     Convert a column that may contain both standard date-strings 
-    and Excel date serial numbers.
+    and Excel date serial numbers (see dateNormalizer.normalize_dates).
     """
-    # 1) Identify which rows are numeric (Excel serial dates).
-    mask_numeric = pd.to_numeric(series, errors='coerce').notnull()
-
-    # 2) Create a copy so we don’t alter the original series directly
-    result = series.copy()
-
-    # 3) Convert the numeric ones using the Excel offset
-    result.loc[mask_numeric] = (
-        pd.to_datetime("1899-12-30") +
-        pd.to_timedelta(result.loc[mask_numeric].astype(float), unit="D")
-    )
-
-    # 4) Convert the non-numeric ones with standard parsing
-    result.loc[~mask_numeric] = pd.to_datetime(result.loc[~mask_numeric])
-
-    # 5) Return the series as datetime
-    return pd.to_datetime(result)
+    return normalize_dates(series)
 
 def add_concatenation_columns(df):
+    """
+    Add the Patient (site + HN) and OPD Visit (site + HN + VN + VisitDate) keys as
+    stable 64-bit integers. Use visitKey.add_readable_keys to get the text form at export.
+    """
     df = df.copy()
     
-    # Convert 'VisitDate' to string first, just for concatenation
-    df['VisitDate'] = df['VisitDate'].astype(str)
-    
-    # Create your concatenation columns
-    df['Patient'] = df['Hospital Site'] + df['HN']
-    df['OPD Visit'] = df['Hospital Site'] + df['HN'] + df['VN'] + df['VisitDate']
+    # Convert 'VisitDate' to datetime first, handling both numeric and date strings
+    if not pd.api.types.is_datetime64_any_dtype(df['VisitDate']):
+        df['VisitDate'] = parse_mixed_visitdate(df['VisitDate'])
     
-    # Now convert 'VisitDate' back to datetime, handling both numeric and date strings
-    df['VisitDate'] = parse_mixed_visitdate(df['VisitDate'])
+    # Create your key columns (hashed, so they match across SpenDrug / HN frames)
+    df['Patient'] = hash_key(df, PATIENT_KEY_COLUMNS)
+    df['OPD Visit'] = hash_key(df, OPD_VISIT_KEY_COLUMNS)
     
     return df
 
@@ -284,59 +235,31 @@ def add_concatenation_columns_old(df):
     # )
     return df
 
-def add_clean_doctor_name(df):
-    df = df.copy()
+def doctor_name_normalizer(map_path="default"):
+    """NameNormalizer with the doctor-name exceptions and corrections (learned table: <NAME_MAP_DIR>/DoctorName.json)."""
+    return NameNormalizer("DoctorName", exceptions=DOCTOR_NAME_EXCEPTIONS,
+                          replacements=DOCTOR_NAME_REPLACEMENTS, map_path=map_path)
 
-    # Define the exceptions
-    exceptions = [
-        "ผศ.(พิเศษ)",
-        "รศ.(พิเศษ)",
-        "เกษตรเสริมวิริยะ(เตชะพงศธร)",
-        "กลิ่นสุคนธ์(นิ่มน้อย)"
-    ]
+def add_clean_doctor_name(df, normalizer=None):
+    df = df.copy()
+    normalizer = normalizer or doctor_name_normalizer()
     
     # Step 1: Trim parentheses and the word inside, except for specific cases
-    def clean_doctor_name(name):
-        if name is None:  # Check if the name is None
-            return name
-        # if name in exceptions:
-        #     return name
-        
-        # If the name matches an exception, return it unchanged
-        if any(exception in name for exception in exceptions):
-            return name
-        
-        else:
-            # Remove text inside parentheses and extra spaces
-            cleaned_name = re.sub(r"\(.*?\)", "", name)
-            cleaned_name = re.sub(r"\s{2,}", " ", cleaned_name)  # Replace multiple spaces with a single space
-            
-            return cleaned_name.strip()  # Remove leading/trailing spaces
-    
-    df.loc[:, 'CleanedDoctorName'] = df['Doctor Name'].apply(clean_doctor_name)
-    
-    # # Step 2: Replace specific doctor names with correct ones
-    df.loc[:, 'CleanedDoctorName'] = df['CleanedDoctorName'].replace({
-        "พญ. ัทธ์ธีรา รอดเจริญ": "พญ.นัทธ์ธีรา  รอดเจริญ",
-        "น.พ.": "นพ.",
-        "พ.ญ.": "พญ.",
-        ". ": "",
-        ") ": "",
-        "ศ.คลินิกเกียรติคุณ ": "",
-        "พลเอก ": "พล.อ.",
-        "พล ": "พล.",
-        "พญสุทธนารัตน์ อภิวันทนา": "พญ.สุทธนารัตน์ อภิวันทนา",
-        "นพสาธิต หวังวัชรกุล": "นพ.สาธิต หวังวัชรกุล",
-        "(C-Up)พญ.ศุภดา  เกษตรเสริมวิริยะ(เตชะพงศธร)": "พญ.ศุภดา เกษตรเสริมวิริยะ(เตชะพงศธร)",
-        "(OHC)พญ.ศุภดา  เกษตรเสริมวิริยะ(เตชะพงศธร)": "พญ.ศุภดา เกษตรเสริมวิริยะ(เตชะพงศธร)",
-        "พญ.ศุภดา  เกษตรเสริมวิริยะ(เตชะพงศธร)": "พญ.ศุภดา เกษตรเสริมวิริยะ(เตชะพงศธร)",
-        "ผศ.(พิเศษ)พญ.อิศราพร ตรีสิทธิ์": "ผศ.(พิเศษ) พญ.อิศราพร ตรีสิทธิ์",
-        "พญ.นารีลักษณ์  กลิ่นสุคนธ์(นิ่มน้อย)": "พญ.นารีลักษณ์ กลิ่นสุคนธ์(นิ่มน้อย)",
-        "ร.อ.น.พ.": "ร.อ.นพ."
-    }, regex=False)
+    # Step 2: Replace specific doctor names with correct ones
+    # Both run once per distinct name; the rows get the result through the name codes
+    df['CleanedDoctorName'] = normalizer.normalize(df['Doctor Name'])
+    normalizer.save()
 
     return df
 
+def add_normalized_column(df, column, new_column, normalizer):
+    """Same engine for other name columns, e.g. ClinicName or Right Name:
+    add_normalized_column(df, 'Right Name', 'CleanedRightName', NameNormalizer('RightName'))"""
+    df = df.copy()
+    df[new_column] = normalizer.normalize(df[column])
+    normalizer.save()
+    return df
+
 # def replace_med_dose_with_new_med_dose(df, med_dose_file):
 #     # Load the Excel file
 #     med_dose_df = pd.read_excel(med_dose_file, sheet_name='Dose_PLS')
@@ -395,24 +318,21 @@ def merge_and_filter_data_with_constants(df, filter_file, sheet_name):
     print("First few rows of filter_df:")
     # print(filter_df.head())
     
-    # Ensure key columns have the same data type
-    df['Hospital Site'] = df['Hospital Site'].astype(str)
-    df['Item Code'] = df['Item Code'].astype(str)
-    df['UOM'] = df['UOM'].astype(str)
+    # Ensure key columns have the same data type (compact columns stay categorical)
+    df['Hospital Site'] = str_strip(df['Hospital Site'])
+    df['Item Code'] = str_strip(df['Item Code'])
+    df['UOM'] = str_strip(df['UOM'])
     filter_df['Hospital Site'] = filter_df['Hospital Site'].astype(str)
     filter_df['Item Code'] = filter_df['Item Code'].astype(str)
     filter_df['UOM'] = filter_df['UOM'].astype(str)
 
     # Remove leading/trailing whitespace from key columns
-    df['Hospital Site'] = df['Hospital Site'].str.strip()
-    df['Item Code'] = df['Item Code'].str.strip()
-    df['UOM'] = df['UOM'].str.strip()
     filter_df['Hospital Site'] = filter_df['Hospital Site'].str.strip()
     filter_df['Item Code'] = filter_df['Item Code'].str.strip()
     filter_df['UOM'] = filter_df['UOM'].str.strip()
 
     # Create concatenated keys
-    df['Key'] = df['Hospital Site'] + df['Item Code'] + df['UOM']
+    df['Key'] = decode(df['Hospital Site']) + decode(df['Item Code']) + decode(df['UOM'])
     filter_df['Key'] = filter_df['Hospital Site'] + filter_df['Item Code'] + filter_df['UOM']
     
     # Check for and remove duplicate keys in filter_df
@@ -453,7 +373,44 @@ def merge_and_filter_data_with_constants(df, filter_file, sheet_name):
     return filtered_df
 
 
-def add_calculated_columns(df):
+def medication_increase_matrix(appt_days, med_day, med_dose, percents=MEDICATION_INCREASE_PERCENTS):
+    """
+    Extra quantity needed to cover N% of the appointment interval, for every N at once.
+
+    Returns:
+        np.ndarray: rows x len(percents) matrix of (appt_days * N/100 - med_day) * med_dose,
+                    with negative and missing results set to 0.
+    """
+    appt_days = np.asarray(appt_days, dtype=float)[:, None]
+    med_day = np.asarray(med_day, dtype=float)[:, None]
+    med_dose = np.asarray(med_dose, dtype=float)[:, None]
+    factors = np.asarray(percents, dtype=float)[None, :] / 100
+
+    increase = (appt_days * factors - med_day) * med_dose
+    return np.where(increase > 0, increase, 0.0)
+
+def assign_tiers(values, bins=TIER_BINS, labels=TIER_LABELS, default='0'):
+    """
+    Label each value with its tier: values below bins[0] get labels[0], values in
+    [bins[i-1], bins[i]) get labels[i], values >= bins[-1] get labels[-1]; missing
+    values get default.
+    """
+    values = np.asarray(values, dtype=float)
+    choices = np.array(list(labels) + [default], dtype=object)
+    index = np.searchsorted(np.asarray(bins, dtype=float), values, side='right')
+    index[np.isnan(values)] = len(labels)
+    return choices[index]
+
+def add_calculated_columns(df, increase_percents=MEDICATION_INCREASE_PERCENTS,
+                           tier_bins=TIER_BINS, tier_labels=TIER_LABELS):
+    """
+    Add the medication quantity/day, appointment and Tier columns.
+
+    Parameters:
+        increase_percents (list): Targets for the "Medication Increase to N% day (Qty)" columns.
+        tier_bins (list): Ascending %_Med_Pre lower bounds of the tiers above the lowest one.
+        tier_labels (list): Tier names, one more than tier_bins, lowest tier first.
+    """
     df = df.copy()
     
     df['New_Med_Dose'] = df['New_Dose/Day'] * df['New_Dose/Time']
@@ -462,20 +419,18 @@ def add_calculated_columns(df):
     
     # Calculate Next_Appt_Days
     # Ensure 'AppointmentDatetime' and 'VisitDate' are in datetime format
-    df['AppointmentDatetime'] = pd.to_datetime(df['AppointmentDatetime'], errors='coerce')
-    df['VisitDate'] = pd.to_datetime(df['VisitDate'], errors='coerce')
+    df['AppointmentDatetime'] = normalize_dates(df['AppointmentDatetime'])
+    df['VisitDate'] = normalize_dates(df['VisitDate'])
     df['Appt_Days'] = (df['AppointmentDatetime'] - df['VisitDate']).dt.days
     
     # Calculate Rev/New_Med_Qty
     df['Rev/New_Med_Qty'] = df['Amt'] / df['New_Med_Qty'].replace(0, 1)
     
     
-    # Assuming df is your DataFrame and it already contains the 'Appt_Days', 'New_Med_Day', and 'Med_Dose' columns
-    df['Medication Increase to 100% day (Qty)'] = ((df['Appt_Days'] * 1 - df['New_Med_Day']) * df['New_Med_Dose']).apply(lambda x: x if x > 0 else 0)
-    df['Medication Increase to 50% day (Qty)'] = ((df['Appt_Days'] * 0.5 - df['New_Med_Day']) * df['New_Med_Dose']).apply(lambda x: x if x > 0 else 0)
-    df['Medication Increase to 20% day (Qty)'] = ((df['Appt_Days'] * 0.2 - df['New_Med_Day']) * df['New_Med_Dose']).apply(lambda x: x if x > 0 else 0)
-    df['Medication Increase to 10% day (Qty)'] = ((df['Appt_Days'] * 0.1 - df['New_Med_Day']) * df['New_Med_Dose']).apply(lambda x: x if x > 0 else 0)
-    df['Medication Increase to 5% day (Qty)'] = ((df['Appt_Days'] * 0.05 - df['New_Med_Day']) * df['New_Med_Dose']).apply(lambda x: x if x > 0 else 0)
+    # All "Medication Increase to N% day (Qty)" columns in one broadcast: (Appt_Days * N% - New_Med_Day) * New_Med_Dose, floored at 0
+    increase = medication_increase_matrix(df['Appt_Days'], df['New_Med_Day'], df['New_Med_Dose'], increase_percents)
+    for i, percent in enumerate(increase_percents):
+        df[f'Medication Increase to {percent}% day (Qty)'] = increase[:, i]
 
     
     # Calculate additional columns
@@ -494,21 +449,8 @@ def add_calculated_columns(df):
     # # Add 'New_Med_Day_is_3d' column
     # df['New_Med_Day_is_3d'] = np.where(df['New_Med_Day'] == 3, 1, 0)
     
-    # Define the tier conditions
-    conditions = [
-        (df['%_Med_Pre'] >= 81),
-        (df['%_Med_Pre'] >= 61),
-        (df['%_Med_Pre'] >= 41),
-        (df['%_Med_Pre'] >= 21),
-        (df['%_Med_Pre'] >= 5),
-        (df['%_Med_Pre'] < 5)
-    ]
-    
-    # Define the corresponding values
-    choices = ['81-100%', '61-80%', '41-60%', '21-40%', '5-20%', '< 5%']
-    
-    # Add the 'Tier' column based on the conditions
-    df['Tier'] = np.select(conditions, choices, default='0')
+    # Add the 'Tier' column with one binary search of %_Med_Pre over the tier bins
+    df['Tier'] = assign_tiers(df['%_Med_Pre'], tier_bins, tier_labels)
     
     # df['Old/New_Clinic'] = 
     # df['Old/New_Patient'] = 
@@ -528,6 +470,16 @@ def add_patient_year(df, create_patient_col):
     return df
 
 def calculate_doctor_performance(df):
+    """
+    Add the low-prescription statistics and performance tier of each doctor per year.
+
+    All per-(doctor, Year) values are computed in one grouped pass over integer
+    group codes (bincount sums/counts) and broadcast back to the rows by code,
+    instead of groupby transforms, a mode lambda and a merge. The tier is one value
+    per group, so its per-group mode is the tier itself.
+    Rows without a doctor or Year get no group values, as before.
+    """
+    group_cols = ['Unique CleanedDoctorName', 'Year']
     
     # Step 1: Add a binary column indicating if the prescription is low (< 20%)
     df['Low_Pre_Doctor_Flag'] = np.where(df['%_Med_Pre'] < 20, 1, 0)
@@ -535,31 +487,50 @@ def calculate_doctor_performance(df):
     # Step 2: Create a 'Year' column from the 'VisitDate' column
     df['Year'] = df['VisitDate'].dt.year
 
-    # Step 3: Calculate the total transaction count of low prescription instances for each doctor, for 2023 and 2024 separately
-    df['low_pre_doctor_tran'] = df.groupby(['Unique CleanedDoctorName', 'Year'])['Low_Pre_Doctor_Flag'].transform('sum').fillna(0)
+    # Group code per doctor and year (-1 where either is missing)
+    codes = df.groupby(group_cols, sort=False, observed=True).ngroup().fillna(-1).to_numpy(dtype='int64')
+    valid = codes >= 0
+    n_groups = codes.max() + 1 if valid.any() else 0
+    valid_codes = codes[valid]
 
-    # Step 4: Calculate the total transaction count for each doctor, for 2023 and 2024 separately
-    df['total_doctor_transaction'] = df.groupby(['Unique CleanedDoctorName', 'Year'])['Low_Pre_Doctor_Flag'].transform('count')
+    # Steps 3-4: Low prescription transactions and total transactions per doctor and year
+    low_pre_tran = np.bincount(valid_codes, weights=df['Low_Pre_Doctor_Flag'].to_numpy()[valid], minlength=n_groups)
+    total_tran = np.bincount(valid_codes, minlength=n_groups)
 
-    # Step 5: Calculate the percentage of low prescription instances for each doctor and round to two decimal places
-    df['%Low_Pre_Doctor_value'] = (df['low_pre_doctor_tran'] / df['total_doctor_transaction']).round(2)
+    # Step 5: Percentage of low prescription instances, rounded to two decimal places
+    with np.errstate(divide='ignore', invalid='ignore'):
+        low_pre_value = np.round(low_pre_tran / total_tran, 2)
 
     # Step 6: Assign doctors to performance tiers based on %Low_Pre_Doctor_value
-    df['Doctor_Tier'] = np.select(
+    group_tier = assign_doctor_tiers(low_pre_value)
+
+    # Broadcast the group values back to the rows by group code
+    def broadcast(group_values, missing):
+        row_values = np.full(len(df), missing, dtype=object if missing is None else float)
+        row_values[valid] = group_values[valid_codes]
+        return row_values
+
+    low_pre_rows = broadcast(low_pre_tran, 0.0)
+    df['low_pre_doctor_tran'] = low_pre_rows if not valid.all() else low_pre_rows.astype('int64')
+    total_rows = broadcast(total_tran, np.nan)
+    df['total_doctor_transaction'] = total_rows if not valid.all() else total_rows.astype('int64')
+    df['%Low_Pre_Doctor_value'] = broadcast(low_pre_value, np.nan)
+    # Step 7: Doctor_Tier_Mode, the mode of the tier within a doctor-year, is that group's tier
+    group_tier_rows = broadcast(group_tier, None)
+    df['Doctor_Tier'] = np.where(valid, group_tier_rows, 'Unknown')
+    df['Doctor_Tier_Mode'] = pd.Series(group_tier_rows, index=df.index).where(valid, np.nan)
+
+    return df.reset_index(drop=True)
+
+def assign_doctor_tiers(low_pre_value):
+    """Doctor tier from the share of low prescriptions: '4' none, '3' <= 5%, '2' <= 20%, '1' above, else 'Unknown'."""
+    return np.select(
         [
-            df['%Low_Pre_Doctor_value'] == 0.0,  # No low prescriptions
-            df['%Low_Pre_Doctor_value'] <= 0.05,  # Good performance group
-            (df['%Low_Pre_Doctor_value'] > 0.05) & (df['%Low_Pre_Doctor_value'] <= 0.20),  # Moderate performance group
-            df['%Low_Pre_Doctor_value'] > 0.20  # Low performance group
+            low_pre_value == 0.0,  # No low prescriptions
+            low_pre_value <= 0.05,  # Good performance group
+            (low_pre_value > 0.05) & (low_pre_value <= 0.20),  # Moderate performance group
+            low_pre_value > 0.20  # Low performance group
         ],
-        ['4', '3', '2', '1'],  # Tiers: '0' for no low prescriptions, '3', '2', '1' for performance groups
+        ['4', '3', '2', '1'],  # Tiers: '4' for no low prescriptions, '3', '2', '1' for performance groups
         default='Unknown'
-    )
-    
-    # Step 7: Get the mode of the Doctor_Tier for each doctor in each year (most frequent tier)
-    Doctor_Tier_Mode = df.groupby(['Year', 'Unique CleanedDoctorName'])['Doctor_Tier'].agg(lambda x: x.mode()[0]).reset_index()
-
-    # Merge the tier summary back to the original DataFrame if needed
-    df = pd.merge(df, Doctor_Tier_Mode, on=['Year', 'Unique CleanedDoctorName'], how='left', suffixes=('', '_Mode'))
-
-    return df
\ No newline at end of file
+    ).astype(object)
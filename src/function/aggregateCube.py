@@ -0,0 +1,250 @@
+import os
+import glob
+import json
+import shutil
+import pandas as pd
+from function.datasetStore import PARTITION_COLUMNS, write_partitions, read_partitions
+from function.visitKey import KEY_VERSION, PATIENT_KEY_COLUMNS, hash_key
+from function.dateNormalizer import normalize_dates
+from function.distinctSketch import SKETCH_COLUMN, build_sketches, merge_sketches, estimate_sketches
+
+# --------------------------------------------------------------------
+# Materialized aggregate cubes for summary reports and charts
+# --------------------------------------------------------------------
+
+# Default cube grain for drug transaction reports (stored per Month partition)
+CUBE_DIMENSIONS = ["Hospital Site", "Item Description", "Clinic", "Doctor Name"]
+CUBE_MEASURES = ["Revenue", "Med_Days", "Med_Qty"]
+CUBE_PARTITION_COLUMNS = ["Month"]
+# Stored cubes keep one HyperLogLog sketch of patients per cell (2^12 registers, ~2% error);
+# distinct_error=None stores exact per-patient rows instead, close to transaction grain
+CUBE_DISTINCT_ERROR = 0.02
+
+MANIFEST_FILE = "_manifest.json"  # "_" prefix: ignored by dataset discovery
+MANIFEST_VERSION_KEY = "_key_version"
+MANIFEST_ERROR_KEY = "_distinct_error"
+
+
+def add_month_column(df, date_column="VisitDate", month_column="Month"):
+    """Add month_column as 'YYYY-MM' text from date_column (any format normalize_dates accepts)."""
+    df[month_column] = normalize_dates(df[date_column]).dt.strftime("%Y-%m")
+    return df
+
+
+def build_cube(df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES, patient_columns=PATIENT_KEY_COLUMNS,
+               distinct_error=None):
+    """
+    Aggregate transactions to one row per dimension combination.
+
+    With distinct_error, each cell holds one HyperLogLog 'Sketch' of its patients
+    (see distinctSketch): sketches of any roll-up or month range are merged, counts
+    are within that error. Without it, the cell is split into one row per patient
+    with a 64-bit 'Patient' key (a hash of patient_columns), so counts are exact but
+    the cube is nearly as long as the transactions at a fine grain.
+
+    Parameters:
+        df (pd.DataFrame): Transactions.
+        dimensions (list): Grouping columns of the cube.
+        measures (list): Numeric columns to sum.
+        patient_columns (list, optional): Columns identifying a patient; None builds
+                                          a cube without distinct-patient counts.
+        distinct_error (float, optional): Relative error for approximate patient counts.
+
+    Returns:
+        pd.DataFrame: dimensions (+ 'Patient') + 'Transactions' + measures (+ 'Sketch').
+    """
+    keys = list(dimensions)
+    missing = [col for col in keys + list(measures) if col not in df.columns]
+    if missing:
+        raise KeyError(f"Cube columns not found in DataFrame: {missing}")
+
+    frame = df[keys].copy()
+    sketched = bool(patient_columns) and distinct_error is not None
+    if patient_columns and not sketched:
+        frame["Patient"] = hash_key(df, list(patient_columns))
+        keys = keys + ["Patient"]
+    for col in measures:
+        frame[col] = pd.to_numeric(df[col], errors="coerce")
+    frame["Transactions"] = 1
+
+    cube = frame.groupby(keys, sort=False, dropna=False, observed=True)[["Transactions"] + list(measures)].sum()
+    cube = cube.reset_index()
+    if sketched:
+        cube = cube.merge(build_sketches(df, keys, patient_columns, distinct_error), on=keys, how="left")
+    return cube
+
+
+def rollup_cube(cube, group_by, measures=CUBE_MEASURES, dropna=True):
+    """
+    Roll cube rows up to group_by: measures and Transactions are summed, 'Patients'
+    is the number of distinct patient keys, or the estimate of the merged sketches
+    (when the cube has them). Like groupby,
+    rows with a missing group_by value are left out unless dropna=False.
+    """
+    group_by = list(group_by)
+    grouped = cube.groupby(group_by, dropna=dropna, observed=True)
+    result = grouped[["Transactions"] + list(measures)].sum()
+    if "Patient" in cube.columns:
+        result.insert(0, "Patients", grouped["Patient"].nunique())
+    elif SKETCH_COLUMN in cube.columns:
+        merged = merge_sketches(cube, group_by)
+        patients = pd.Series(estimate_sketches(merged), index=merged.set_index(group_by).index)
+        result.insert(0, "Patients", patients.reindex(result.index).to_numpy())
+    return result.reset_index()
+
+
+def update_cube(df, cube_root, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES,
+                patient_columns=PATIENT_KEY_COLUMNS, partition_cols=CUBE_PARTITION_COLUMNS,
+                distinct_error=CUBE_DISTINCT_ERROR):
+    """
+    Build the cube rows for df and store them under cube_root, one partition per
+    value of partition_cols (e.g. Month=2024-04). Partitions present in df are
+    replaced as a whole, so loading a new month only touches that month; re-running
+    a month replaces it instead of double counting. Patients are sketched unless
+    distinct_error=None (exact per-patient rows, see build_cube).
+
+    Returns:
+        list: The partition folders that were written.
+    """
+    partition_cols = list(partition_cols)
+    if "Month" in partition_cols and "Month" not in df.columns:
+        df = add_month_column(df.copy())
+    cube_dimensions = partition_cols + [col for col in dimensions if col not in partition_cols]
+    cube = build_cube(df, cube_dimensions, measures, patient_columns, distinct_error)
+    if len(df):
+        print(f"  cube rows: {len(cube):,} for {len(df):,} source rows ({len(cube) / len(df):.1%})")
+    return write_partitions(cube, cube_root, partition_cols)
+
+
+def query_cube(cube_root, group_by, measures=CUBE_MEASURES, filters=None, partition_cols=CUBE_PARTITION_COLUMNS,
+               dropna=True):
+    """
+    Summary by group_by from a stored cube, reading only the needed partitions and columns.
+
+    Parameters:
+        cube_root (str): Cube folder written by update_cube / refresh_cube.
+        group_by (list): Cube dimensions (or partition columns) to report on.
+        measures (list): Measures to sum.
+        filters (dict, optional): {partition column: value or list}, e.g. {"Month": ["2024-01", "2024-02"]}.
+
+    Returns:
+        pd.DataFrame: group_by + 'Patients' (if the cube has patient keys) + 'Transactions' + measures.
+    """
+    import pyarrow.parquet as pq
+
+    first_file = next(iter(glob.glob(os.path.join(cube_root, "**", "*.parquet"), recursive=True)), None)
+    stored = set(pq.read_schema(first_file).names) if first_file else set()
+    columns = list(dict.fromkeys(list(group_by) + ["Transactions"] + list(measures)))
+    columns += [col for col in ("Patient", SKETCH_COLUMN) if col in stored]
+
+    cube = read_partitions(cube_root, filters=filters, columns=columns, partition_cols=partition_cols)
+    return rollup_cube(cube, group_by, measures, dropna)
+
+
+def _source_partitions(dataset_root, partition_cols):
+    """{partition folder relative to dataset_root: newest file mtime} for every leaf partition."""
+    pattern = os.path.join(dataset_root, *[f"{col}=*" for col in partition_cols])
+    partitions = {}
+    for folder in glob.glob(pattern):
+        files = glob.glob(os.path.join(folder, "*.parquet"))
+        if files:
+            partitions[os.path.relpath(folder, dataset_root)] = max(os.path.getmtime(f) for f in files)
+    return partitions
+
+
+def _clear_cube(cube_root):
+    """Remove every cube partition (the manifest is rewritten by the caller)."""
+    for entry in os.listdir(cube_root):
+        if entry != MANIFEST_FILE:
+            shutil.rmtree(os.path.join(cube_root, entry), ignore_errors=True)
+
+
+def _refresh_from_file(path, cube_root, manifest, dimensions, measures, patient_columns, partition_cols,
+                       distinct_error):
+    """Rebuild the cube from a single Parquet file when the file changed (the file is only read)."""
+    import pyarrow.parquet as pq
+
+    key = os.path.basename(path)
+    mtime = os.path.getmtime(path)
+    if manifest.get(key) == mtime:
+        return 0
+    present = set(pq.read_schema(path).names)
+    partition_cols = [col for col in partition_cols if col in present]
+    if not partition_cols:
+        raise KeyError(f"{path} has none of the partition columns; the cube cannot be partitioned")
+
+    needed = partition_cols + list(dimensions) + list(measures) + list(patient_columns or [])
+    df = pd.read_parquet(path, columns=list(dict.fromkeys(needed)))
+    _clear_cube(cube_root)
+    manifest.clear()
+    update_cube(df, cube_root, dimensions, measures, patient_columns, partition_cols, distinct_error)
+    manifest[key] = mtime
+    return 1
+
+
+def refresh_cube(dataset_root, cube_root, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES,
+                 patient_columns=PATIENT_KEY_COLUMNS, partition_cols=PARTITION_COLUMNS,
+                 distinct_error=CUBE_DISTINCT_ERROR):
+    """
+    Bring a cube up to date with a partitioned dataset (see datasetStore).
+
+    The cube uses the dataset's partitions. A manifest in cube_root records the
+    files' modification time of every source partition already aggregated; only new
+    or rewritten partitions (e.g. the month that just landed) are read, and cube
+    partitions whose source partition was removed are dropped.
+
+    dataset_root may also be a single Parquet file (e.g. a combined_all.parquet that
+    was never partitioned). It is read as-is, never rewritten: the cube is partitioned
+    by the partition_cols the file contains and rebuilt whenever the file changes.
+    A cube built with another distinct_error (or patient key version) is rebuilt.
+
+    Returns:
+        int: Number of source partitions (re)aggregated.
+    """
+    partition_cols = list(partition_cols)
+    manifest_path = os.path.join(cube_root, MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    settings = {MANIFEST_VERSION_KEY: KEY_VERSION, MANIFEST_ERROR_KEY: distinct_error}
+    stored = {key: manifest.pop(key, None) for key in settings}
+    if manifest and stored != settings:
+        # Patient keys were hashed differently or sketched at another error: re-aggregate every partition
+        print(f"Cube {cube_root} was built with other patient keys or sketches; rebuilding it")
+        _clear_cube(cube_root)
+        manifest = {}
+
+    os.makedirs(cube_root, exist_ok=True)
+    if os.path.isfile(dataset_root):
+        changed = _refresh_from_file(dataset_root, cube_root, manifest, dimensions, measures, patient_columns,
+                                     partition_cols, distinct_error)
+    else:
+        sources = _source_partitions(dataset_root, partition_cols)
+        if os.path.basename(dataset_root) in manifest:
+            # The cube was built from the single file this dataset replaced
+            _clear_cube(cube_root)
+            manifest = {}
+        changed_parts = [part for part, mtime in sorted(sources.items()) if manifest.get(part) != mtime]
+
+        needed = [col for col in list(dimensions) + list(measures) + list(patient_columns or [])
+                  if col not in partition_cols]
+        for part in changed_parts:
+            part_df = pd.read_parquet(os.path.join(dataset_root, part), columns=list(dict.fromkeys(needed)))
+            for segment in part.split(os.sep):
+                col, value = segment.split("=", 1)
+                part_df[col] = value
+            update_cube(part_df, cube_root, dimensions, measures, patient_columns, partition_cols, distinct_error)
+            manifest[part] = sources[part]
+
+        for part in [part for part in manifest if part not in sources]:
+            shutil.rmtree(os.path.join(cube_root, part), ignore_errors=True)
+            del manifest[part]
+        changed = len(changed_parts)
+
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({**settings, **manifest}, f, ensure_ascii=False, indent=1)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    print(f"Cube {cube_root}: {changed} partition(s) refreshed, {len(manifest)} in total")
+    return changed
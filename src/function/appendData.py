@@ -1,13 +1,15 @@
 import pandas as pd
 import os
-from function.import_data import *
+from function.import_data import load_parquet
+from function.accumulator import FrameAccumulator
+from function.dateNormalizer import normalize_dates
 
 def load_filter_and_merge_data(file_paths, year_filters):
     """
     Load multiple Excel files, filter each by VisitDate year if a year filter is provided, and merge them.
     If 'None' is provided as a filter, no year filtering is done for that file.
     """
-    merged_data = pd.DataFrame()
+    accumulator = FrameAccumulator("load_filter_and_merge_data")
     
     for file_path, year_filter in zip(file_paths, year_filters):
         if file_path:  # Ensure the file path is not empty
@@ -19,9 +21,9 @@ def load_filter_and_merge_data(file_paths, year_filters):
                 data = data[data['VisitDate'].dt.year == year_filter]
             
             # Append data without filtering if year_filter is None
-            merged_data = pd.concat([merged_data, data], ignore_index=True)
+            accumulator.add(data)
     
-    return merged_data
+    return accumulator.result()
 
 def combine_df(dfs, axis=0):
     """Combine multiple DataFrames along a specified axis (0 for rows, 1 for columns)."""
@@ -78,9 +80,7 @@ def process_spen_payor_files(hospital_sites, config):
         
         # Convert VisitDate to datetime if the column exists
         if 'VisitDate' in payor_data.columns:
-            payor_data['VisitDate'] = pd.to_datetime(
-                payor_data['VisitDate'], origin='1899-12-30', unit='D'
-            )
+            payor_data['VisitDate'] = normalize_dates(payor_data['VisitDate'], source=f'{site}SpenPayor')
         # Ensure 'Clinic' column is present and convert to string for all sites
         if 'Clinic' in payor_data.columns:
             payor_data['Clinic'] = payor_data['Clinic'].astype(str)
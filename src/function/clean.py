@@ -1,19 +1,26 @@
 import pandas as pd
 import json
 import sys
-from function.config import load_config
-
-# Load configurations from the JSON file
-config_path = "/Users/jinjuthatedcharoen/Documents/PPG/P'Aim/DM analysis-Prescription v2/Drug-Prescription/src/version6/config.json"
-config = load_config(config_path)
-
-COLUMN_RENAME_CONFIG = config['column_rename_config']
-VALUE_REPLACE_CONFIG = config['value_replace_config']
-
-COLUMN_RENAME_DRUG_RECEIVE_CONFIG = config['column_rename_drug_receive_config']
+from function.configService import shared_config
+from function.compactFrame import astype_str, replace_series_values
+from function.dateNormalizer import normalize_date_columns
+from function.rowDedup import dedup_columns, first_occurrence, row_fingerprints
+
+__all__ = [
+    "rename_columns", "replace_values", "change_data_types", "rename_spen_drug_receive_columns",
+    "change_spen_drug_receive_data_types", "change_hn_data_types", "remove_duplicate_row",
+    "process_data", "process_spen_drug_receive_data", "process_hn_data", "select_columns",
+    "rename_pharma",
+]
+
+# Prescription config (column renames / value replacements): its path is "PRESCRIPTION_CONFIG_PATH"
+# in config/config.json; read on first use, not at import
+def _clean_config(key):
+    config_path = shared_config(required_keys=["PRESCRIPTION_CONFIG_PATH"])["PRESCRIPTION_CONFIG_PATH"]
+    return shared_config(config_path, required_keys=[key])[key]
 
 def rename_columns(data, folder):
-    for key, rename_dict in COLUMN_RENAME_CONFIG.items():
+    for key, rename_dict in _clean_config('column_rename_config').items():
         if key in folder:
             data = data.rename(columns=rename_dict)
     return data
@@ -29,51 +36,39 @@ def replace_values(data, folder, subfolder):
     if subfolder == "HN":
         return data
     
-    for key, replace_dict in VALUE_REPLACE_CONFIG.items():
+    for key, replace_dict in _clean_config('value_replace_config').items():
         if key in folder:
             for column, replacements in replace_dict.items():
                 if column in data.columns:
-                    data[column] = data[column].replace(replacements)
+                    data[column] = replace_series_values(data[column], replacements)
     return data
 
 def change_data_types(data, subfolder):
     # print("Columns before changing data types:", data.columns)  # Debugging
     
     if 'Med_Dose' in data.columns:
-        data['Med_Dose'] = data['Med_Dose'].astype(str)
+        data['Med_Dose'] = astype_str(data['Med_Dose'])
     if 'Right Code' in data.columns:
-        data['Right Code'] = data['Right Code'].astype(str)
+        data['Right Code'] = astype_str(data['Right Code'])
     if 'Clinic' in data.columns:
-        data['Clinic'] = data['Clinic'].astype(str)
-    if 'VisitDate' in data.columns:
-        data['VisitDate'] = pd.to_datetime(data['VisitDate'], origin='1899-12-30', unit='D')
-    if 'AppointmentDatetime' in data.columns:
-        data['AppointmentDatetime'] = pd.to_numeric(data['AppointmentDatetime'], errors='coerce')
-        data['AppointmentDatetime'] = pd.to_datetime(data['AppointmentDatetime'], origin='1899-12-30', unit='D', errors='coerce')
-    
-    if 'Finish_Medicine' in data.columns:
-        if 'Hospital Site' in data.columns and data['Hospital Site'].isin(['PT3', 'PLS']).any():
-            data['Finish_Medicine'] = pd.to_datetime(data['Finish_Medicine'], errors='coerce')
-        else:
-            data['Finish_Medicine'] = pd.to_numeric(data['Finish_Medicine'], errors='coerce')
-            data['Finish_Medicine'] = pd.to_datetime(data['Finish_Medicine'], origin='1899-12-30', unit='D', errors='coerce')
+        data['Clinic'] = astype_str(data['Clinic'])
+    # Excel serials, date strings (PT3 / PLS Finish_Medicine) or both; unparseable values become NaT
+    normalize_date_columns(data, ['VisitDate', 'AppointmentDatetime', 'Finish_Medicine'], source=subfolder)
             
     if 'VN' in data.columns:
-        data['VN'] = data['VN'].astype(str)
+        data['VN'] = astype_str(data['VN'])
         
     if subfolder == "HN":
-        if 'VISITDATE' in data.columns:
-            data['VISITDATE'] = pd.to_datetime(data['VISITDATE'], origin='1899-12-30', unit='D')
-        if 'FirstDateClinic' in data.columns:
-            data['FirstDateClinic'] = pd.to_datetime(data['FirstDateClinic'], origin='1899-12-30', unit='D')
+        normalize_date_columns(data, ['VISITDATE', 'FirstDateClinic'], source=subfolder)
         
     # print("Columns after changing data types:", data.columns)  # Debugging
     return data
 
 def rename_spen_drug_receive_columns(data, folder):
     # print(f"Received folder: '{folder}'")  # Debugging line
-    if folder in COLUMN_RENAME_DRUG_RECEIVE_CONFIG:
-        rename_dict = COLUMN_RENAME_DRUG_RECEIVE_CONFIG[folder]
+    rename_config = _clean_config('column_rename_drug_receive_config')
+    if folder in rename_config:
+        rename_dict = rename_config[folder]
         # print(f"Renaming columns for {folder} using {rename_dict}")
         data = data.rename(columns=rename_dict)
         # print(f"After renaming: {data.columns}")
@@ -84,14 +79,10 @@ def rename_spen_drug_receive_columns(data, folder):
 def change_spen_drug_receive_data_types(data):
     # print("Columns before changing data types:", data.columns)  # Debugging
     if 'Clinic' in data.columns:
-        data['Clinic'] = data['Clinic'].astype(str)
-    if 'VisitDate' in data.columns:
-        data['VisitDate'] = pd.to_datetime(data['VisitDate'], origin='1899-12-30', unit='D')
-    if 'AppointmentDatetime' in data.columns:
-        data['AppointmentDatetime'] = pd.to_numeric(data['AppointmentDatetime'], errors='coerce')
-        data['AppointmentDatetime'] = pd.to_datetime(data['AppointmentDatetime'], origin='1899-12-30', unit='D', errors='coerce')
+        data['Clinic'] = astype_str(data['Clinic'])
+    normalize_date_columns(data, ['VisitDate', 'AppointmentDatetime'], source='SpenDrugReceive')
     if 'VN' in data.columns:
-        data['VN'] = data['VN'].astype(str)
+        data['VN'] = astype_str(data['VN'])
         
     # print("Columns after changing data types:", data.columns)  # Debugging
     return data
@@ -99,40 +90,39 @@ def change_spen_drug_receive_data_types(data):
 def change_hn_data_types(data):
     # print("Columns before changing data types:", data.columns)  # Debugging
     if 'Clinic' in data.columns:
-        data['Clinic'] = data['Clinic'].astype(str)
-    if 'VISITDATE' in data.columns:
-        data['VISITDATE'] = pd.to_datetime(data['VISITDATE'], origin='1899-12-30', unit='D')
-    if 'CreatePatient' in data.columns:
-        data['CreatePatient'] = pd.to_datetime(data['CreatePatient'], origin='1899-12-30', unit='D')
-    if 'FirstDateClinic' in data.columns:
-        data['FirstDateClinic'] = pd.to_datetime(data['FirstDateClinic'], origin='1899-12-30', unit='D')
+        data['Clinic'] = astype_str(data['Clinic'])
+    normalize_date_columns(data, ['VISITDATE', 'CreatePatient', 'FirstDateClinic'], source='HN')
     if 'VN' in data.columns:
-        data['VN'] = data['VN'].astype(str)
+        data['VN'] = astype_str(data['VN'])
 
     # print("Columns after changing data types:", data.columns)  # Debugging
     return data
 
-def remove_duplicate_row(data):
-    data = data.drop_duplicates(keep='first')
-    return data
+def remove_duplicate_row(data, dataset=None, deduplicator=None, source=None):
+    # Rows are compared by a 64-bit fingerprint of the dataset's key columns (config/dedup.json);
+    # a RowDeduplicator also drops rows already seen in other files (and runs, with its index)
+    if deduplicator is not None:
+        return deduplicator.drop(data, source)
+    keep = first_occurrence(row_fingerprints(data, dedup_columns(dataset, data.columns)))
+    return data if keep.all() else data[keep]
 
-def process_data(data, folder, subfolder):
+def process_data(data, folder, subfolder, deduplicator=None, source=None):
     data = rename_columns(data, folder)
     data = replace_values(data, folder, subfolder)
     data['from_report'] = subfolder
     data = change_data_types(data, subfolder)
-    data = remove_duplicate_row(data)
+    data = remove_duplicate_row(data, subfolder, deduplicator, source)
     return data
 
-def process_spen_drug_receive_data(data, folder):
+def process_spen_drug_receive_data(data, folder, deduplicator=None, source=None):
     data = rename_spen_drug_receive_columns(data, folder)
     data = change_spen_drug_receive_data_types(data)
-    data = remove_duplicate_row(data)
+    data = remove_duplicate_row(data, 'SpenDrugReceive', deduplicator, source)
     return data
 
-def process_hn_data(data):
+def process_hn_data(data, deduplicator=None, source=None):
     data = change_hn_data_types(data)
-    data = remove_duplicate_row(data)
+    data = remove_duplicate_row(data, 'HN', deduplicator, source)
     return data
 
 # def clean_colname(df):
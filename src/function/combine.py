@@ -2,6 +2,12 @@ import os
 import glob
 import pandas as pd
 import re
+from function.datasetStore import PARTITION_COLUMNS, migrate_single_file, write_partitions
+from function.schemaRegistry import apply_schema, get_schema, read_with_schema
+
+__all__ = [
+    "extract_month_from_filename", "read_converted_file", "combine_excel_files_to_parquet",
+]
 
 def extract_month_from_filename(filename: str) -> str:
         """
@@ -19,36 +25,62 @@ def extract_month_from_filename(filename: str) -> str:
             return month_map.get(mon_abbr, "Unknown")
         return "Unknown"
 
+def read_converted_file(file_path: str, columns: list = None) -> pd.DataFrame:
+    """
+    Read one converted file. Parquet files are read natively (only the requested
+    columns that exist in the file are loaded); anything else goes through read_excel.
+    """
+    if file_path.lower().endswith(".parquet"):
+        if columns is not None:
+            import pyarrow.parquet as pq
+            available = set(pq.read_schema(file_path).names)
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(file_path, columns=columns)
+    return pd.read_excel(file_path)
+
 def combine_excel_files_to_parquet(
     input_folder: str,
     output_folder: str,
     output_filename: str = "combined.parquet",
     file_extension: str = "xlsx",
     custom_columns: list = None,
-    extra_columns: dict = None
+    extra_columns: dict = None,
+    category: str = None
 ) -> pd.DataFrame:
     """
     Combine multiple Excel files from the input_folder into one DataFrame,
     ensuring column alignment and consistent data types, and export the result
-    to a Parquet file in the output_folder.
+    to a partitioned Parquet dataset in the output_folder.
     
     Steps:
-        0. Optionally select custom needed columns if provided.
-        1. Recheck if column names are aligned, fixing mismatches.
-        2. Recheck data types, converting if needed.
+        0. Read only the needed columns (the category's schema, or custom_columns).
+        1-2. Align column names, order and data types to the category's schema from
+             config/schema_registry.json in one step, reporting cast failures per file.
         3. Combine all DataFrames.
-        4. Export the combined DataFrame to a Parquet file.
+        4. Write the combined DataFrame into the Hive-partitioned dataset
+           (Year/BU/DataCategory/Month), overwriting only the partitions it contains.
     
     Parameters:
         input_folder (str): Path to the folder containing Excel files.
         output_folder (str): Path to the folder where the combined file will be saved.
-        output_filename (str): Name of the output Parquet file. Default is 'combined.parquet'.
+        output_filename (str): Name of the partitioned dataset folder. Default is 'combined.parquet'.
+                               A legacy single file with this name is migrated on first use when
+                               its Year can be read from a date column; otherwise it must be
+                               migrated once by hand (see datasetStore.migrate_single_file).
         file_extension (str): Extension of the files to search for (default is 'xlsx').
+                              Use 'parquet' for files written by the converters with
+                              output_format='parquet'; they are read without the XLSX round trip.
         custom_columns (list): Optional list of columns to select from each file. 
-                               If None, all columns in the files will be used.
+                               If None, all schema columns are used.
+        extra_columns (dict): Constant columns to add, e.g. {"Year": "2024", "BU": "PLC",
+                              "DataCategory": "INV_VALUE"}. Month always comes from the file name.
+                              Year, BU and DataCategory are required: they are the partition
+                              this run replaces.
+        category (str): Schema registry category. Defaults to extra_columns["DataCategory"];
+                        without a registered schema the first file's columns and dtypes are used.
     
     Returns:
-        pd.DataFrame: The combined DataFrame.
+        pd.DataFrame: The DataFrame combined in this run (not the whole dataset).
     """
     
     # Create the output folder if it doesn't exist
@@ -60,23 +92,29 @@ def combine_excel_files_to_parquet(
     excel_files = glob.glob(pattern)
     print(f"Found {len(excel_files)} {file_extension} files in {input_folder}.")
     
+    if category is None and extra_columns is not None:
+        category = extra_columns.get("DataCategory")
+    schema = get_schema(category) if category else None
+    if schema is None:
+        print(f"No registered schema for category {category!r}; using the first file's columns and dtypes.")
+
     dfs = []              # List to store processed DataFrames
-    expected_columns = None  # To store the expected column order
-    expected_dtypes = None   # To store the expected data types
+    cast_report = {}      # {file name: {column: values that failed to cast}}
     
     for file in excel_files:
         print(f"Processing file: {file}")
-        # Read the current Excel file
-        df = pd.read_excel(file)
-            
-        # Step 0: Optionally select custom needed columns if provided
-        if custom_columns is not None:
-            missing = set(custom_columns) - set(df.columns)
-            if missing:
-                print(f"Warning: The file {file} is missing columns: {missing}. They will be filled with NaN.")
-                for col in missing:
-                    df[col] = None
-            df = df.loc[:, custom_columns]  # Select and reorder columns
+        
+        # Steps 0-2: Read only the needed columns and align names, order and dtypes in one pass
+        if schema is None:
+            df = read_converted_file(file, columns=custom_columns)
+            schema = {col: str(dtype) for col, dtype in df.dtypes.items()}
+            if custom_columns is not None:
+                schema = {col: schema.get(col, "string") for col in custom_columns}
+            df, report = apply_schema(df, schema, source=os.path.basename(file))
+        else:
+            df, report = read_with_schema(file, schema, columns=custom_columns)
+        if report["cast_failures"]:
+            cast_report[os.path.basename(file)] = report["cast_failures"]
             
         # Step 0.5: Optionally add extra columns with constant values
         if extra_columns is not None:
@@ -88,50 +126,33 @@ def combine_excel_files_to_parquet(
         current_month = extract_month_from_filename(os.path.basename(file))
         df["Month"] = current_month
         
-        # For the first file, store expected column names and data types
-        if expected_columns is None:
-            expected_columns = df.columns
-            expected_dtypes = df.dtypes.to_dict()
-        else:
-            # Step 1: Recheck if column names are aligned, and fix if necessary
-            if set(df.columns) != set(expected_columns):
-                print(f"Column mismatch found in {file}. Aligning columns...")
-                missing_cols = set(expected_columns) - set(df.columns)
-                for col in missing_cols:
-                    df[col] = None
-                extra_cols = set(df.columns) - set(expected_columns)
-                if extra_cols:
-                    print(f"Dropping extra columns in {file}: {extra_cols}")
-                    df = df.drop(columns=list(extra_cols))
-                # Reorder columns to match the expected order
-                df = df[expected_columns]
-        
-        # Step 2: Recheck and fix data types for consistency
-        for col, expected_type in expected_dtypes.items():
-            if df[col].dtype != expected_type:
-                try:
-                    df[col] = df[col].astype(expected_type)
-                except Exception as e:
-                    print(f"Warning: Could not convert column '{col}' in {file} to {expected_type}. Error: {e}")
-        
         dfs.append(df)
+
+    if cast_report:
+        print(f"Cast failures in {len(cast_report)} of {len(excel_files)} file(s):")
+        for file_name, failures in cast_report.items():
+            print(f"  {file_name}: {failures}")
     
     # Step 3: Combine all DataFrames into one
     new_combined_df = pd.concat(dfs, ignore_index=True)
     print(f"New combined DataFrame shape: {new_combined_df.shape}")
     
-    # Determine output file path
-    output_file = os.path.join(output_folder, output_filename)
-    
-    # Step 4: Append to existing data if the output Parquet file exists
-    if os.path.exists(output_file):
-        print("Output file exists. Appending new data to existing data.")
-        existing_df = pd.read_parquet(output_file)
-        combined_df = pd.concat([existing_df, new_combined_df], ignore_index=True)
-    else:
-        combined_df = new_combined_df
-    
-    combined_df.to_parquet(output_file, index=False)
-    print(f"Combined DataFrame exported to {output_file}")
+    # Step 4: Overwrite this run's partitions in the Hive-partitioned dataset
+    #         (<output_folder>/<output_filename>/Year=/BU=/DataCategory=/Month=). Re-running a BU-month
+    #         replaces only that partition instead of rewriting and duplicating the whole history.
+    dataset_root = os.path.join(output_folder, output_filename)
+
+    # Rows without their partition values would sit in partitions no later run replaces
+    missing = [col for col in PARTITION_COLUMNS if col not in new_combined_df.columns]
+    if missing:
+        raise KeyError(f"Partition columns {missing} not provided; pass them in extra_columns")
+
+    # A legacy single file was appended to by every run and year: only its DataCategory is known to be
+    # this run's; its Year must come from a date column (or a one-off migration, see migrate_single_file)
+    date_column = next((col for col, dtype in (schema or {}).items() if dtype == "datetime"), None)
+    migrate_single_file(dataset_root, values={"DataCategory": (extra_columns or {}).get("DataCategory")},
+                        date_column=date_column)
+    write_partitions(new_combined_df, dataset_root)
+    print(f"Combined DataFrame exported to {dataset_root}")
     
-    return combined_df
\ No newline at end of file
+    return new_combined_df
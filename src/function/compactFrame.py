@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------
+# Compact-frame mode: low-cardinality text columns as pandas categoricals
+# --------------------------------------------------------------------
+
+# Text columns repeated on every SpenDrug row; stored once per distinct value when compacted
+COMPACT_COLUMNS = [
+    "Hospital Site", "Clinic", "ClinicName", "Doctor Name", "Item Code",
+    "UOM", "Payor Code", "Right Name", "site_type", "site_op",
+]
+
+
+def is_categorical(series):
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def compact_frame(df, columns=COMPACT_COLUMNS):
+    """
+    Convert the given text columns (those present in df) to categoricals.
+
+    Returns:
+        pd.DataFrame: The same frame with the columns converted in place.
+    """
+    for col in columns:
+        if col in df.columns and not is_categorical(df[col]):
+            if df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+                df[col] = df[col].astype("category")
+    return df
+
+
+def map_categories(series, func):
+    """
+    Apply func (a function or a dict) to each distinct value of a categorical
+    (missing values included) instead of to every row; values mapping to the same
+    result are merged. Non-categorical series are mapped with series.map(func).
+    """
+    if not is_categorical(series):
+        return series.map(func)
+    if isinstance(func, dict):
+        func = func.get
+
+    categories = series.cat.categories.to_numpy(dtype=object)
+    codes = series.cat.codes.to_numpy()
+    mapped = np.array([func(value) for value in categories] + [func(np.nan)], dtype=object)
+    codes = np.where(codes == -1, len(categories), codes)
+
+    # Missing results get code -1 from factorize
+    inverse, new_categories = pd.factorize(mapped)
+    return pd.Series(pd.Categorical.from_codes(inverse[codes], categories=pd.Index(new_categories)),
+                     index=series.index, name=series.name)
+
+
+def astype_str(series):
+    """series.astype(str), keeping categoricals encoded (missing values become 'nan' as before)."""
+    if is_categorical(series):
+        return map_categories(series, str)
+    return series.astype(str)
+
+
+def replace_series_values(series, replacements):
+    """series.replace(replacements) for exact-value replacements, done on the categories when compact."""
+    if is_categorical(series):
+        return map_categories(series, lambda value: replacements.get(value, value))
+    return series.replace(replacements)
+
+
+def str_strip(series):
+    """series.astype(str).str.strip(), done on the categories when compact."""
+    if is_categorical(series):
+        return map_categories(series, lambda value: str(value).strip())
+    return series.astype(str).str.strip()
+
+
+def decode(series):
+    """Return a categorical as plain object values (e.g. before string concatenation with +)."""
+    if is_categorical(series):
+        return series.astype(object)
+    return series
+
+
+def concat_frames(frames):
+    """
+    pd.concat(frames, ignore_index=True) that keeps categorical columns categorical.
+
+    pandas falls back to object when the frames' categories differ, so each
+    categorical column is first given the union of all frames' categories.
+    """
+    categorical_cols = [col for col in dict.fromkeys(c for f in frames for c in f.columns)
+                        if any(col in f.columns and is_categorical(f[col]) for f in frames)]
+
+    if categorical_cols:
+        frames = [f.copy() for f in frames]
+        for col in categorical_cols:
+            values = [f[col].cat.categories if is_categorical(f[col]) else pd.Index(f[col].dropna().unique())
+                      for f in frames if col in f.columns]
+            dtype = pd.CategoricalDtype(pd.Index(np.concatenate([v.to_numpy(dtype=object) for v in values])).unique())
+            for f in frames:
+                if col in f.columns:
+                    f[col] = f[col].astype(dtype)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def write_compact_parquet(df, path, columns=COMPACT_COLUMNS):
+    """
+    Write df to Parquet with the compact columns stored as dictionary types, so
+    they load back as categoricals even if df still holds them as plain strings.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for col in columns:
+        if col in table.column_names and not pa.types.is_dictionary(table.schema.field(col).type):
+            index = table.schema.get_field_index(col)
+            table = table.set_column(index, col, table.column(col).dictionary_encode())
+
+    pq.write_table(table, path, compression="zstd")
+    print(f"Saved {len(df):,} rows ({memory_mb(df):,.1f} MB in memory) → {path}")
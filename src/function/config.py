@@ -1,16 +1,17 @@
-import json
+import os
+from function.configService import get_config
 
 # Function to load data from an config.json path
 def load_config(config_path):
-    """Load configuration from a JSON file."""
+    """
+    Load configuration from a JSON file (parsed once per process, see function.configService).
+    A relative config_path is taken against the working directory, as before.
+    """
     try:
-        with open(config_path, 'r') as file:
-            config = json.load(file)
-        # print("Loaded configuration:", {config_path})
-        return config
+        return get_config(os.path.abspath(config_path))
     except FileNotFoundError:
         print(f"Configuration file not found at {config_path}")
         return None
-    except json.JSONDecodeError:
-        print(f"Error decoding JSON from the configuration file at {config_path}")
-        return None
\ No newline at end of file
+    except ValueError as e:
+        print(e)
+        return None
@@ -0,0 +1,87 @@
+import os
+import copy
+import json
+
+# --------------------------------------------------------------------
+# Config service: each JSON config is parsed and validated once per process
+# --------------------------------------------------------------------
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+MAIN_CONFIG_PATH = "config/config.json"
+
+_cache = {}      # absolute path -> (mtime, config)
+_snapshot = {}   # absolute path -> config, installed in worker processes
+
+
+def resolve_path(path, root=PROJECT_ROOT):
+    """Absolute path of path; relative paths are taken against the project root, not the working directory."""
+    path = os.path.expanduser(str(path))
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(root, path))
+
+
+def _validate(config, path, required_keys):
+    if not isinstance(config, dict):
+        raise ValueError(f"Configuration {path} must be a JSON object, got {type(config).__name__}")
+    missing = [key for key in required_keys if key not in config]
+    if missing:
+        raise KeyError(f"Configuration {path} is missing keys: {missing}")
+
+
+def get_config(path=MAIN_CONFIG_PATH, required_keys=()):
+    """
+    Parsed JSON config, read from disk only the first time and again after the file changes.
+
+    Parameters:
+        path (str): Config file; relative paths are resolved against PROJECT_ROOT.
+        required_keys (iterable, optional): Top-level keys the config must have.
+
+    Returns:
+        dict: A copy of the cached config, so callers may modify it freely.
+    """
+    return copy.deepcopy(shared_config(path, required_keys))
+
+
+def shared_config(path=MAIN_CONFIG_PATH, required_keys=()):
+    """
+    Like get_config, but the cached object itself (no copy). For readers that only look
+    values up, e.g. on every file or row group; it must never be modified.
+    """
+    abs_path = resolve_path(path)
+    if abs_path in _snapshot:
+        config = _snapshot[abs_path]
+    else:
+        mtime = os.path.getmtime(abs_path)
+        cached = _cache.get(abs_path)
+        if cached is not None and cached[0] == mtime:
+            config = cached[1]
+        else:
+            with open(abs_path, "r", encoding="utf-8") as f:
+                try:
+                    config = json.load(f)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Error decoding JSON from the configuration file at {abs_path}: {e}") from e
+            _validate(config, abs_path, ())
+            _cache[abs_path] = (mtime, config)
+    _validate(config, abs_path, required_keys)
+    return config
+
+
+def clear_config_cache():
+    """Forget every cached config (and an installed snapshot)."""
+    _cache.clear()
+    _snapshot.clear()
+
+
+def config_snapshot():
+    """The configs loaded so far as a plain {absolute path: config} dict, cheap to pickle once per worker."""
+    snapshot = dict(_snapshot)
+    snapshot.update({path: config for path, (_, config) in _cache.items()})
+    return snapshot
+
+
+def install_snapshot(snapshot):
+    """
+    ProcessPoolExecutor initializer: serve the parent's configs without touching the disk, e.g.
+        ProcessPoolExecutor(max_workers, initializer=install_snapshot, initargs=(config_snapshot(),))
+    """
+    _snapshot.update(snapshot)
@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+import functools
+
+# Manifest entries live next to the converted files, one JSON per source file,
+# so parallel workers writing into the same output folder never share a file.
+MANIFEST_DIRNAME = ".convert_manifest"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_content_hash(file_path):
+    """Return the SHA-256 hex digest of a file, read in 1 MB chunks."""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _entry_path(input_file, output_folder, func_name, skiprows):
+    key = f"{os.path.abspath(input_file)}|{func_name}|{skiprows}"
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json"
+    return os.path.join(output_folder, MANIFEST_DIRNAME, name)
+
+
+def load_manifest_entry(input_file, output_folder, func_name, skiprows=0):
+    """Return the recorded manifest entry for a source file, or None if there is none."""
+    entry_path = _entry_path(input_file, output_folder, func_name, skiprows)
+    try:
+        with open(entry_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_manifest_entry(input_file, output_folder, func_name, skiprows, outputs, content_hash=None):
+    """Record size, mtime, content hash and produced outputs for a converted source file."""
+    stat = os.stat(input_file)
+    entry = {
+        "source": os.path.abspath(input_file),
+        "function": func_name,
+        "skiprows": skiprows,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": content_hash or file_content_hash(input_file),
+        "outputs": [os.path.abspath(p) for p in outputs],
+    }
+
+    entry_path = _entry_path(input_file, output_folder, func_name, skiprows)
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    tmp_path = entry_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, entry_path)
+    return entry
+
+
+def is_conversion_current(input_file, output_folder, func_name, skiprows=0):
+    """
+    Check whether a source file was already converted and has not changed since.
+
+    Size and mtime are compared first; the content hash is only computed when the
+    size matches but the mtime moved (e.g. the file was re-copied unchanged).
+
+    Returns:
+        tuple: (is_current (bool), entry (dict or None)).
+    """
+    entry = load_manifest_entry(input_file, output_folder, func_name, skiprows)
+    if entry is None:
+        return False, None
+
+    if not entry["outputs"] or not all(os.path.exists(p) for p in entry["outputs"]):
+        return False, entry
+
+    stat = os.stat(input_file)
+    if stat.st_size != entry["size"]:
+        return False, entry
+    if stat.st_mtime == entry["mtime"]:
+        return True, entry
+
+    if file_content_hash(input_file) == entry["sha256"]:
+        # Same bytes under a new mtime: refresh the entry so the next check is cheap
+        entry = save_manifest_entry(input_file, output_folder, func_name, skiprows,
+                                    entry["outputs"], content_hash=entry["sha256"])
+        return True, entry
+    return False, entry
+
+
+def incremental_conversion(func):
+    """
+    Decorator for convert_*(input_file, output_folder, skiprows) functions.
+
+    Skips the conversion when the manifest shows the source is unchanged and its
+    outputs still exist; otherwise runs it and records the returned output path(s).
+    Pass force=True to always reconvert.
+    """
+    @functools.wraps(func)
+    def wrapper(input_file, output_folder, skiprows: int = 0, *args, force: bool = False, **kwargs):
+        # Options such as output_format change what gets produced, so they are part of the key
+        variant = func.__name__ + "".join(f"|{k}={v}" for k, v in sorted(kwargs.items()))
+
+        if not force:
+            current, entry = is_conversion_current(input_file, output_folder, variant, skiprows)
+            if current:
+                print(f"Unchanged, skipped → {input_file}")
+                outputs = entry["outputs"]
+                return outputs[0] if len(outputs) == 1 else outputs
+
+        result = func(input_file, output_folder, skiprows, *args, **kwargs)
+
+        if result:
+            outputs = [result] if isinstance(result, str) else list(result)
+            save_manifest_entry(input_file, output_folder, variant, skiprows, outputs)
+        return result
+
+    return wrapper
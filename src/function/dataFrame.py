@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from function.partitionFilter import PASSED, evaluate_rules, partition_rows
 
 def get_Drug_data(df):
 
@@ -7,18 +8,22 @@ def get_Drug_data(df):
     # condition2 = df["Item Code"].str.startswith("PT")  
     # condition3 = (df['Item Code'] != '99') & (df['Item Code'] != 'P00000000000')  # No drug
     # condition4 = (df['AppointmentDatetime'] != 'no value')
-    condition1 = df['receive_drug'] == 1
-    condition2 = df['Item Type'] == "Drug" # transaction receive_drug 
-    # condition3 = df["Item Code"].str.startswith("PT") # Tablet/Capsule
-    condition3 = df["Item Code"].str.startswith("PT") | df["Item Code"].str.startswith("ST")
+    # Each condition is evaluated once; every row is labelled with the first condition it fails
+    rules = [
+        ('receive_drug', lambda df: df['receive_drug'] == 1),
+        ('Drug item', lambda df: df['Item Type'] == "Drug"),  # transaction receive_drug
+        ('Tablet/Capsule', lambda df: df["Item Code"].str.startswith(("PT", "ST"), na=False)),
+    ]
+    reasons, _ = evaluate_rules(df, rules)
+    drug = (reasons == PASSED) | (reasons == 2)   # condition1 & condition2
+    drug_tc = reasons == PASSED                   # condition1 & condition2 & condition3
 
-    
     # Filtering DataFrame based on conditions
-    receive_drug_by_visit = df[condition1 & condition2]  # new drug
-    receive_other_by_visit = df[~(condition1 & condition2)]  # new no drug
+    receive_drug_by_visit = df[drug]  # new drug
+    receive_other_by_visit = df[~drug]  # new no drug
     
-    receive_drug_tc_by_visit = df[condition1 & condition2 & condition3]  # new drug
-    receive_drug_other_by_visit = df[~(condition1 & condition2 & condition3)]  # new no drug
+    receive_drug_tc_by_visit = df[drug_tc]  # new drug
+    receive_drug_other_by_visit = df[~drug_tc]  # new no drug
     
     # Drug = df[condition1 & condition2]  # include No drug
     # NoDrug = df[~(condition1 & condition2 & condition3)] 
@@ -36,9 +41,7 @@ def get_Drug_data(df):
 def get_Drug_data_from_receive_spen_drug(df):
 
     # condition1 = df['Received Drug'] == 1
-    condition1 = df['Revised Receive Drug'] == 1
-    receive_drug = df[condition1]
-    receive_no_drug = df[~(condition1)]
+    receive_drug, receive_no_drug, _ = partition_rows(df, [('Revised Receive Drug', lambda df: df['Revised Receive Drug'] == 1)])
     
     return {
         'receive_drug': receive_drug,
@@ -46,11 +49,8 @@ def get_Drug_data_from_receive_spen_drug(df):
     }
 
 def get_Item_Use(df):
-    condition1 = df["Item Use"] == 1
-    
     # Filtering DataFrame based on the condition
-    tc_item_use = df[condition1]      
-    tc_item_other = df[~condition1]   
+    tc_item_use, tc_item_other, _ = partition_rows(df, [('Item Use', lambda df: df["Item Use"] == 1)])
     
     return {
         'tc_item_use': tc_item_use,
@@ -60,11 +60,10 @@ def get_Item_Use(df):
 def get_Drug_Appt(df):
 
     # Condition to select rows where 'AppointmentDatetime' is not blank (not null and not zero)
-    condition1 = (df['Has_Appointment'] != 0) & df['Has_Appointment'].notna()
+    has_appointment = ('Has_Appointment', lambda df: (df['Has_Appointment'] != 0) & df['Has_Appointment'].notna())
 
-    # Filtering DataFrame based on the condition
-    Appt = df[condition1]      # Rows where 'AppointmentDatetime' is not blank
-    NoAppt = df[~condition1]   # Rows where 'AppointmentDatetime' is blank
+    # Appt: rows where 'AppointmentDatetime' is not blank, NoAppt: rows where it is blank
+    Appt, NoAppt, _ = partition_rows(df, [has_appointment])
     
     return {
         'Appt': Appt,
@@ -0,0 +1,140 @@
+import os
+import shutil
+import uuid
+import pandas as pd
+
+# Default Hive partition layout for combined inventory data. The report type is called
+# DataCategory because INV_VALUE already has an item "Category" column.
+PARTITION_COLUMNS = ["Year", "BU", "DataCategory", "Month"]
+
+
+def _partition_dir(dataset_root, partition_cols, values):
+    parts = [f"{col}={value}" for col, value in zip(partition_cols, values)]
+    return os.path.join(dataset_root, *parts)
+
+
+def _hive_partitioning(partition_cols):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    # Keep partition values as strings ("04" must not become 4)
+    return ds.partitioning(pa.schema([(col, pa.string()) for col in partition_cols]), flavor="hive")
+
+
+def migrate_single_file(path, partition_cols=PARTITION_COLUMNS, values=None, date_column=None):
+    """
+    Turn a legacy single combined .parquet file into a partitioned dataset at the same path.
+
+    Partition values come from the file's own columns; a missing Year is taken from
+    date_column when the file has it. Other missing columns are filled from values,
+    constants that must hold for every row of the file (e.g. its DataCategory).
+    Legacy files were appended to across runs and years, so only pass a Year in
+    values for a one-off migration of a file known to hold that single year.
+    The rows land in the same partitions later runs write, so those runs replace them
+    instead of adding a second copy. If a partition value cannot be determined for
+    every row, the file is left untouched and a ValueError is raised.
+    """
+    if not os.path.isfile(path):
+        return
+
+    legacy_df = pd.read_parquet(path)
+    if "Year" in partition_cols and "Year" not in legacy_df.columns and date_column in legacy_df.columns:
+        from function.dateNormalizer import normalize_dates
+        legacy_df["Year"] = normalize_dates(legacy_df[date_column]).dt.year.astype("Int64").astype("string")
+    for col in partition_cols:
+        if col not in legacy_df.columns and (values or {}).get(col) is not None:
+            legacy_df[col] = values[col]
+    missing = [col for col in partition_cols if col not in legacy_df.columns]
+    incomplete = [col for col in partition_cols if col in legacy_df.columns and legacy_df[col].isna().any()]
+    if missing or incomplete:
+        raise ValueError(f"Cannot migrate {path}: partition columns {missing} are missing and {incomplete} have "
+                         f"empty values; migrate it once with migrate_single_file(path, values=...) chosen "
+                         f"for its rows, or move the file away")
+
+    print(f"Migrating single-file {path} to a partitioned dataset...")
+
+    backup_path = f"{path}.legacy"
+    os.replace(path, backup_path)
+    write_partitions(legacy_df, path, partition_cols)
+    os.remove(backup_path)
+
+
+def write_partitions(df, dataset_root, partition_cols=PARTITION_COLUMNS):
+    """
+    Write df into a Hive-partitioned Parquet dataset (e.g. Year=2024/BU=PLC/DataCategory=INV_VALUE/Month=04).
+
+    Every partition present in df is replaced as a whole, so re-running a BU-month
+    overwrites it instead of duplicating rows, and partitions not in df are untouched.
+    Each partition is written to a temporary folder first and swapped in afterwards.
+
+    Returns:
+        list: The partition folders that were written.
+    """
+    if df.empty:
+        print("Nothing to write: DataFrame is empty.")
+        return []
+
+    missing = [col for col in partition_cols if col not in df.columns]
+    if missing:
+        raise KeyError(f"Partition columns not found in DataFrame: {missing}")
+
+    os.makedirs(dataset_root, exist_ok=True)
+    df = df.copy()
+    for col in partition_cols:
+        df[col] = df[col].astype(str)
+
+    written = []
+    for values, part_df in df.groupby(partition_cols, sort=True):
+        values = values if isinstance(values, tuple) else (values,)
+        target = _partition_dir(dataset_root, partition_cols, values)
+        # Stage under "_staging" (ignored by dataset discovery) so readers never see half a partition
+        staging = os.path.join(dataset_root, "_staging", uuid.uuid4().hex)
+
+        os.makedirs(staging)
+        part_df.drop(columns=partition_cols).to_parquet(
+            os.path.join(staging, "part-0.parquet"), index=False, compression="zstd"
+        )
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(staging, target)
+
+        print(f"  Wrote partition {os.path.relpath(target, dataset_root)} ({len(part_df)} rows)")
+        written.append(target)
+
+    shutil.rmtree(os.path.join(dataset_root, "_staging"), ignore_errors=True)
+    return written
+
+
+def read_partitions(dataset_root, filters=None, columns=None, partition_cols=PARTITION_COLUMNS):
+    """
+    Read a partitioned dataset, loading only the partitions and columns asked for.
+
+    Parameters:
+        dataset_root (str): Dataset folder (a legacy single .parquet file is also accepted).
+        filters (dict, optional): {partition column: value or list of values}, e.g.
+                                  {"Year": "2024", "BU": ["PLC", "PT2"]}. Non-matching
+                                  partitions are pruned without being opened.
+        columns (list, optional): Columns to load (data and/or partition columns).
+
+    Returns:
+        pd.DataFrame
+    """
+    import pyarrow.dataset as ds
+
+    if os.path.isfile(dataset_root):
+        df = pd.read_parquet(dataset_root, columns=columns)
+        for col, wanted in (filters or {}).items():
+            wanted = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            df = df[df[col].astype(str).isin([str(v) for v in wanted])]
+        return df
+
+    dataset = ds.dataset(dataset_root, format="parquet", partitioning=_hive_partitioning(partition_cols),
+                         exclude_invalid_files=True)
+
+    expression = None
+    for col, wanted in (filters or {}).items():
+        wanted = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+        condition = ds.field(col).isin([str(v) for v in wanted])
+        expression = condition if expression is None else expression & condition
+
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
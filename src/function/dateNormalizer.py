@@ -0,0 +1,172 @@
+import re
+import numpy as np
+import pandas as pd
+from function.parseThaiDate import BUDDHIST_ERA_MIN_YEAR, BUDDHIST_ERA_OFFSET, parse_thai_dates
+
+# --------------------------------------------------------------------
+# One date normalizer for Excel serials, ISO, day-first and Thai date columns
+# --------------------------------------------------------------------
+
+EXCEL_EPOCH = np.datetime64("1899-12-30", "ns")  # Excel serial 0 (1900 leap-year bug included)
+NS_PER_DAY = 86_400 * 10**9
+SERIAL_LIMITS = (-25_567.0, 132_649.0)  # Serials that fit datetime64[ns] (1830 .. 2262)
+
+DATE_KINDS = ("serial", "iso", "dayfirst", "thai")
+OTHER = len(DATE_KINDS)  # Kind code of values none of the patterns recognise
+
+# One scan of the distinct strings: the named group that matches gives the kind
+_DATE_PATTERN = (
+    r"^\s*(?:"
+    r"(?P<serial>\d+(?:\.\d*)?)"
+    r"|(?P<iso>\d{4}-\d{1,2}-\d{1,2}(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?)"
+    r"|(?P<dayfirst>\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}(?:\s+\d{1,2}:\d{2}(?::\d{2})?)?)"
+    r"|(?P<thai>\d{1,2}\s*-\s*[^-\d\s][^-]*?\s*-\s*\d{2,4})"
+    r")\s*$"
+)
+_DAYFIRST_PARTS = re.compile(r"^\s*(\d+)[/.-](\d+)[/.-](\d+)(?:\s+(\d+):(\d+)(?::(\d+))?)?\s*$")
+
+_kind_cache = {}  # (source, column) -> kind of a column that held only that kind
+
+
+def serial_to_datetime(days):
+    """Excel serial day numbers (fractions are times of day) as datetime64[ns]; out-of-range values become NaT."""
+    days = np.asarray(days, dtype=np.float64)
+    valid = (days >= SERIAL_LIMITS[0]) & (days <= SERIAL_LIMITS[1])
+    ns = np.round(np.where(valid, days, 0) * NS_PER_DAY).astype(np.int64)
+    result = EXCEL_EPOCH + ns.astype("timedelta64[ns]")
+    result[~valid] = np.datetime64("NaT", "ns")
+    return result
+
+
+def _dayfirst_to_datetime(strings):
+    """'dd/mm/yyyy [HH:MM[:SS]]' (also '.' or '-' separated); 2-digit years are C.E., B.E. years are shifted."""
+    parts = strings.str.extract(_DAYFIRST_PARTS).apply(pd.to_numeric, errors="coerce")
+    year = parts[2].mask(parts[2] < 100, parts[2] + 2000)
+    year = year.mask(year >= BUDDHIST_ERA_MIN_YEAR, year - BUDDHIST_ERA_OFFSET)
+    fields = pd.DataFrame({"year": year, "month": parts[1], "day": parts[0],
+                           "hour": parts[3].fillna(0), "minute": parts[4].fillna(0), "second": parts[5].fillna(0)})
+    return pd.to_datetime(fields, errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+
+def _iso_to_datetime(values):
+    return pd.to_datetime(pd.Series(values, dtype=object), format="ISO8601", errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+
+def classify_dates(values):
+    """
+    Kind code (index into DATE_KINDS, or OTHER) of each value of an object array.
+
+    Numbers are serials and datetime objects count as ISO; strings are matched
+    against one combined pattern, so each value is looked at once.
+    """
+    values = pd.Series(values, dtype=object)
+    kinds = np.full(len(values), OTHER, dtype=np.int8)
+
+    is_text = values.map(type).eq(str).to_numpy(dtype=bool)
+    is_number = values.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, bool)).to_numpy(dtype=bool)
+    is_datetime = values.map(lambda v: isinstance(v, np.datetime64) or hasattr(v, "isoformat")).to_numpy(dtype=bool)
+    kinds[is_number] = DATE_KINDS.index("serial")
+    kinds[is_datetime & ~is_number] = DATE_KINDS.index("iso")
+
+    if is_text.any():
+        groups = values[is_text].str.extract(_DATE_PATTERN).notna().to_numpy()
+        matched = groups.any(axis=1)
+        kinds[np.flatnonzero(is_text)[matched]] = groups[matched].argmax(axis=1)
+    return kinds
+
+
+def _convert_kind(values, kind):
+    """datetime64[ns] array of object values that all have the given kind."""
+    if kind == "serial":
+        return serial_to_datetime(pd.to_numeric(pd.Series(values, dtype=object), errors="coerce"))
+    if kind == "iso":
+        return _iso_to_datetime(values)
+    if kind == "dayfirst":
+        return _dayfirst_to_datetime(pd.Series(values, dtype=object))
+    if kind == "thai":
+        return parse_thai_dates(pd.Series(values, dtype=object)).to_numpy(dtype="datetime64[ns]")
+    return pd.to_datetime(pd.Series(values, dtype=object), format="mixed", errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+
+def _try_cached_kind(series, kind):
+    """Convert the whole column as kind; None if some present value does not parse that way."""
+    if kind == "serial":
+        numbers = pd.to_numeric(series, errors="coerce")
+        if (numbers.isna() & series.notna()).any():
+            return None
+        return serial_to_datetime(numbers)
+    if kind == "iso":
+        parsed = _iso_to_datetime(series.to_numpy(dtype=object))
+        if (np.isnat(parsed) & series.notna().to_numpy()).any():
+            return None
+        return parsed
+    return None
+
+
+def normalize_dates(series, source=None, column=None):
+    """
+    Convert a date column of any mix of Excel serials, ISO strings or datetimes,
+    'dd/mm/yyyy' strings and Thai dates ('20-มี.ค.-24') into datetime64[ns].
+
+    Numeric columns are converted as serials in one vectorised step. Other columns
+    are factorized, each distinct value is classified once (classify_dates) and every
+    kind is converted in bulk, then broadcast back to the rows. Values that do not
+    parse become NaT.
+
+    When source is given, a column that held a single kind remembers it per
+    (source, column) and later calls try that conversion directly, skipping the
+    classification; they fall back to it if some value does not fit.
+
+    Parameters:
+        series (pd.Series): Column to convert.
+        source (str, optional): Source system / report the column comes from (e.g. 'HN', 'PT1SpenPayor').
+        column (str, optional): Cache key column name; defaults to series.name.
+
+    Returns:
+        pd.Series: datetime64[ns] values with the index and name of series.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.Series(serial_to_datetime(series.astype("float64")), index=series.index, name=series.name)
+
+    key = (source, column if column is not None else series.name)
+    if source is not None and key in _kind_cache:
+        values = _try_cached_kind(series, _kind_cache[key])
+        if values is not None:
+            return pd.Series(values, index=series.index, name=series.name)
+
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:  # nothing but missing values
+        return pd.Series(np.full(len(series), np.datetime64("NaT", "ns")), index=series.index, name=series.name)
+    uniques = np.asarray(uniques, dtype=object)
+    kinds = classify_dates(uniques)
+
+    parsed = np.full(len(uniques), np.datetime64("NaT", "ns"))
+    present = np.unique(kinds)
+    for kind in present:
+        in_kind = kinds == kind
+        parsed[in_kind] = _convert_kind(uniques[in_kind], DATE_KINDS[kind] if kind < OTHER else None)
+
+    if source is not None:
+        if len(present) == 1 and present[0] < OTHER:
+            _kind_cache[key] = DATE_KINDS[present[0]]
+        else:
+            _kind_cache.pop(key, None)
+
+    # factorize marks missing values with -1, which picks the trailing NaT
+    values = np.append(parsed, np.datetime64("NaT", "ns"))[codes]
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def normalize_date_columns(df, columns, source=None):
+    """Normalize each of columns present in df in place (see normalize_dates); returns df."""
+    for column in columns:
+        if column in df.columns:
+            df[column] = normalize_dates(df[column], source=source, column=column)
+    return df
+
+
+def clear_date_kind_cache():
+    """Forget the remembered (source, column) date kinds."""
+    _kind_cache.clear()
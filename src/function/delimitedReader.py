@@ -0,0 +1,162 @@
+import io
+import os
+import re
+import warnings
+import pandas as pd
+
+# --------------------------------------------------------------------
+# Shared reader for the pipe/tab-delimited HIS exports (cp874 / TIS-620 / UTF-8)
+# --------------------------------------------------------------------
+
+SAMPLE_SIZE = 100_000
+
+# chardet labels that mean "Thai Windows code page" (or are known misdetections of it)
+_ENCODING_ALIASES = {
+    "tis-620": "cp874",
+    "iso-8859-11": "cp874",
+    "windows-874": "cp874",
+    "ascii": "cp874",      # cp874 is a superset of ASCII; avoids failures on the first Thai byte
+    "shift_jis": "cp874",  # chardet regularly mistakes cp874 text for Shift-JIS
+}
+
+_MONTH_TOKEN = re.compile(r"(JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+_SKIPPED_LINE = re.compile(r"Skipping line \d+")
+
+# Detected encodings, keyed by source pattern (see source_pattern); one detection per process per source
+_encoding_cache = {}
+
+
+def source_pattern(file_path):
+    """
+    Reduce a file path to its source-system pattern, so monthly drops of the same
+    export share one cache entry: 'PLC/G5_Inventory_Value_Report___by_APR24.xls'
+    becomes 'PLC/g#_inventory_value_report___by_####.xls'.
+    """
+    folder = os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+    name = _MONTH_TOKEN.sub("###", os.path.basename(file_path))
+    name = _DIGITS.sub("#", name)
+    return f"{folder}/{name.lower()}"
+
+
+def _decodes(sample, encoding):
+    # Cut at the last newline so a multi-byte character split by the sample boundary is not an error
+    cut = sample.rfind(b"\n")
+    try:
+        (sample[:cut] if cut > 0 else sample).decode(encoding)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+
+def detect_encoding(file_path, use_cache=True):
+    """
+    Detect a file's encoding once per source pattern.
+
+    chardet runs on a 100 KB sample; the detected encoding, cp874 and utf-8 are then
+    tried in that order and the first one that decodes the sample cleanly is kept.
+    If none does, cp874 is used (the reader replaces undecodable bytes).
+    """
+    key = source_pattern(file_path)
+    if use_cache and key in _encoding_cache:
+        return _encoding_cache[key]
+
+    import chardet  # only needed on a cache miss
+
+    with open(file_path, "rb") as f:
+        sample = f.read(SAMPLE_SIZE)
+    detected = (chardet.detect(sample).get("encoding") or "cp874").lower()
+    detected = _ENCODING_ALIASES.get(detected, detected)
+
+    encoding = next((enc for enc in dict.fromkeys((detected, "cp874", "utf-8")) if _decodes(sample, enc)), "cp874")
+    _encoding_cache[key] = encoding
+    return encoding
+
+
+def clear_encoding_cache():
+    _encoding_cache.clear()
+
+
+def _count_skipped(caught):
+    return sum(len(_SKIPPED_LINE.findall(str(w.message))) for w in caught)
+
+
+def read_delimited(file_path, sep, skiprows: int = 0, encoding=None, engine: str = "c", **read_csv_kwargs):
+    """
+    Read a delimited HIS export with the C (or pyarrow) parser.
+
+    The file is decoded as a stream (undecodable bytes are replaced) and malformed
+    lines are skipped, as with the previous engine="python", on_bad_lines="skip" reads.
+
+    Parameters:
+        file_path (str): Source file.
+        sep (str): Field separator ('|' or '\\t').
+        skiprows (int): Leading lines to skip before the header.
+        encoding (str, optional): Force an encoding instead of the cached detection.
+        engine (str): 'c' (default) or 'pyarrow'. Skipped lines are only counted with 'c'.
+
+    Returns:
+        tuple: (DataFrame, info dict with 'encoding', 'rows' and 'skipped_lines').
+    """
+    encoding = encoding or detect_encoding(file_path)
+
+    if engine == "pyarrow":
+        df = pd.read_csv(file_path, sep=sep, encoding=encoding, encoding_errors="replace",
+                         skiprows=skiprows, engine="pyarrow", on_bad_lines="skip", **read_csv_kwargs)
+        return df, {"encoding": encoding, "rows": len(df), "skipped_lines": None}
+
+    with open(file_path, "r", encoding=encoding, errors="replace", newline="") as stream:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", pd.errors.ParserWarning)
+            df = pd.read_csv(stream, sep=sep, skiprows=skiprows, engine="c",
+                             on_bad_lines="warn", **read_csv_kwargs)
+
+    return df, {"encoding": encoding, "rows": len(df), "skipped_lines": _count_skipped(caught)}
+
+
+def iter_delimited(file_path, sep, skiprows: int = 0, encoding=None, chunk_lines: int = 500_000, **read_csv_kwargs):
+    """
+    Yield (DataFrame, info) per block of at most chunk_lines data lines.
+
+    Each block is parsed on its own with the header line prepended, so memory stays
+    bounded and bad-line skipping is exact per block (the C parser's own chunksize
+    mode can misreport bad lines that straddle chunk boundaries).
+    """
+    encoding = encoding or detect_encoding(file_path)
+
+    with open(file_path, "r", encoding=encoding, errors="replace", newline="") as stream:
+        for _ in range(skiprows):
+            stream.readline()
+        header = stream.readline()
+        header_fields = header.count(sep)
+        first_block = True
+
+        while True:
+            lines = []
+            for line in stream:
+                lines.append(line)
+                if len(lines) >= chunk_lines:
+                    break
+            if not lines:
+                break
+            full_block = len(lines) >= chunk_lines
+
+            # Directly under the header, a line with extra fields would become an implicit index
+            # instead of being skipped; outside the first block treat it as the bad line it is
+            leading_bad = 0
+            if not first_block:
+                while leading_bad < len(lines) and lines[leading_bad].count(sep) > header_fields:
+                    leading_bad += 1
+                lines = lines[leading_bad:]
+            first_block = False
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always", pd.errors.ParserWarning)
+                df = pd.read_csv(io.StringIO(header + "".join(lines)), sep=sep, engine="c",
+                                 on_bad_lines="warn", **read_csv_kwargs)
+
+            yield df, {"encoding": encoding, "rows": len(df),
+                       "skipped_lines": leading_bad + _count_skipped(caught)}
+
+            if not full_block:
+                break
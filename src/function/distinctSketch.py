@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from function.visitKey import hash_key
+
+# --------------------------------------------------------------------
+# HyperLogLog distinct counts (patients, visits) per group, mergeable and persistable
+# --------------------------------------------------------------------
+
+DEFAULT_ERROR = 0.01            # Relative standard error of an estimate
+MIN_PRECISION, MAX_PRECISION = 4, 16
+SKETCH_COLUMN = "Sketch"
+
+
+def precision_for_error(error=DEFAULT_ERROR):
+    """Smallest precision p whose 2^p registers give a standard error <= error (1.04 / sqrt(2^p))."""
+    p = int(np.ceil(2 * np.log2(1.04 / error)))
+    return min(max(p, MIN_PRECISION), MAX_PRECISION)
+
+
+def _leading_zeros(values):
+    """Leading zero bits of every uint64 (64 for 0), by a vectorized binary search."""
+    values = values.copy()
+    zeros = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (values >> np.uint64(64 - shift)) == 0
+        zeros[empty] += shift
+        values[empty] <<= np.uint64(shift)
+    zeros[values == 0] += 1
+    return zeros
+
+
+def hll_registers(codes, hashes, n_groups, precision):
+    """
+    HyperLogLog registers for every group: (n_groups, 2^precision) uint8.
+
+    The first precision bits of each 64-bit hash pick a register, the rank of the
+    first 1-bit in the remaining bits is kept as the register's maximum.
+    """
+    m = 1 << precision
+    hashes = np.asarray(hashes).view(np.uint64)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes << np.uint64(precision)
+    rank = np.minimum(_leading_zeros(rest), 64 - precision) + 1
+
+    registers = np.zeros((n_groups, m), dtype=np.uint8)
+    cells = pd.Series(rank).groupby(np.asarray(codes, dtype=np.int64) * m + index).max()
+    registers.reshape(-1)[cells.index.to_numpy()] = cells.to_numpy()
+    return registers
+
+
+def estimate_registers(registers):
+    """Distinct-count estimate for every row of registers (with the small-range correction)."""
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=1)
+    empty = np.count_nonzero(registers == 0, axis=1)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(empty, 1))
+    return np.where((raw <= 2.5 * m) & (empty > 0), linear, raw)
+
+
+def _group_codes(df, group_cols):
+    """Dense group number per row (sorted groups, missing values kept) and one label row per group."""
+    if not group_cols:
+        return np.zeros(len(df), dtype=np.int64), pd.DataFrame(index=range(1))
+    codes = df.groupby(group_cols, sort=True, dropna=False, observed=True).ngroup().to_numpy()
+    first_rows = np.unique(codes, return_index=True)[1]
+    return codes, df[group_cols].iloc[first_rows].reset_index(drop=True)
+
+
+def build_sketches(df, group_cols, value_cols, error=DEFAULT_ERROR):
+    """
+    One HyperLogLog sketch of the distinct value_cols combinations per group.
+
+    Parameters:
+        df (pd.DataFrame): Rows to count.
+        group_cols (list): Grouping columns (may be empty for a single overall sketch).
+        value_cols (list): Columns whose distinct combinations are counted (e.g. ['Hospital Site', 'HN']).
+        error (float): Target relative standard error; sets the sketch size (2^p bytes per group).
+
+    Returns:
+        pd.DataFrame: group_cols + 'Sketch' (register bytes). Sketches made with the
+                      same error can be merged across sites, months and files.
+    """
+    group_cols = list(group_cols)
+    precision = precision_for_error(error)
+    hashes = hash_key(df, list(value_cols)).to_numpy()
+
+    codes, labels = _group_codes(df, group_cols)
+    registers = hll_registers(codes, hashes, len(labels), precision)
+    labels[SKETCH_COLUMN] = [row.tobytes() for row in registers]
+    return labels
+
+
+def _sketch_registers(sketches):
+    return np.frombuffer(b"".join(sketches), dtype=np.uint8).reshape(len(sketches), -1)
+
+
+def merge_sketches(sketches, group_by=()):
+    """
+    Union sketches up to group_by (register-wise maximum), e.g. site sketches to a
+    company total or monthly sketches to a year.
+
+    Returns:
+        pd.DataFrame: group_by + 'Sketch'.
+    """
+    group_by = list(group_by)
+    registers = _sketch_registers(sketches[SKETCH_COLUMN].tolist())
+    codes, labels = _group_codes(sketches, group_by)
+    merged = np.zeros((len(labels), registers.shape[1]), dtype=np.uint8)
+    np.maximum.at(merged, codes, registers)
+    labels[SKETCH_COLUMN] = [row.tobytes() for row in merged]
+    return labels
+
+
+def estimate_sketches(sketches):
+    """Rounded distinct-count estimate per sketch row."""
+    if len(sketches) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.round(estimate_registers(_sketch_registers(sketches[SKETCH_COLUMN].tolist()))).astype(np.int64)
+
+
+def save_sketches(sketches, path):
+    """Store sketches as Parquet (the register bytes are a binary column), e.g. next to a report's Parquet output."""
+    sketches.to_parquet(path, index=False, compression="zstd")
+
+
+def load_sketches(path):
+    return pd.read_parquet(path)
+
+
+def distinct_count(df, group_cols, value_cols, error=None):
+    """
+    Distinct value_cols combinations per group, as a Series indexed by group_cols
+    (like groupby(group_cols)[value].nunique()); an int when group_cols is empty.
+
+    error=None counts exactly; a relative error (e.g. 0.01) uses HyperLogLog sketches,
+    which need 2^p bytes per group instead of a hash set of every value.
+    """
+    group_cols, value_cols = list(group_cols), list(value_cols)
+    if error is None:
+        if not group_cols:
+            return int(len(df[value_cols].dropna().drop_duplicates()))
+        if len(value_cols) == 1:
+            return df.groupby(group_cols, observed=True)[value_cols[0]].nunique()
+        return df[group_cols + value_cols].drop_duplicates().dropna().groupby(group_cols, observed=True).size()
+
+    complete = df[group_cols + value_cols].notna().all(axis=1)
+    if not complete.all():
+        df = df[complete]
+    sketches = build_sketches(df, group_cols, value_cols, error)
+    if not group_cols:
+        return int(estimate_sketches(sketches)[0])
+    return pd.Series(estimate_sketches(sketches), index=pd.MultiIndex.from_frame(sketches[group_cols])
+                     if len(group_cols) > 1 else pd.Index(sketches[group_cols[0]]))
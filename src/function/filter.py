@@ -1,9 +1,50 @@
 import pandas as pd
+from function.partitionFilter import partition_rows
+from function.ruleClassifier import classify
+
+# --------------------------------------------------------------------
+# Rules: (name, keep) pairs for partition_rows; keep(df) is True for rows to keep.
+# Chain several to filter in one pass with a removal audit, e.g.
+#   kept, removed, audit = partition_rows(df, [RULE_ST, RULE_RIGHT, RULE_PAYOR], label_column='Removed By')
+# --------------------------------------------------------------------
+
+def _keep_not_ST(df):
+    return ~df['Item Code'].str.startswith('ST', na=False)
+
+def _keep_not_drug_record(df):
+    return ~((df['Hospital Site'] == 'PLS') & (df['Qty'] == 0.1))
+
+def _keep_not_staff_right(df):
+    # Staff right prefixes: config/filter.json "staff_right"; rows without a 'Right Name' are kept
+    return ~classify(df, 'staff_right')
+
+def _keep_not_staff_payor(df):
+    # ( employee docotr ) site + payor pairs: config/filter.json "staff_payor"
+    return ~classify(df, 'staff_payor')
+
+def _keep_not_zero_med_day(df):
+    return df['New_Med_Day'] != 0
+
+def _keep_in_scope(df):
+    condition_age = (df['AgeYear'] >= 0) & (df['AgeYear'] <= 150)
+    condition_appt_days = (df['Appt_Days'] >= 1) & (df['Appt_Days'] <= 365)
+    condition_med_day = (df['New_Med_Day'] >= 1) & (df['New_Med_Day'] <= 365)
+    return condition_age & condition_appt_days & condition_med_day
+
+def rule_not_negative(column):
+    return (f"{column} < 0", lambda df: df[column] >= 0)
+
+RULE_ST = ("Item Code starts with ST", _keep_not_ST)
+RULE_DRUG_RECORD = ("PLS drug record (Qty 0.1)", _keep_not_drug_record)
+RULE_RIGHT = ("Staff right", _keep_not_staff_right)
+RULE_PAYOR = ("Staff payor", _keep_not_staff_payor)
+RULE_ZERO_MED_DAY = ("New_Med_Day is 0", _keep_not_zero_med_day)
+RULE_SCOPE = ("Out of scope (age / appointment days / med days)", _keep_in_scope)
+
 
 def filter_ST(df):
     # Keep only the rows where 'Item Code' does not start with 'ST'
-    filtered_df = df[~df['Item Code'].str.startswith('ST')]
-    removed_ST = df[df['Item Code'].str.startswith('ST')]
+    filtered_df, removed_ST, _ = partition_rows(df, [RULE_ST])
     return filtered_df, removed_ST
 
 def filter_drug_record(df):
@@ -18,73 +59,31 @@ def filter_drug_record(df):
             [Item Code] == 000 ไม่การจ่ายยา record
     '''
     # Filter out rows where 'Hospital Site' is 'PLS' and 'Qty' is 0.1
-    filtered_drug_record = df[~((df['Hospital Site'] == 'PLS') & (df['Qty'] == 0.1))]
-    removed_drug_record = df[((df['Hospital Site'] == 'PLS') & (df['Qty'] == 0.1))]
+    filtered_drug_record, removed_drug_record, _ = partition_rows(df, [RULE_DRUG_RECORD])
     return filtered_drug_record, removed_drug_record
 
 def filter_right(df):
     # Apply the filter only to non-null values in 'Right Name'
-    filtered_right = df[df['Right Name'].isna() | (~df['Right Name'].str.startswith(('ครอบครัว', 'พนักงาน', 'แพทย์', 'กรรมการ ผู้บริหาร', 'คลินิกพนักงาน', 'ตรวจสุขภาพพนักงาน')).fillna(False))]
-    removed_right = df[~df['Right Name'].isna() & df['Right Name'].str.startswith(('ครอบครัว', 'พนักงาน', 'แพทย์', 'กรรมการ ผู้บริหาร', 'คลินิกพนักงาน', 'ตรวจสุขภาพพนักงาน'))]
+    filtered_right, removed_right, _ = partition_rows(df, [RULE_RIGHT])
     return filtered_right, removed_right
 
 def filter_payor(df):
-    # Define the list of ( employee docotr ) payor values to filter out
-    payor_to_filter = [
-        "PLSDF-0003-000",
-        "PLSEM-0001-C00",
-        "PLSEM-0001-000",
-        "PLSRE-0001-002",
-        "PTNEM-0007-A01",
-        "PTNEM-0001-A01",
-        "PTNEM-0002-A01",
-        "PTNEM-0003-A01",
-        "PTS411-EM-0001-AA1",
-        "PTS411-EM-0001-AB1",
-        "PTS411-EM-0001-DA1",
-        "PTS411-DF-0001-B12"
-    ]
-    
-    # Create a unique value by concatenating 'Hospital Site' and 'Payor'
-    df['Unique_Value'] = df['Hospital Site'] + df['Payor Code']
-    
-    # Filter the DataFrame to exclude rows where 'Unique_Value' is in the payor_to_filter list
-    filtered_payor = df[~df['Unique_Value'].isin(payor_to_filter)]
-    
-    # Keep the removed payor values in a separate DataFrame for later review
-    removed_payor = df[df['Unique_Value'].isin(payor_to_filter)]
-    
-    # Drop the temporary 'Unique_Value' column before returning the results
-    filtered_payor = filtered_payor.drop(columns=['Unique_Value'])
-    removed_payor = removed_payor.drop(columns=['Unique_Value'])
-    
+    # Keep the removed payor values in a separate DataFrame for later review (df is not modified)
+    filtered_payor, removed_payor, _ = partition_rows(df, [RULE_PAYOR])
     return filtered_payor, removed_payor
 
 def filter_less_than_0_out(df, column):
-    filtered_amt_0_out = df[df[column] >= 0]
-    removed_amt_0_out = df[df[column] < 0]
+    # Rows where column is missing go to the removed frame
+    filtered_amt_0_out, removed_amt_0_out, _ = partition_rows(df, [rule_not_negative(column)])
     return filtered_amt_0_out, removed_amt_0_out
 
 def filter_other_stat_drug(df):
-    filterd_New_Med_Day_is_0 = df[df['New_Med_Day'] != 0]
-    removed_New_Med_Day_is_0 = df[df['New_Med_Day'] == 0]
+    filterd_New_Med_Day_is_0, removed_New_Med_Day_is_0, _ = partition_rows(df, [RULE_ZERO_MED_DAY])
     return filterd_New_Med_Day_is_0, removed_New_Med_Day_is_0
 
 def filter_scope(df):
-    # Define the conditions for filtering
-    condition_age = (df['AgeYear'] >= 0) & (df['AgeYear'] <= 150)
-    condition_appt_days = (df['Appt_Days'] >= 1) & (df['Appt_Days'] <= 365)
-    condition_med_day = (df['New_Med_Day'] >= 1) & (df['New_Med_Day'] <= 365)
-
-    # Combine all conditions
-    combined_condition = condition_age & condition_appt_days & condition_med_day
-
-    # Create filtered DataFrame
-    filtered_scope = df[combined_condition]
-
-    # Create DataFrame of removed rows
-    removed_scope = df[~combined_condition]
-
+    # Keep rows with AgeYear 0-150, Appt_Days 1-365 and New_Med_Day 1-365
+    filtered_scope, removed_scope, _ = partition_rows(df, [RULE_SCOPE])
     return filtered_scope, removed_scope
 
 # def filter_by_years(df, year_column, years):
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------
+# Pearson correlation for every group of one or more nested columns at once
+# --------------------------------------------------------------------
+
+
+def _pearson_p_values(r, n):
+    """Two-sided p-value of r under H0: r = 0 (same as scipy.stats.pearsonr)."""
+    from scipy.special import betainc
+
+    p = np.full(len(r), np.nan)
+    enough = (n > 2) & ~np.isnan(r)
+    ab = n[enough] / 2 - 1
+    p[enough] = np.minimum(2 * betainc(ab, ab, 0.5 * (1 - np.abs(r[enough]))), 1.0)
+    p[(n == 2) & ~np.isnan(r)] = 1.0
+    return p
+
+
+def grouped_pearson(df, group_cols, col1, col2, dropna=True, p_values=True):
+    """
+    Pearson correlation of col1 and col2 within every group of group_cols.
+
+    One factorization of the group columns gives integer group codes. Counts, sums
+    and centred sums of squares/products come from bincount over those codes, and
+    r, r^2 and p-values are then derived for all groups at once. This replaces
+    boolean-mask filtering of the frame per group value and per nesting level.
+    Groups come out in the order the nested loops used to produce them: first
+    level by first appearance, each next level by first appearance within its
+    parent.
+
+    Parameters:
+        df (pd.DataFrame): Source rows.
+        group_cols (list): One or more grouping columns, outermost first.
+        col1, col2 (str): Numeric columns to correlate.
+        dropna (bool): True: use rows where both values are present (DataFrame.corr).
+                       False: a group with any missing value gets NaN (pearsonr).
+        p_values (bool): Also compute the two-sided p-value (needs scipy).
+
+    Returns:
+        pd.DataFrame: group_cols + 'Count' (rows in the group), 'N' (complete pairs),
+                      'Correlation', 'Square Correlation' and 'p-value'.
+    """
+    group_cols = list(group_cols)
+    group_codes = df.groupby(group_cols, sort=False, observed=True).ngroup()
+    keep = group_codes.notna().to_numpy()  # rows with a missing group value belong to no group
+    codes = group_codes.to_numpy()[keep].astype("int64")
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+
+    x = df[col1].to_numpy(dtype=float)[keep]
+    y = df[col2].to_numpy(dtype=float)[keep]
+    complete = ~np.isnan(x) & ~np.isnan(y)
+
+    count = np.bincount(codes, minlength=n_groups)
+    has_missing = np.bincount(codes[~complete], minlength=n_groups) > 0
+
+    c, xc, yc = codes[complete], x[complete], y[complete]
+    n = np.bincount(c, minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x = np.bincount(c, weights=xc, minlength=n_groups) / n
+        mean_y = np.bincount(c, weights=yc, minlength=n_groups) / n
+
+        # Centred sums (instead of raw sums of squares) keep r exact for large values
+        dx = xc - mean_x[c]
+        dy = yc - mean_y[c]
+        sxx = np.bincount(c, weights=dx * dx, minlength=n_groups)
+        syy = np.bincount(c, weights=dy * dy, minlength=n_groups)
+        sxy = np.bincount(c, weights=dx * dy, minlength=n_groups)
+        r = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+
+    # A constant column has no correlation (exact check, the centred sums may keep rounding noise)
+    spread = pd.DataFrame({"x": xc, "y": yc}).groupby(c).agg(["min", "max"]).reindex(range(n_groups))
+    constant = ((spread[("x", "min")] == spread[("x", "max")]) |
+                (spread[("y", "min")] == spread[("y", "max")])).to_numpy()
+    r[(n < 2) | constant] = np.nan
+    if not dropna:
+        r[has_missing] = np.nan
+
+    # One row per group, ordered like the nested loops (outer level first)
+    first_rows = np.unique(codes, return_index=True)[1]
+    labels = df.loc[keep, group_cols].iloc[first_rows].reset_index(drop=True)
+    prefix_codes = [df.groupby(group_cols[:depth], sort=False, observed=True).ngroup().to_numpy()[keep][first_rows]
+                    for depth in range(1, len(group_cols))] + [np.arange(n_groups)]
+    order = np.lexsort(prefix_codes[::-1])
+
+    result = labels.copy()
+    result["Count"] = count
+    result["N"] = n
+    result["Correlation"] = r
+    result["Square Correlation"] = r ** 2
+    result["p-value"] = _pearson_p_values(r, n) if p_values else np.nan
+    return result.iloc[order].reset_index(drop=True)
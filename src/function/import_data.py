@@ -3,6 +3,14 @@ import os
 import sys
 import json
 from function.clean import process_data
+from function.accumulator import FrameAccumulator
+from function.compactFrame import compact_frame
+from function.rowDedup import RowDeduplicator
+
+__all__ = [
+    "convert_xls_to_xlsx", "load_excel", "load_excel_sheetname", "load_csv", "load_parquet",
+    "load_folders", "load_data",
+]
 
 
 def convert_xls_to_xlsx(file_path, output_path=None):
@@ -87,7 +95,14 @@ def load_parquet(file_path):
         print(f"Error loading {file_path}: {e}")
         return pd.DataFrame()
     
-def load_folders(base_path, subfolder, folders, years, all_data):
+def load_folders(base_path, subfolder, folders, years, all_data, compact=False, deduplicator=None):
+    # Collect processed files and concatenate once at the end (all_data stays first)
+    accumulator = FrameAccumulator(subfolder)
+    # Duplicates are dropped across all files of the subfolder, not only within each file
+    if deduplicator is None:
+        deduplicator = RowDeduplicator(subfolder)
+    accumulator.add(all_data)
+
     for folder in folders:
         if folder:  # Check if the folder is not an empty string
             for year in years:
@@ -104,14 +119,20 @@ def load_folders(base_path, subfolder, folders, years, all_data):
                                 data = pd.read_excel(file_path)
                             
                             # Process the data
-                            processed_data = process_data(data, folder, subfolder)
+                            processed_data = process_data(data, folder, subfolder, deduplicator,
+                                                          os.path.relpath(file_path, base_path))
+                            if compact:
+                                # Compact-frame mode: repeated text columns as categoricals
+                                processed_data = compact_frame(processed_data)
                             
-                            # Concatenate processed data to all_data
-                            all_data = pd.concat([all_data, processed_data], ignore_index=True)
+                            accumulator.add(processed_data)
                             
                 else:
                     print(f"Path does not exist: {folder_path}")  # Debugging
-    return all_data
+    dropped = deduplicator.summary()["Dropped"].sum()
+    print(f"[{subfolder}] {dropped:,} duplicate rows dropped across {len(deduplicator.counts):,} files")
+    deduplicator.save()
+    return accumulator.result()
 
 # def load_data(base_path, premium_folders, premium_sso_folders, years):
 #     all_data = pd.DataFrame()
@@ -124,14 +145,21 @@ def load_folders(base_path, subfolder, folders, years, all_data):
 #     print("Data combined into DataFrame successfully")
 #     return all_data
 
-def load_data(base_path, spen_drug_reiceive_folders, spen_drug_folders, years):
+def load_data(base_path, spen_drug_reiceive_folders, spen_drug_folders, years, compact=False, dedup_index_root=None):
+    # dedup_index_root: folder of persisted fingerprint indexes, so rows seen in earlier runs are dropped too
+    def deduplicator(subfolder):
+        index_path = os.path.join(dedup_index_root, f"{subfolder}.parquet") if dedup_index_root else None
+        return RowDeduplicator(subfolder, index_path=index_path)
+
     all_data = pd.DataFrame()
     if spen_drug_reiceive_folders:
         print(f"Loading SpenDrugReceive folders: {spen_drug_reiceive_folders}")  # Debugging
-        all_data = load_folders(base_path, 'SpenDrugReceive', spen_drug_reiceive_folders, years, all_data)
+        all_data = load_folders(base_path, 'SpenDrugReceive', spen_drug_reiceive_folders, years, all_data, compact,
+                                deduplicator('SpenDrugReceive'))
     if spen_drug_folders:
         print(f"Loading SpenDrug folders: {spen_drug_folders}")  # Debugging
-        all_data = load_folders(base_path, 'SpenDrug', spen_drug_folders, years, all_data)
+        all_data = load_folders(base_path, 'SpenDrug', spen_drug_folders, years, all_data, compact,
+                                deduplicator('SpenDrug'))
         all_data = all_data.drop(columns=['from_report'], errors='ignore')  # Drop 'Site Type' column
     print("Data combined into DataFrame successfully")
     return all_data
\ No newline at end of file
@@ -0,0 +1,142 @@
+import os
+import glob
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from function.configService import config_snapshot, install_snapshot
+
+
+def build_ingest_tasks(data_root, result_root, patterns_and_outputs, years_to_process=None, bus_to_process=None):
+    """
+    Walk the raw-data tree and build one task per (year, BU, category, file).
+
+    Parameters:
+        data_root (str): Root folder holding the year folders (e.g. 'ข้อมูลคลังสินค้า 2024').
+        result_root (str): Root folder for the converted output.
+        patterns_and_outputs (list): (glob pattern, category, convert function, skiprows) tuples.
+        years_to_process (list, optional): Year folder names to include. All if None/empty.
+        bus_to_process (list, optional): BU folder names to include. All if None/empty.
+
+    Returns:
+        list: Task dicts ready for run_ingest_tasks. A file matched by several patterns
+              (e.g. 'ORCMII JAN-DEC*' and 'ORCMII*') is scheduled only once, for the first match.
+    """
+    tasks = []
+
+    for year_folder in sorted(os.listdir(data_root)):
+        if years_to_process and year_folder not in years_to_process:
+            continue
+
+        year_path = os.path.join(data_root, year_folder)
+        if not os.path.isdir(year_path):
+            continue
+
+        year = year_folder.split()[-1]
+
+        for bu in sorted(os.listdir(year_path)):
+            if bus_to_process and bu not in bus_to_process:
+                continue
+
+            bu_path = os.path.join(year_path, bu)
+            if not os.path.isdir(bu_path):
+                continue
+
+            seen_files = set()
+            for pattern, category, func, skip in patterns_and_outputs:
+                output_folder = os.path.join(result_root, year, bu, category)
+
+                for file_path in sorted(glob.glob(os.path.join(bu_path, pattern))):
+                    if file_path in seen_files:
+                        continue
+                    seen_files.add(file_path)
+                    tasks.append({
+                        "year": year,
+                        "bu": bu,
+                        "category": category,
+                        "file_path": file_path,
+                        "output_folder": output_folder,
+                        "func": func,
+                        "skip": skip,
+                    })
+
+    return tasks
+
+
+def run_ingest_task(task):
+    """Run a single conversion task and return its timing and status (never raises)."""
+    start = time.perf_counter()
+    try:
+        os.makedirs(task["output_folder"], exist_ok=True)
+        task["func"](task["file_path"], task["output_folder"], task["skip"])
+        status, error = "OK", ""
+    except Exception as e:
+        status, error = "FAILED", f"{type(e).__name__}: {e}"
+
+    return {
+        "Year": task["year"],
+        "BU": task["bu"],
+        "Category": task["category"],
+        "File": os.path.basename(task["file_path"]),
+        "Status": status,
+        "Seconds": round(time.perf_counter() - start, 2),
+        "Error": error,
+    }
+
+
+def run_ingest_tasks(tasks, max_workers=None):
+    """
+    Run conversion tasks in a process pool, one task per file.
+
+    Parameters:
+        tasks (list): Task dicts from build_ingest_tasks.
+        max_workers (int, optional): Number of worker processes. None uses os.cpu_count();
+                                     1 runs everything in the current process.
+
+    Returns:
+        pd.DataFrame: One row per file with Year, BU, Category, File, Status, Seconds and Error.
+    """
+    results = []
+
+    def collect(result):
+        print(f"  [{result['Status']}] {result['Year']}/{result['BU']}/{result['Category']} "
+              f"{result['File']} ({result['Seconds']:.2f}s)")
+        results.append(result)
+
+    if max_workers == 1:
+        for task in tasks:
+            collect(run_ingest_task(task))
+    else:
+        # Workers get the parent's parsed configs instead of re-reading them
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=install_snapshot,
+                                 initargs=(config_snapshot(),)) as executor:
+            futures = [executor.submit(run_ingest_task, task) for task in tasks]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    columns = ["Year", "BU", "Category", "File", "Status", "Seconds", "Error"]
+    summary = pd.DataFrame(results, columns=columns)
+    return summary.sort_values(["Year", "BU", "Category", "File"]).reset_index(drop=True)
+
+
+def print_ingest_summary(summary):
+    """Print per-file timings, failures and per-(Year, BU, Category) totals."""
+    if summary.empty:
+        print("No files matched the ingest patterns.")
+        return
+
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.max_colwidth", 60):
+        print("\nPer-file summary:")
+        print(summary.drop(columns=["Error"]).to_string(index=False))
+
+        totals = summary.groupby(["Year", "BU", "Category"]).agg(
+            Files=("File", "size"),
+            Failed=("Status", lambda s: (s != "OK").sum()),
+            Seconds=("Seconds", "sum"),
+        ).reset_index()
+        print("\nTotals by Year / BU / Category:")
+        print(totals.to_string(index=False))
+
+        failed = summary[summary["Status"] != "OK"]
+        if not failed.empty:
+            print(f"\n{len(failed)} file(s) failed:")
+            print(failed[["Year", "BU", "Category", "File", "Error"]].to_string(index=False))
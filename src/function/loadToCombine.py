@@ -5,9 +5,13 @@ import os
 # Adding the parent directory to sys.path for module imports
 sys.path.append('../')
 
-from function.import_data import *
-from function.clean import *
+from function.import_data import load_parquet
+from function.clean import process_hn_data, process_spen_drug_receive_data
+from function.accumulator import FrameAccumulator
+from function.compactFrame import compact_frame, write_compact_parquet
 from function.addColumn import add_concatenation_columns, add_site_type
+from function.visitKey import add_readable_keys
+from function.rowDedup import RowDeduplicator
 
 def combine_parquet_files(directory):
     # List to hold df
@@ -63,7 +67,8 @@ def combine_xlsx_to_parquet(directory):
     return combined_df
 
 def combine_spen_drug_receive_data(raw_data_folder_path, spen_drug_receive_folders, spen_drug_folders, years, output_path):
-    combined_data = pd.DataFrame()
+    accumulator = FrameAccumulator("SpenDrugReceive")
+    deduplicator = RowDeduplicator("SpenDrugReceive")  # duplicates across files are dropped too
     
     for folder in spen_drug_receive_folders:
         for hospital_folder in spen_drug_folders:
@@ -81,23 +86,27 @@ def combine_spen_drug_receive_data(raw_data_folder_path, spen_drug_receive_folde
 
                         try:
                             data = pd.read_excel(file_path)
-                            data = process_spen_drug_receive_data(data, hospital_folder)
+                            data = process_spen_drug_receive_data(data, hospital_folder, deduplicator, file_path)
                             
-                            combined_data = pd.concat([combined_data, data], ignore_index=True)
+                            accumulator.add(data)
                         except Exception as e:
                             print(f"Error loading {file_name}: {e}")
     
+    print(deduplicator.summary().to_string(index=False))
+    combined_data = accumulator.result()
     if not combined_data.empty:
         # Add patient and OPD Visit Count
         combined_data = add_concatenation_columns(combined_data)
         combined_data = add_site_type(combined_data)
-        combined_data.to_excel(output_path)
+        # Excel output gets the readable Patient / OPD Visit text keys
+        add_readable_keys(combined_data).to_excel(output_path)
         print(f"SpenDrugReceive data combined and saved")
     else:
         print("No SpenDrugReceive data was combined. Please check the file paths.")
         
-def combine_spen_hn_data(raw_data_folder_path, spen_hn_folders, output_path):
-    combined_data = pd.DataFrame()
+def combine_spen_hn_data(raw_data_folder_path, spen_hn_folders, output_path, compact=False):
+    accumulator = FrameAccumulator("HN")
+    deduplicator = RowDeduplicator("HN")  # duplicates across files are dropped too
     
     for hospital_folder in spen_hn_folders:
         folder_path = os.path.join(raw_data_folder_path, hospital_folder)
@@ -113,11 +122,15 @@ def combine_spen_hn_data(raw_data_folder_path, spen_hn_folders, output_path):
                 
                 try:
                     data = pd.read_excel(file_path)
-                    data = process_hn_data(data)
-                    combined_data = pd.concat([combined_data, data], ignore_index=True)
+                    data = process_hn_data(data, deduplicator, file_path)
+                    if compact:
+                        data = compact_frame(data)
+                    accumulator.add(data)
                 except Exception as e:
                     print(f"Error loading {file_name}: {e}")
     
+    print(deduplicator.summary().to_string(index=False))
+    combined_data = accumulator.result()
     if not combined_data.empty:
         # Correcting column names for summary count and add patient and OPD Visit Count
         combined_data.rename(columns={
@@ -125,7 +138,11 @@ def combine_spen_hn_data(raw_data_folder_path, spen_hn_folders, output_path):
             'VISITDATE': 'VisitDate'
         }, inplace=True)
         combined_data = add_concatenation_columns(combined_data)
-        combined_data.to_parquet(output_path)
+        if compact:
+            # Compact columns are written dictionary-encoded and load back as categoricals
+            write_compact_parquet(combined_data, output_path)
+        else:
+            combined_data.to_parquet(output_path)
         print(f"HN data combined and saved to")
     else:
         print("No HN data was combined. Please check the file paths.")
\ No newline at end of file
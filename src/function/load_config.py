@@ -1,17 +1,12 @@
-import json
-from pathlib import Path
+import os
+from function.configService import get_config
 
 def load_all_config(main_config_path="config/main_config.json"):
-    """Load main config and all referenced subconfigs."""
-    main_config_path = Path(main_config_path)
-
-    with open(main_config_path, encoding="utf-8") as f:
-        main_config = json.load(f)
+    """Load main config and all referenced subconfigs (relative paths from the working directory, each parsed once)."""
+    main_config = get_config(os.path.abspath(main_config_path), required_keys=["configs"])
 
     def load_sub(path_key):
-        sub_path = Path(main_config["configs"][path_key])
-        with open(sub_path, encoding="utf-8") as f:
-            return json.load(f)
+        return get_config(os.path.abspath(main_config["configs"][path_key]))
 
     return {
         "main": main_config,
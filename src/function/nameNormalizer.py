@@ -0,0 +1,120 @@
+import os
+import re
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from function.compactFrame import is_categorical
+from function.configService import resolve_path, shared_config
+
+# --------------------------------------------------------------------
+# Name normalization computed once per distinct value (doctor, clinic, right names)
+# --------------------------------------------------------------------
+
+# Learned raw -> cleaned tables, one JSON per normalizer. They are run output, not configuration:
+# the folder is "NAME_MAP_DIR" in config/config.json (relative to the project root), default below.
+NAME_MAP_DIR = "results/cache/name_maps"
+
+
+def name_map_dir():
+    """Folder of the learned name tables (config/config.json "NAME_MAP_DIR")."""
+    return resolve_path(shared_config().get("NAME_MAP_DIR") or NAME_MAP_DIR)
+
+_PARENTHESES = re.compile(r"\(.*?\)")
+_MULTI_SPACE = re.compile(r"\s{2,}")
+
+
+class NameNormalizer:
+    """
+    Clean a text column by working on its distinct values only.
+
+    Each distinct name is cleaned once: names containing one of the exceptions are
+    kept as they are, the others have "(...)" removed (if strip_parentheses) and
+    repeated spaces collapsed; whole-value replacements are applied last. Results
+    are mapped back to the rows through factorized (or categorical) codes, and the
+    learned raw -> cleaned table is kept in a JSON file between runs. The table is
+    discarded automatically when the exceptions or replacements change.
+
+    Usage:
+        normalizer = NameNormalizer("DoctorName", exceptions=[...], replacements={...})
+        df['CleanedDoctorName'] = normalizer.normalize(df['Doctor Name'])
+        normalizer.save()
+    """
+
+    def __init__(self, name, exceptions=(), replacements=None, strip_parentheses=True, map_path="default"):
+        self.name = name
+        self.exceptions = list(exceptions)
+        self.replacements = dict(replacements or {})
+        self.strip_parentheses = strip_parentheses
+        self.map_path = os.path.join(name_map_dir(), f"{name}.json") if map_path == "default" else map_path
+
+        # All exceptions in one compiled alternation, so each name is scanned once for all of them
+        self._exception_pattern = (re.compile("|".join(re.escape(e) for e in self.exceptions))
+                                   if self.exceptions else None)
+        self._rules = hashlib.sha1(json.dumps(
+            [self.exceptions, sorted(self.replacements.items()), strip_parentheses], ensure_ascii=False
+        ).encode("utf-8")).hexdigest()
+
+        self.mapping = {}
+        self.learned = 0
+        self._load()
+
+    def _load(self):
+        if not self.map_path or not os.path.exists(self.map_path):
+            return
+        try:
+            with open(self.map_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if stored.get("rules") == self._rules:
+            self.mapping = stored.get("mapping", {})
+
+    def save(self):
+        """Write the learned mapping table (only when new names were cleaned)."""
+        if not self.map_path or not self.learned:
+            return
+        os.makedirs(os.path.dirname(self.map_path), exist_ok=True)
+        tmp_path = self.map_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"rules": self._rules, "mapping": self.mapping}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.map_path)
+        print(f"[{self.name}] saved {len(self.mapping):,} names ({self.learned:,} new) → {self.map_path}")
+        self.learned = 0
+
+    def clean(self, name):
+        """Clean one name (no caching)."""
+        if self._exception_pattern is not None and self._exception_pattern.search(name):
+            cleaned = name
+        else:
+            cleaned = _PARENTHESES.sub("", name) if self.strip_parentheses else name
+            cleaned = _MULTI_SPACE.sub(" ", cleaned).strip()
+        return self.replacements.get(cleaned, cleaned)
+
+    def lookup(self, name):
+        cleaned = self.mapping.get(name)
+        if cleaned is None:
+            cleaned = self.clean(name)
+            self.mapping[name] = cleaned
+            self.learned += 1
+        return cleaned
+
+    def normalize(self, series):
+        """
+        Return the cleaned series; missing values stay missing. Categorical input
+        gives a categorical result, anything else an object series.
+        """
+        if is_categorical(series):
+            codes = series.cat.codes.to_numpy()
+            uniques = series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+
+        cleaned = [self.lookup(str(name)) for name in uniques]
+        cleaned_codes, cleaned_uniques = pd.factorize(pd.Index(cleaned, dtype=object))
+        # Rows with a missing name have code -1, which picks the -1 appended at the end
+        row_codes = np.append(cleaned_codes, -1)[codes]
+
+        result = pd.Series(pd.Categorical.from_codes(row_codes, categories=cleaned_uniques),
+                           index=series.index, name=series.name)
+        return result if is_categorical(series) else result.astype(object)
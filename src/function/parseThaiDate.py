@@ -1,9 +1,19 @@
 import os
+import re
 import glob
-import chardet
+import numpy as np
 import pandas as pd
 import shutil
-import xlrd
+from function.convertCache import incremental_conversion
+from function.delimitedReader import read_delimited, iter_delimited
+
+__all__ = [
+    "thai_months", "BUDDHIST_ERA_MIN_YEAR", "BUDDHIST_ERA_OFFSET", "OUTPUT_FORMATS",
+    "STREAM_CHUNK_LINES", "parse_thai_date", "parse_thai_dates", "prepare_for_parquet",
+    "print_read_info", "write_parquet_output", "split_item_blocks", "is_binary_excel",
+    "stream_orcmii_file_to_parquet", "convert_thai_file_to_xlsx",
+    "convert_pipe_delimited_file_to_xlsx", "convert_orcmii_file_to_xlsx",
+]
 
 # --------------------------------------------------------------------
 # 1) Thai month abbreviations mapping
@@ -23,13 +33,18 @@ thai_months = {
     "ธ.ค.": "12"
 }
 
+# Years at or above this are Buddhist Era (B.E. 2400 = 1857 C.E.)
+BUDDHIST_ERA_MIN_YEAR = 2400
+BUDDHIST_ERA_OFFSET = 543
+
 # --------------------------------------------------------------------
 # 2) Function to parse Thai-style dates (e.g. "20-มี.ค.-24")
 # --------------------------------------------------------------------
 def parse_thai_date(date_str):
     """
     Parse Thai-style dates like '20-มี.ค.-24' into a proper datetime.
-    Adjust logic if you use B.E. (e.g., '2567' -> 2024).
+    2-digit years are C.E. (24 -> 2024); 4-digit B.E. years are shifted (2567 -> 2024).
+    For whole columns use parse_thai_dates, which gives the same results much faster.
     """
     parts = date_str.split("-")
     if len(parts) != 3:
@@ -37,11 +52,13 @@ def parse_thai_date(date_str):
     
     day_str, thai_month, year_str = [p.strip() for p in parts]
     
-    # Convert 2-digit years (24 -> 2024). If you have B.E. years, subtract 543.
+    # Convert 2-digit years (24 -> 2024) and B.E. years (2567 -> 2024)
     try:
         year = int(year_str)
         if year < 100:
             year += 2000
+        elif year >= BUDDHIST_ERA_MIN_YEAR:
+            year -= BUDDHIST_ERA_OFFSET
     except ValueError:
         return pd.NaT
     
@@ -61,37 +78,164 @@ def parse_thai_date(date_str):
     return pd.to_datetime(iso_string, format="%Y-%m-%d", errors="coerce")
 
 # --------------------------------------------------------------------
-# 3) Function to convert a single .xls (text) file to .xlsx
+# 2.1) Vectorized version for whole columns
 # --------------------------------------------------------------------
+_THAI_DATE_PATTERN = r"^\s*(\d+)\s*-\s*([^-]*?)\s*-\s*(\d+)\s*$"
+_THAI_MONTH_NUMBERS = {name: int(num) for name, num in thai_months.items()}
 
-def convert_thai_file_to_xlsx(input_file, output_folder, skiprows: int = 0):
-    import os, chardet, pandas as pd
+def parse_thai_dates(series):
+    """
+    Parse a whole Series of Thai-style dates ('20-มี.ค.-24') into datetime64.
 
-    # Detect encoding
-    with open(input_file, 'rb') as f:
-        sample = f.read(100_000)
-    detected = chardet.detect(sample)
-    encoding = detected['encoding'] or 'cp874'
-    print(f"File: {input_file}\n  Detected encoding: {encoding} ({detected['confidence']*100:.1f}%)")
+    Same results as series.apply(parse_thai_date), but each distinct string is
+    parsed only once (the column is factorized first) and the parsing itself is a
+    single regex extraction, a month lookup and one datetime construction.
+    Missing and non-string values become NaT.
+    """
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    uniques = uniques.where(uniques.map(type).eq(str))  # numbers, datetimes, ... are not Thai dates
 
-    # Try multiple encodings with safe error handling
-    for enc in (encoding, 'cp874', 'utf-8'):
-        try:
-            df = pd.read_csv(
-                input_file,
-                sep="\t",
-                encoding=enc,
-                encoding_errors='replace',
-                skiprows=skiprows,
-                engine='python',
-                on_bad_lines='skip'
-            )
-            print(f"  → Successfully read with encoding: {enc}")
-            break
-        except Exception as e:
-            print(f"    ✗ Failed to read with {enc}: {e}")
-    else:
-        raise RuntimeError("All encoding attempts failed.")
+    parts = uniques.str.extract(_THAI_DATE_PATTERN)
+    day = pd.to_numeric(parts[0], errors="coerce")
+    month = parts[1].map(_THAI_MONTH_NUMBERS)
+    year = pd.to_numeric(parts[2], errors="coerce")
+    year = year.mask(year < 100, year + 2000)
+    year = year.mask(year >= BUDDHIST_ERA_MIN_YEAR, year - BUDDHIST_ERA_OFFSET)
+
+    parsed = pd.to_datetime(pd.DataFrame({"year": year, "month": month, "day": day}), errors="coerce")
+
+    # Broadcast back to every row; factorize marks missing values with -1, which picks the trailing NaT
+    values = np.append(parsed.to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+    return pd.Series(values[codes], index=series.index, name=series.name)
+
+# --------------------------------------------------------------------
+# 2.2) Output helpers: typed Parquet straight from the parsed frame
+# --------------------------------------------------------------------
+OUTPUT_FORMATS = ("xlsx", "parquet", "both")
+
+def _check_output_format(output_format):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}, got {output_format!r}")
+
+def prepare_for_parquet(df):
+    """
+    Make a parsed frame safe for Arrow without touching the typed columns
+    (Int64, datetime64, float). Column names become strings and object columns
+    holding mixed Python types are cast to str, keeping missing values as null.
+    """
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) != "string":
+            df[col] = df[col].astype(str).where(df[col].notna(), None)
+    return df
+
+def print_read_info(input_file, info):
+    print(f"Processing {input_file}\n  Encoding: {info['encoding']} → {info['rows']} rows, "
+          f"{info['skipped_lines']} bad line(s) skipped")
+
+def write_parquet_output(df, output_folder, file_stem):
+    """Write a parsed frame to <output_folder>/<file_stem>.parquet (zstd) and return the path."""
+    output_path = os.path.join(output_folder, f"{file_stem}.parquet")
+    prepare_for_parquet(df).to_parquet(output_path, index=False, compression="zstd")
+    print(f"  Saved → {output_path}")
+    return output_path
+
+# --------------------------------------------------------------------
+# 2.3) "Item" block splitting and streaming ORCMII conversion
+# --------------------------------------------------------------------
+STREAM_CHUNK_LINES = 500_000
+
+# read_csv renames repeated headers to "Item.1", "Item.2", ... so both forms start a block
+_ITEM_HEADER = re.compile(r"^item(?:\.(\d+))?$")
+
+def split_item_blocks(df):
+    """
+    Yield (sheet_name, block) for every repeated column block that starts at an "Item" header.
+    The ".N" suffix read_csv added to the repeated headers is removed from each block,
+    and rows that are empty within a block are dropped.
+    """
+    starts = []
+    for i, col in enumerate(df.columns):
+        match = _ITEM_HEADER.match(str(col).strip().lower())
+        if match:
+            starts.append((i, match.group(1)))
+    ends = [start for start, _ in starts[1:]] + [df.shape[1]]
+
+    for idx, ((start, suffix), end) in enumerate(zip(starts, ends), start=1):
+        block = df.iloc[:, start:end]
+        if suffix:
+            tail = f".{suffix}"
+            block = block.rename(columns=lambda c: c[:-len(tail)] if str(c).endswith(tail) else c)
+        yield f"Sheet{idx}", block.dropna(how="all")
+
+def is_binary_excel(file_path):
+    """True for real .xls (OLE2) or .xlsx (zip) workbooks, False for text exports named .xls."""
+    with open(file_path, "rb") as f:
+        magic = f.read(4)
+    return magic in (b"\xd0\xcf\x11\xe0", b"PK\x03\x04")
+
+def stream_orcmii_file_to_parquet(input_file, output_folder, skiprows: int = 0, chunk_lines: int = STREAM_CHUNK_LINES):
+    """
+    Streaming variant of the ORCMII conversion for tab-delimited text exports.
+
+    Reads at most chunk_lines lines at a time, splits each chunk into its "Item" blocks
+    and appends every block as a row group to <base>_SheetN.parquet. All values are
+    stored as strings, so every chunk has the same schema; cast when reading.
+
+    Returns:
+        list: Paths of the Parquet files written (one per block).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    base = os.path.splitext(os.path.basename(input_file))[0]
+    os.makedirs(output_folder, exist_ok=True)
+
+    writers = {}  # sheet_name -> (path, schema, ParquetWriter)
+    rows = {}
+    skipped = 0
+    encoding = None
+
+    try:
+        for chunk, info in iter_delimited(input_file, sep="\t", skiprows=skiprows,
+                                          chunk_lines=chunk_lines, dtype=str):
+            encoding = info["encoding"]
+            skipped += info["skipped_lines"]
+            for sheet_name, block in split_item_blocks(chunk):
+                if sheet_name not in writers:
+                    path = os.path.join(output_folder, f"{base}_{sheet_name}.parquet")
+                    schema = pa.schema([(str(c), pa.string()) for c in block.columns])
+                    writers[sheet_name] = (path, schema, pq.ParquetWriter(path, schema, compression="zstd"))
+                    rows[sheet_name] = 0
+                path, schema, writer = writers[sheet_name]
+                if len(block):
+                    block.columns = schema.names
+                    writer.write_table(pa.Table.from_pandas(block, schema=schema, preserve_index=False))
+                    rows[sheet_name] += len(block)
+    finally:
+        for _, _, writer in writers.values():
+            writer.close()
+
+    print(f"Processing {input_file} (streaming)\n  Encoding: {encoding}, {skipped} bad line(s) skipped")
+    for sheet_name, (path, schema, _) in writers.items():
+        print(f"  → Wrote {sheet_name} ({rows[sheet_name]} rows × {len(schema)} cols) → {path}")
+
+    return [path for path, _, _ in writers.values()]
+
+# --------------------------------------------------------------------
+# 3) Function to convert a single .xls (text) file to .xlsx
+# --------------------------------------------------------------------
+
+@incremental_conversion
+def convert_thai_file_to_xlsx(input_file, output_folder, skiprows: int = 0, output_format: str = "xlsx"):
+    _check_output_format(output_format)
+
+    # Encoding is detected once per source pattern; C parser, bad lines skipped and counted
+    df, info = read_delimited(input_file, sep="\t", skiprows=skiprows)
+    print(f"File: {input_file}\n  Encoding: {info['encoding']} → {info['rows']} rows, "
+          f"{info['skipped_lines']} bad line(s) skipped")
     
     # Split single‑column pipe‑delimited text into real columns
     if df.shape[1] == 1 and df.columns[0].find("|") != -1:
@@ -101,13 +245,22 @@ def convert_thai_file_to_xlsx(input_file, output_folder, skiprows: int = 0):
 
     # Parse Thai date if present
     if "TRANSACTION_DATE" in df.columns:
-        df["TRANSACTION_DATE"] = df["TRANSACTION_DATE"].apply(parse_thai_date)
+        df["TRANSACTION_DATE"] = parse_thai_dates(df["TRANSACTION_DATE"])
 
-    # Save to XLSX
     base = os.path.splitext(os.path.basename(input_file))[0]
-    out_path = os.path.join(output_folder, f"{base}.xlsx")
-    df.to_excel(out_path, index=False)
-    print(f"  Saved → {out_path}\n")
+    outputs = []
+
+    if output_format in ("parquet", "both"):
+        outputs.append(write_parquet_output(df, output_folder, base))
+
+    # Save to XLSX
+    if output_format in ("xlsx", "both"):
+        out_path = os.path.join(output_folder, f"{base}.xlsx")
+        df.to_excel(out_path, index=False)
+        print(f"  Saved → {out_path}\n")
+        outputs.append(out_path)
+
+    return outputs[0] if len(outputs) == 1 else outputs
 
 
 # def convert_pipe_delimited_file_to_xlsx(input_file, output_folder, skiprows: int = 0):
@@ -182,7 +335,9 @@ def convert_thai_file_to_xlsx(input_file, output_folder, skiprows: int = 0):
 #     print(f"Saved → {output_path}")
 
 
-def convert_pipe_delimited_file_to_xlsx(input_file, output_folder, skiprows: int = 0):
+@incremental_conversion
+def convert_pipe_delimited_file_to_xlsx(input_file, output_folder, skiprows: int = 0, output_format: str = "xlsx"):
+    _check_output_format(output_format)
     base = os.path.splitext(os.path.basename(input_file))[0]
     ext = os.path.splitext(input_file)[1].lower()
 
@@ -200,30 +355,8 @@ def convert_pipe_delimited_file_to_xlsx(input_file, output_folder, skiprows: int
 
     # 3️⃣ If not .xls or .xls read failed, do pipe‑delimited parsing
     if df is None:
-        with open(input_file, 'rb') as f:
-            sample = f.read(100_000)
-        result = chardet.detect(sample)
-        enc = result.get('encoding') or 'cp874'
-        print(f"Processing {input_file}\n  Detected encoding: {enc} ({result['confidence']*100:.1f}%)")
-
-        encodings = ['cp874', 'utf-8'] if enc.lower() == 'shift_jis' else [enc, 'cp874', 'utf-8']
-        for e in dict.fromkeys(encodings):
-            try:
-                df = pd.read_csv(
-                    input_file,
-                    sep="|",
-                    encoding=e,
-                    engine="python",
-                    on_bad_lines="skip",
-                    skiprows=skiprows
-                )
-                print(f"  → Successfully read with encoding: {e}")
-                break
-            except Exception:
-                continue
-
-        if df is None:
-            raise RuntimeError("All encoding attempts failed.")
+        df, info = read_delimited(input_file, sep="|", skiprows=skiprows)
+        print_read_info(input_file, info)
 
         # Split single‑column edge case
         if df.shape[1] == 1 and "|" in df.columns[0]:
@@ -242,17 +375,27 @@ def convert_pipe_delimited_file_to_xlsx(input_file, output_folder, skiprows: int
         if col in df.columns:
             df[col] = df[col].astype(str)
 
-    # 5️⃣ Write to .xlsx
-    output_path = os.path.join(output_folder, f"{base}.xlsx")
-    with pd.ExcelWriter(output_path, engine='xlsxwriter',
-                        date_format='dd-mmm-yy', datetime_format='dd-mmm-yy') as writer:
-        df.to_excel(writer, index=False)
-        ws = writer.sheets['Sheet1']
-        ws.ignore_errors({'type': 'number_stored_as_text'})
-        for i, col in enumerate(df.columns):
-            ws.set_column(i, i, len(col) + 2)
+    outputs = []
+
+    # 5️⃣ Write typed Parquet straight from the frame
+    if output_format in ("parquet", "both"):
+        outputs.append(write_parquet_output(df, output_folder, base))
 
-    print(f"Saved → {output_path}")
+    # 6️⃣ Write to .xlsx
+    if output_format in ("xlsx", "both"):
+        output_path = os.path.join(output_folder, f"{base}.xlsx")
+        with pd.ExcelWriter(output_path, engine='xlsxwriter',
+                            date_format='dd-mmm-yy', datetime_format='dd-mmm-yy') as writer:
+            df.to_excel(writer, index=False)
+            ws = writer.sheets['Sheet1']
+            ws.ignore_errors({'type': 'number_stored_as_text'})
+            for i, col in enumerate(df.columns):
+                ws.set_column(i, i, len(col) + 2)
+
+        print(f"Saved → {output_path}")
+        outputs.append(output_path)
+
+    return outputs[0] if len(outputs) == 1 else outputs
 
 
 # def convert_orcmii_file_to_xlsx(input_file, output_folder, skiprows: int = 0):
@@ -314,16 +457,42 @@ def convert_pipe_delimited_file_to_xlsx(input_file, output_folder, skiprows: int
 
 #     print(f"Saved → {output_path}")
 
-def convert_orcmii_file_to_xlsx(input_file, output_folder, skiprows: int = 0):
+@incremental_conversion
+def convert_orcmii_file_to_xlsx(input_file, output_folder, skiprows: int = 0, output_format: str = "xlsx",
+                                streaming: bool = False, chunk_lines: int = STREAM_CHUNK_LINES):
+    """
+    Split an ORCMII/HISMIC/SSBMIC/POSMIS export into its repeated "Item" column blocks.
+
+    With streaming=True and output_format="parquet", tab-delimited sources are read in
+    bounded chunks and each block is appended to its own Parquet file, so memory does
+    not grow with the size of the yearly file. Real Excel workbooks are always read whole.
+    """
+    _check_output_format(output_format)
     base = os.path.splitext(os.path.basename(input_file))[0]
     ext = os.path.splitext(input_file)[1].lower()
+
+    if streaming and output_format == "parquet" and not is_binary_excel(input_file):
+        return stream_orcmii_file_to_parquet(input_file, output_folder, skiprows, chunk_lines)
     # Skip existing .xlsx
-    if ext.lower() == ".xlsx":
+    if ext.lower() == ".xlsx" and output_format == "xlsx":
         os.makedirs(output_folder, exist_ok=True)
         output_path = os.path.join(output_folder, os.path.basename(input_file))
         shutil.copy2(input_file, output_path)
         print(f"Skipped conversion — copied existing Excel → {output_path}")
-        return
+        return output_path
+
+    if ext.lower() == ".xlsx":
+        # Parquet requested from an already-converted workbook: read every sheet back as one frame per block
+        print(f"Processing Excel (.xlsx) → converting to .parquet")
+        sheets = pd.read_excel(input_file, sheet_name=None)
+        os.makedirs(output_folder, exist_ok=True)
+        outputs = [write_parquet_output(block, output_folder, f"{base}_{sheet_name}")
+                   for sheet_name, block in sheets.items()]
+        if output_format == "both":
+            output_path = os.path.join(output_folder, os.path.basename(input_file))
+            shutil.copy2(input_file, output_path)
+            outputs.append(output_path)
+        return outputs
 
     # Convert .xls via read_excel
     # if ext.lower() == ".xls":
@@ -335,55 +504,32 @@ def convert_orcmii_file_to_xlsx(input_file, output_folder, skiprows: int = 0):
             df = pd.read_excel(input_file, skiprows=skiprows, engine="xlrd")
         except Exception as e:
             print(f"⚠️ read_excel failed: {e}\n   Falling back to tab‑delimited parser")
-
-            with open(input_file, "rb") as f:
-                sample = f.read(100_000)
-            detected = chardet.detect(sample)
-            encoding = detected.get("encoding") or "cp874"
-            if encoding.lower() == "ascii":
-                encoding = "cp874"
-            print(f"Processing {input_file}\n  Detected encoding: {encoding} ({detected['confidence']*100:.1f}%)")
-
-            df = pd.read_csv(
-                input_file,
-                sep="\t",
-                encoding=encoding,
-                skiprows=skiprows,
-                engine="python",
-                on_bad_lines="skip"
-            )
+            df, info = read_delimited(input_file, sep="\t", skiprows=skiprows)
+            print_read_info(input_file, info)
     else:
         # Parse tab‑delimited text
-        with open(input_file, "rb") as f:
-            sample = f.read(100_000)
-        detected = chardet.detect(sample)
-        encoding = detected.get("encoding") or "cp874"
-        if encoding.lower() == "ascii":
-            encoding = "cp874"
-        print(f"Processing {input_file}\n  Detected encoding: {encoding} ({detected['confidence']*100:.1f}%)")
-
-        df = pd.read_csv(
-            input_file,
-            sep="\t",
-            encoding=encoding,
-            skiprows=skiprows,
-            engine="python",
-            on_bad_lines="skip"
-        )
+        df, info = read_delimited(input_file, sep="\t", skiprows=skiprows)
+        print_read_info(input_file, info)
 
     # Split into blocks by “Item” header
-    cols = df.columns.tolist()
-    starts = [i for i, c in enumerate(cols) if c.strip().lower() == "item"]
-    ends = starts[1:] + [len(cols)]
-
     os.makedirs(output_folder, exist_ok=True)
-    output_path = os.path.join(output_folder, f"{base}.xlsx")
+    blocks = list(split_item_blocks(df))
+    outputs = []
+
+    # One Parquet file per block, named after the sheet it would have been written to
+    if output_format in ("parquet", "both"):
+        for sheet_name, block in blocks:
+            outputs.append(write_parquet_output(block, output_folder, f"{base}_{sheet_name}"))
+
+    if output_format in ("xlsx", "both"):
+        output_path = os.path.join(output_folder, f"{base}.xlsx")
+
+        with pd.ExcelWriter(output_path, engine="xlsxwriter") as writer:
+            for sheet_name, block in blocks:
+                block.to_excel(writer, sheet_name=sheet_name, index=False)
+                print(f"  → Wrote {sheet_name} ({block.shape[0]} rows × {block.shape[1]} cols)")
 
-    with pd.ExcelWriter(output_path, engine="xlsxwriter") as writer:
-        for idx, (start, end) in enumerate(zip(starts, ends), start=1):
-            block = df.iloc[:, start:end].dropna(how="all")
-            sheet_name = f"Sheet{idx}"
-            block.to_excel(writer, sheet_name=sheet_name, index=False)
-            print(f"  → Wrote {sheet_name} ({block.shape[0]} rows × {block.shape[1]} cols)")
+        print(f"Saved → {output_path}")
+        outputs.append(output_path)
 
-    print(f"Saved → {output_path}")
\ No newline at end of file
+    return outputs[0] if len(outputs) == 1 else outputs
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------
+# Rule-driven row partitioning: kept / removed frames and a per-rule audit
+# --------------------------------------------------------------------
+
+PASSED = -1  # Reason code of a row no rule rejected
+
+AUDIT_COLUMNS = ["Rule", "Rows In", "Removed", "Rows Out"]
+
+
+def _keep_mask(mask, n_rows):
+    """Rule output as a numpy bool array; missing values count as not kept."""
+    values = mask.to_numpy() if isinstance(mask, (pd.Series, pd.Index)) else np.asarray(mask)
+    if values.dtype != bool:
+        values = np.where(pd.isna(values), False, values).astype(bool)
+    return np.broadcast_to(values, (n_rows,))
+
+
+def evaluate_rules(df, rules):
+    """
+    Evaluate a chain of named rules once each and record the first rule that rejects every row.
+
+    Parameters:
+        df (pd.DataFrame): Rows to check.
+        rules (list): (name, keep) pairs in order; keep(df) returns a boolean mask of the
+                      rows to keep (NA counts as not kept, so rules set na= on str checks).
+
+    Returns:
+        tuple: (reasons, audit)
+            reasons (np.ndarray): Per row, the index of the first rejecting rule or PASSED (-1).
+            audit (pd.DataFrame): Per rule the rows reaching it, removed by it and passing it.
+    """
+    names = [name for name, _ in rules]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Rule names must be unique: {names}")
+
+    reasons = np.full(len(df), PASSED, dtype=np.int16)
+    audit = []
+    for position, (name, keep) in enumerate(rules):
+        undecided = reasons == PASSED
+        rejected = undecided & ~_keep_mask(keep(df), len(df))
+        reasons[rejected] = position
+
+        rows_in, removed = int(undecided.sum()), int(rejected.sum())
+        audit.append((name, rows_in, removed, rows_in - removed))
+
+    return reasons, pd.DataFrame(audit, columns=AUDIT_COLUMNS)
+
+
+def partition_rows(df, rules, label_column=None):
+    """
+    Split df into the rows every rule keeps and the rows some rule removes.
+
+    Each rule is evaluated once, and each output frame is taken from df once, in
+    the original row order. The input frame is not modified.
+
+    Parameters:
+        df (pd.DataFrame): Rows to split.
+        rules (list): (name, keep) pairs, see evaluate_rules.
+        label_column (str, optional): Add this column to the removed frame with the
+                                      name of the first rule that rejected the row.
+
+    Returns:
+        tuple: (kept, removed, audit)
+    """
+    reasons, audit = evaluate_rules(df, rules)
+    passed = reasons == PASSED
+
+    kept = df[passed]
+    removed = df[~passed]
+    if label_column:
+        removed = removed.assign(**{label_column: pd.Categorical.from_codes(
+            reasons[~passed], categories=[name for name, _ in rules])})
+    return kept, removed, audit
@@ -0,0 +1,172 @@
+import os
+import re
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from function.configService import config_snapshot, install_snapshot
+from function.compactFrame import write_compact_parquet
+
+# --------------------------------------------------------------------
+# Streaming Excel report writer (constant memory) with CSV/Parquet sidecars
+# --------------------------------------------------------------------
+
+MAX_SHEET_NAME_LENGTH = 31
+MAX_SHEET_ROWS = 1_048_576           # Excel limit, header row included
+WRITE_CHUNK_ROWS = 50_000            # Rows converted to Python values at a time
+SIDECAR_FORMATS = ("csv", "parquet")
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"
+
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def make_sheet_name(name, used):
+    """
+    Turn any group value into a valid, unique Excel sheet name.
+
+    Characters Excel rejects ([]:*?/\\) become '_', leading/trailing apostrophes are
+    dropped, 'History' (reserved) gets a '_' and the name is cut to 31 characters.
+    A name already in used (compared ignoring case, as Excel does) gets a '~2', '~3',
+    ... suffix inside the 31 characters. The chosen name is added to used.
+
+    Parameters:
+        name: Group value or title (tuples from multi-column groupbys are joined with '_').
+        used (set): Lower-cased names already taken in the workbook.
+
+    Returns:
+        str: The sheet name.
+    """
+    if isinstance(name, tuple):
+        name = "_".join(str(part) for part in name)
+    base = _INVALID_SHEET_CHARS.sub("_", str(name)).strip().strip("'") or "Sheet"
+    if base.lower() == "history":
+        base += "_"
+
+    candidate = base[:MAX_SHEET_NAME_LENGTH]
+    number = 2
+    while candidate.lower() in used:
+        suffix = f"~{number}"
+        candidate = base[:MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+        number += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def _excel_values(chunk):
+    """Column arrays of plain Python values for xlsxwriter; missing values become None (blank cell)."""
+    columns = []
+    for col in chunk.columns:
+        series = chunk[col]
+        if isinstance(series.dtype, pd.DatetimeTZDtype):
+            series = series.dt.tz_localize(None)
+        values = series.astype(object)
+        columns.append(values.where(series.notna(), None).to_numpy())
+    return columns
+
+
+def _write_sheet(workbook, name, df, header_format):
+    """Write df row by row (constant-memory mode needs rows in order), WRITE_CHUNK_ROWS at a time."""
+    worksheet = workbook.add_worksheet(name)
+    worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+    for start in range(0, len(df), WRITE_CHUNK_ROWS):
+        columns = _excel_values(df.iloc[start:start + WRITE_CHUNK_ROWS])
+        for offset, row in enumerate(zip(*columns)):
+            worksheet.write_row(start + offset + 1, 0, row)
+
+
+def write_sidecar(df, folder, name, fmt):
+    """Write one sheet's rows as <folder>/<name>.csv (UTF-8 with BOM, opens in Excel) or .parquet."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{name}.{fmt}")
+    if fmt == "csv":
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+    elif fmt == "parquet":
+        write_compact_parquet(df, path)
+    else:
+        raise ValueError(f"Unknown sidecar format '{fmt}', expected one of {SIDECAR_FORMATS}")
+    return path
+
+
+def write_workbook(output_path, sheets, sidecar=None, datetime_format=DATETIME_FORMAT):
+    """
+    Write (name, DataFrame) pairs to one .xlsx with xlsxwriter in constant-memory mode.
+
+    Each row is flushed to disk as soon as it is written, so memory stays at one
+    chunk of the current sheet instead of every cell of the workbook. sheets can be
+    a generator (e.g. a groupby), so only one group needs to exist at a time. Sheet
+    names follow make_sheet_name; a frame longer than Excel's row limit continues on
+    '<name>~2', ... sheets.
+
+    Parameters:
+        output_path (str): Workbook path.
+        sheets (iterable): (sheet name or group value, DataFrame) pairs.
+        sidecar (str or list, optional): 'csv' and/or 'parquet'; also writes every sheet
+                                         to <output_path without .xlsx>/<sheet name>.<fmt>.
+        datetime_format (str): Excel number format for date/datetime cells.
+
+    Returns:
+        str: output_path.
+    """
+    import xlsxwriter
+
+    sidecars = [sidecar] if isinstance(sidecar, str) else list(sidecar or [])
+    sidecar_folder = os.path.splitext(output_path)[0]
+    used = set()
+
+    workbook = xlsxwriter.Workbook(output_path, {
+        "constant_memory": True,
+        "default_date_format": datetime_format,
+        "nan_inf_to_errors": True,
+        "strings_to_urls": False,
+    })
+    header_format = workbook.add_format({"bold": True})
+    try:
+        for name, df in sheets:
+            sheet_name = make_sheet_name(name, used)
+            rows_per_sheet = MAX_SHEET_ROWS - 1
+            for start in range(0, max(len(df), 1), rows_per_sheet):
+                part_name = sheet_name if start == 0 else make_sheet_name(sheet_name, used)
+                _write_sheet(workbook, part_name, df.iloc[start:start + rows_per_sheet], header_format)
+            for fmt in sidecars:
+                write_sidecar(df, sidecar_folder, sheet_name, fmt)
+    finally:
+        workbook.close()
+
+    print(f"Saved → {output_path}")
+    return output_path
+
+
+def _write_workbook_job(job):
+    return write_workbook(**job)
+
+
+def write_workbooks(jobs, max_workers=None):
+    """
+    Write independent workbooks in a process pool, one workbook per job.
+
+    Jobs are submitted as workers free up (at most 2 per worker waiting), so a
+    generator of jobs (e.g. one per Hospital Site) never has all its frames
+    pickled at once.
+
+    Parameters:
+        jobs (iterable): Keyword dicts for write_workbook (output_path, sheets, sidecar, ...).
+        max_workers (int, optional): Number of worker processes. None uses os.cpu_count();
+                                     1 writes everything in the current process.
+
+    Returns:
+        list: Written workbook paths, in completion order.
+    """
+    if max_workers == 1:
+        return [_write_workbook_job(job) for job in jobs]
+
+    paths = []
+    max_pending = 2 * (max_workers or os.cpu_count() or 1)
+    # Workers get the parent's parsed configs instead of re-reading them
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=install_snapshot,
+                             initargs=(config_snapshot(),)) as executor:
+        pending = set()
+        for job in jobs:
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                paths.extend(future.result() for future in done)
+            pending.add(executor.submit(_write_workbook_job, job))
+        paths.extend(future.result() for future in wait(pending)[0])
+    return paths
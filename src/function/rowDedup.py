@@ -0,0 +1,179 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from function.configService import get_config
+from function.visitKey import KEY_VERSION, hash_key
+
+# --------------------------------------------------------------------
+# Row deduplication on 64-bit fingerprints of a per-dataset key subset
+# --------------------------------------------------------------------
+
+DEDUP_CONFIG_PATH = "config/dedup.json"
+INDEX_VERSION_KEY = b"dedup_key_version"  # visitKey.KEY_VERSION the fingerprints were hashed with
+
+
+def dedup_columns(dataset, columns, path=DEDUP_CONFIG_PATH):
+    """
+    Key columns of dataset (config/dedup.json "datasets") that are present in columns.
+    Datasets that are not configured, or configured as null, use every column (sorted,
+    so files with the same columns in another order give the same fingerprints).
+    """
+    configured = get_config(path).get("datasets", {}).get(dataset) if dataset else None
+    if configured is None:
+        return sorted(columns)
+    missing = [col for col in configured if col not in columns]
+    if missing:
+        raise KeyError(f"Dedup key columns {missing} of dataset '{dataset}' are missing")
+    return list(configured)
+
+
+def row_fingerprints(df, columns):
+    """
+    int64 fingerprint per row of the given columns (stable across frames and runs, see hash_key).
+    Two different rows share a fingerprint with probability about 2**-64.
+    """
+    return hash_key(df, columns).to_numpy()
+
+
+def first_occurrence(fingerprints):
+    """Boolean mask of the first row of each fingerprint."""
+    return ~pd.Series(fingerprints).duplicated(keep="first").to_numpy()
+
+
+def _isin_sorted(values, sorted_values):
+    position = np.searchsorted(sorted_values, values)
+    found = position < len(sorted_values)
+    found[found] = sorted_values[position[found]] == values[found]
+    return found
+
+
+class RowDeduplicator:
+    """
+    Drop rows already seen in this file, in earlier files or (with index_path) in earlier runs.
+
+    Rows are compared by a 64-bit fingerprint of the dataset's key columns
+    (dedup_columns), so only int64 arrays are compared however wide the rows are.
+    One fingerprint index is kept per set of key columns: files whose columns differ
+    (with the default all-columns keys) are compared only with files that have the
+    same columns, and never wipe each other's fingerprints. Fingerprints are
+    remembered per source (e.g. the file path): dropping a source again first forgets
+    what it contributed before, so re-processing a file is idempotent while its rows
+    that duplicate other sources are still dropped. The index is kept in a Parquet
+    file between runs and discarded when the fingerprint hashing changes.
+
+    Usage:
+        dedup = RowDeduplicator("SpenDrug", index_path="Data/dedup/SpenDrug.parquet")
+        data = dedup.drop(data, source=file_path)
+        print(dedup.summary())
+        dedup.save()
+    """
+
+    def __init__(self, dataset, index_path=None, columns=None, config_path=DEDUP_CONFIG_PATH):
+        self.dataset = dataset
+        self.index_path = index_path
+        self.columns = list(columns) if columns is not None else None
+        self.config_path = config_path
+
+        self._by_source = {}  # key columns -> {source -> int64 fingerprints it added}
+        self._seen = {}  # key columns -> sorted union of its sources' fingerprints
+        self.counts = {}  # source -> (rows, dropped)
+        self._changed = False
+        self._load()
+
+    def _load(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(self.index_path)
+        version = (table.schema.metadata or {}).get(INDEX_VERSION_KEY)
+        if version != str(KEY_VERSION).encode("utf-8") or "Keys" not in table.column_names:
+            print(f"[{self.dataset}] dedup index {self.index_path} was hashed differently; starting a new index")
+            self._changed = True
+            return
+        index = table.to_pandas()
+        for (keys, source), fingerprints in index.groupby(["Keys", "Source"], sort=False, observed=True)["Fingerprint"]:
+            self._by_source.setdefault(tuple(json.loads(keys)), {})[source] = fingerprints.to_numpy()
+        for keys in self._by_source:
+            self._reseen(keys)
+
+    def _reseen(self, keys):
+        sources = self._by_source[keys]
+        self._seen[keys] = np.unique(np.concatenate(list(sources.values()))) if sources \
+            else np.empty(0, dtype=np.int64)
+
+    def key_columns(self, df):
+        if self.columns is not None:
+            return self.columns
+        return dedup_columns(self.dataset, df.columns, self.config_path)
+
+    def forget(self, source):
+        """Remove the fingerprints a source contributed (e.g. a file that was deleted)."""
+        for keys, sources in self._by_source.items():
+            if sources.pop(source, None) is not None:
+                self._reseen(keys)
+                self._changed = True
+
+    def drop(self, df, source):
+        """
+        Rows of df that are not duplicates (first occurrence kept), recording the dropped count.
+
+        Parameters:
+            df (pd.DataFrame): Rows of one source.
+            source (str): Source name, e.g. the file path relative to the data root.
+
+        Returns:
+            pd.DataFrame: The kept rows, in their original order.
+        """
+        keys = tuple(self.key_columns(df))
+        self.forget(source)
+        self._by_source.setdefault(keys, {})
+        seen = self._seen.setdefault(keys, np.empty(0, dtype=np.int64))
+
+        fingerprints = row_fingerprints(df, list(keys))
+        keep = first_occurrence(fingerprints) & ~_isin_sorted(fingerprints, seen)
+
+        added = fingerprints[keep]
+        self._by_source[keys][source] = added
+        self._seen[keys] = np.union1d(seen, added)
+        self._changed = True
+
+        dropped = int(len(df) - keep.sum())
+        self.counts[source] = (len(df), dropped)
+        if dropped:
+            print(f"  [{self.dataset}] dropped {dropped:,} duplicate rows of {len(df):,} from {source}")
+        return df[keep] if dropped else df
+
+    def summary(self):
+        """Rows and dropped duplicates per source processed in this run."""
+        return pd.DataFrame([(source, rows, dropped) for source, (rows, dropped) in self.counts.items()],
+                            columns=["Source", "Rows", "Dropped"])
+
+    def save(self):
+        """Write the fingerprint index (only when index_path is set and it changed)."""
+        if not self.index_path or not self._changed:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        entries = [(json.dumps(list(keys), ensure_ascii=False), source, fingerprints)
+                   for keys, sources in self._by_source.items() for source, fingerprints in sources.items()]
+        lengths = [len(fingerprints) for _, _, fingerprints in entries]
+        positions = np.repeat(np.arange(len(entries)), lengths)
+        index = pd.DataFrame({
+            "Fingerprint": np.concatenate([e[2] for e in entries]) if entries else np.empty(0, np.int64),
+            "Source": pd.Categorical([e[1] for e in entries])[positions] if entries else pd.Categorical([]),
+            "Keys": pd.Categorical([e[0] for e in entries])[positions] if entries else pd.Categorical([]),
+        })
+        table = pa.Table.from_pandas(index, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               INDEX_VERSION_KEY: str(KEY_VERSION).encode("utf-8")})
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        total = sum(len(seen) for seen in self._seen.values())
+        print(f"[{self.dataset}] saved {total:,} fingerprints from {len(entries):,} sources → {self.index_path}")
+        self._changed = False
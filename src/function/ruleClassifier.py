@@ -0,0 +1,105 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from function.compactFrame import is_categorical
+from function.configService import shared_config
+
+# --------------------------------------------------------------------
+# Config-driven row classification (payor / right groups) on distinct values only
+# --------------------------------------------------------------------
+
+FILTER_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "config", "filter.json")
+
+
+def _distinct_codes(series):
+    """(codes, uniques) of a column; categoricals reuse their codes. Missing values get code -1."""
+    if is_categorical(series):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return pd.factorize(series)
+
+
+def _broadcast(hits, codes):
+    # Code -1 (missing value) picks the False appended at the end
+    return np.append(np.asarray(hits, dtype=bool), False)[codes]
+
+
+def compile_prefixes(prefixes):
+    """One anchored regex for all prefixes (longest first, so the alternation never stops short)."""
+    ordered = sorted(set(prefixes), key=len, reverse=True)
+    return re.compile("|".join(re.escape(prefix) for prefix in ordered))
+
+
+class Classification:
+    """
+    A compiled rule from the "classifications" section of config/filter.json.
+
+    Spec forms:
+        {"columns": [site column, code column], "pairs": {site: [code, ...]}}  exact (site, code) pairs
+        {"column": col, "values": [...]}                                      exact values
+        {"column": col, "prefixes": [...]}                                    value starts with a prefix
+
+    Exact matches are kept in hashed sets and prefixes in one compiled regex. A column
+    is classified by testing each distinct value once (for pairs: each distinct site
+    against the distinct codes) and mapping the result back to the rows through their
+    codes; categorical columns skip the factorization entirely.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.description = spec.get("description", "")
+        if "pairs" in spec:
+            self.columns = list(spec["columns"])
+            self.pairs = {(site, code) for site, codes in spec["pairs"].items() for code in codes}
+            self.codes_by_site = {site: set(codes) for site, codes in spec["pairs"].items()}
+        elif "values" in spec:
+            self.columns = [spec["column"]]
+            self.values = set(spec["values"])
+        elif "prefixes" in spec:
+            self.columns = [spec["column"]]
+            self.pattern = compile_prefixes(spec["prefixes"])
+        else:
+            raise ValueError(f"Classification '{name}' needs 'pairs', 'values' or 'prefixes'")
+        self.kind = next(key for key in ("pairs", "values", "prefixes") if key in spec)
+
+    def _test(self, value):
+        if self.kind == "values":
+            return value in self.values
+        return isinstance(value, str) and self.pattern.match(value) is not None
+
+    def matches(self, df):
+        """Boolean numpy array: True for rows in this class (rows with a missing value are not)."""
+        if self.kind == "pairs":
+            # (distinct sites x distinct codes) lookup table, indexed by both columns' codes
+            site_codes, sites = _distinct_codes(df[self.columns[0]])
+            code_codes, codes = _distinct_codes(df[self.columns[1]])
+            table = np.zeros((len(sites) + 1, len(codes) + 1), dtype=bool)  # last row/column: missing values
+            for i, site in enumerate(sites):
+                if site in self.codes_by_site:
+                    table[i, :-1] = pd.Index(codes).isin(self.codes_by_site[site])
+            return table[site_codes, code_codes]
+
+        codes, uniques = _distinct_codes(df[self.columns[0]])
+        return _broadcast([self._test(value) for value in uniques], codes)
+
+
+_compiled = {}  # absolute path -> (config object, compiled classifications)
+
+
+def load_classifications(path=FILTER_CONFIG_PATH):
+    """Compiled classifications of a filter config, recompiled only when the config service re-reads it."""
+    path = os.path.abspath(path)
+    config = shared_config(path)
+    cached = _compiled.get(path)
+    if cached is None or cached[0] is not config:
+        specs = config.get("classifications", {})
+        cached = _compiled[path] = (config, {name: Classification(name, spec) for name, spec in specs.items()})
+    return cached[1]
+
+
+def classify(df, name, path=FILTER_CONFIG_PATH):
+    """Boolean numpy array of the rows of df in classification name (e.g. 'payor_sso', 'staff_right')."""
+    classifications = load_classifications(path)
+    if name not in classifications:
+        raise KeyError(f"Classification '{name}' not found in {path}")
+    return classifications[name].matches(df)
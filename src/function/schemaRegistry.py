@@ -0,0 +1,122 @@
+import os
+import pandas as pd
+from function.configService import shared_config
+
+# --------------------------------------------------------------------
+# Declarative column/dtype schema per data category (config/schema_registry.json)
+# --------------------------------------------------------------------
+
+SCHEMA_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "..", "..", "config", "schema_registry.json")
+
+
+def load_schema_registry(registry_path=SCHEMA_REGISTRY_PATH):
+    """Schema registry (parsed once per process by function.configService); a category may alias another one by name."""
+    return shared_config(os.path.abspath(registry_path))
+
+
+def get_schema(category, registry_path=SCHEMA_REGISTRY_PATH):
+    """
+    Return the {column: dtype} schema of a category (e.g. 'INV_VALUE'), or None if
+    the category is not registered.
+    """
+    registry = load_schema_registry(registry_path)
+    schema = registry.get(category)
+    while isinstance(schema, str):  # "POSMIS": "ORCMII"
+        schema = registry.get(schema)
+    return dict(schema) if schema else None
+
+
+def _cast_series(series, dtype):
+    if dtype == "string":
+        return series.astype("string")
+    if dtype == "datetime":
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        return pd.to_datetime(series, dayfirst=True, errors="coerce")
+    if dtype in ("Int64", "float64"):
+        return pd.to_numeric(series, errors="coerce").astype(dtype)
+    return series.astype(dtype)
+
+
+def apply_schema(df, schema, source=None):
+    """
+    Project and cast df to a schema in one pass.
+
+    Missing columns are created as all-null columns of the right dtype, extra columns
+    are dropped, and the result follows the schema's column order. Values that cannot
+    be cast become null and are counted instead of failing the whole file.
+
+    Parameters:
+        df (pd.DataFrame): Frame as read from the file.
+        schema (dict): {column: dtype}, dtype one of 'string', 'Int64', 'float64',
+                       'datetime' or any pandas dtype name.
+        source (str, optional): File name used in the printed report.
+
+    Returns:
+        tuple: (typed DataFrame, report dict with 'missing' columns and
+                'cast_failures' {column: number of values turned null}).
+    """
+    columns = {}
+    missing = []
+    cast_failures = {}
+
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            missing.append(col)
+            columns[col] = _cast_series(pd.Series([None] * len(df), index=df.index, dtype="object"), dtype)
+            continue
+
+        original = df[col]
+        try:
+            typed = _cast_series(original, dtype)
+        except (TypeError, ValueError) as e:
+            print(f"Warning: could not cast column '{col}' to {dtype} in {source}: {e}")
+            columns[col] = original
+            cast_failures[col] = int(original.notna().sum())
+            continue
+
+        failed = int((original.notna() & typed.isna()).sum())
+        if failed:
+            cast_failures[col] = failed
+        columns[col] = typed
+
+    typed_df = pd.DataFrame(columns, index=df.index)
+
+    if source is not None:
+        if missing:
+            print(f"  {source}: missing columns filled with nulls: {missing}")
+        if cast_failures:
+            details = ", ".join(f"{col}={count:,}" for col, count in cast_failures.items())
+            print(f"  {source}: values that failed to cast (set to null): {details}")
+
+    return typed_df, {"missing": missing, "cast_failures": cast_failures}
+
+
+def read_with_schema(file_path, schema, columns=None):
+    """
+    Read one converted file, parsing only the schema's columns, and cast it to the schema.
+
+    Parquet files use column projection; Excel files use a usecols filter so columns
+    outside the schema are never parsed.
+
+    Parameters:
+        file_path (str): Converted .parquet or .xlsx file.
+        schema (dict): {column: dtype} as returned by get_schema.
+        columns (list, optional): Subset (and order) of schema columns to keep.
+
+    Returns:
+        tuple: (DataFrame, report dict), see apply_schema.
+    """
+    if columns is not None:
+        schema = {col: schema.get(col, "string") for col in columns}
+    wanted = set(schema)
+
+    if file_path.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        available = pq.read_schema(file_path).names
+        df = pd.read_parquet(file_path, columns=[c for c in available if c in wanted])
+    else:
+        df = pd.read_excel(file_path, usecols=lambda c: c in wanted)
+
+    return apply_schema(df, schema, source=os.path.basename(file_path))
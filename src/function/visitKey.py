@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+from function.compactFrame import decode
+
+# --------------------------------------------------------------------
+# Integer identity keys for visits/patients (instead of per-row string concatenation)
+# --------------------------------------------------------------------
+
+PATIENT_KEY_COLUMNS = ["Hospital Site", "HN"]
+OPD_VISIT_KEY_COLUMNS = ["Hospital Site", "HN", "VN", "VisitDate"]
+KEY_VERSION = 2  # Bumped when hash_key values change; stored hashes of another version are rebuilt
+
+
+def factorize_key(df, columns):
+    """
+    Dense int64 group number (0..n-1) per distinct combination of columns, for
+    groupbys and duplicate checks inside one frame. Missing values form their own group.
+    """
+    return df.groupby(columns, sort=False, dropna=False, observed=True).ngroup().astype("int64")
+
+
+def group_any(key, mask):
+    """
+    Per-row 0/1 flag: 1 if mask is True on any row sharing the row's key.
+
+    A segmented reduce over dense integer keys (as from factorize_key) with one
+    bincount, instead of a Python function per group.
+    """
+    codes = np.asarray(key)
+    hits = np.bincount(codes, weights=np.asarray(mask, dtype=bool), minlength=codes.max() + 1 if len(codes) else 0)
+    return (hits[codes] > 0).astype("int64")
+
+
+def _value_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _key_text(uniques):
+    """Canonical text of distinct key values: 123, 123.0, '123' and np.int64(123) all give '123'."""
+    values = pd.Series(uniques)
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        return values.astype(str).to_numpy(dtype=object)
+    if pd.api.types.is_float_dtype(values):
+        integral = (values == np.floor(values)) & (values.abs() < 2**53)
+        text = values.astype(str)
+        text[integral] = values[integral].astype("int64").astype(str)
+        return text.to_numpy(dtype=object)
+    return values.map(_value_text).to_numpy(dtype=object)
+
+
+def canonical_key_column(series):
+    """
+    A key column in the form hash_key hashes: text categories for every dtype (so an
+    HN read as int, float or text gives the same key), datetime64 columns unchanged.
+    Each distinct value is converted once.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    codes, uniques = pd.factorize(series)
+    text_codes, categories = pd.factorize(_key_text(np.asarray(uniques, dtype=object)))
+    codes = np.where(codes >= 0, text_codes[np.maximum(codes, 0)], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=series.index, name=series.name)
+
+
+def hash_key(df, columns):
+    """
+    Stable 64-bit key per combination of columns, equal across frames and runs
+    (use it for keys that are merged between datasets, e.g. SpenDrug and HN).
+    Key columns are compared as text (canonical_key_column), so the dtype a column
+    was read with does not change the key; date columns should be datetime64.
+    """
+    canonical = pd.DataFrame({col: canonical_key_column(df[col]) for col in columns}, index=df.index)
+    hashed = pd.util.hash_pandas_object(canonical, index=False)
+    return pd.Series(hashed.to_numpy().view("int64"), index=df.index)
+
+
+def readable_key(df, columns):
+    """Build the human-readable concatenated key (e.g. 'PLS12345') on demand, for export."""
+    key = None
+    for col in columns:
+        part = decode(df[col])
+        if pd.api.types.is_datetime64_any_dtype(part):
+            part = part.dt.strftime("%Y-%m-%d")
+        part = part.astype(str)
+        key = part if key is None else key + part
+    return key
+
+
+def add_readable_keys(df):
+    """Replace the integer Patient / OPD Visit keys with their readable text form before export."""
+    df = df.copy()
+    if "Patient" in df.columns and pd.api.types.is_integer_dtype(df["Patient"]):
+        df["Patient"] = readable_key(df, PATIENT_KEY_COLUMNS)
+    if "OPD Visit" in df.columns and pd.api.types.is_integer_dtype(df["OPD Visit"]):
+        df["OPD Visit"] = readable_key(df, OPD_VISIT_KEY_COLUMNS)
+    return df
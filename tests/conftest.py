@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts import the package as "function" from src/ (sys.path.append('../') in src/*/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
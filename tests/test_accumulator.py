@@ -0,0 +1,19 @@
+import pandas as pd
+from function.accumulator import FrameAccumulator
+
+
+def collect(frames, spill_dir=None):
+    acc = FrameAccumulator("test", spill_dir=spill_dir)
+    for frame in frames:
+        acc.add(frame)
+    return acc.result()
+
+
+def test_spill_mode_matches_memory_mode_with_mismatched_parts(tmp_path):
+    frames = [pd.DataFrame({"a": [1, 2]}), pd.DataFrame(), None,
+              pd.DataFrame({"a": ["x"], "b": [1.5]}), pd.DataFrame({"a": [3], "b": [2.5]})]
+    in_memory = collect(frames)
+    spilled = collect(frames, spill_dir=str(tmp_path / "spill"))
+
+    assert list(spilled.columns) == ["a", "b"] and len(spilled) == 4
+    pd.testing.assert_frame_equal(spilled, in_memory)
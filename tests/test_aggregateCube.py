@@ -0,0 +1,82 @@
+import os
+import pandas as pd
+from function.aggregateCube import add_month_column, query_cube, refresh_cube, update_cube
+from function.datasetStore import PARTITION_COLUMNS, write_partitions
+
+
+def transactions(month, hns, bu="PLC"):
+    return pd.DataFrame({"Hospital Site": "PT1", "HN": hns, "Item Description": "Paracetamol",
+                         "Revenue": [10.0] * len(hns),
+                         "Year": "2024", "BU": bu, "DataCategory": "DRUG", "Month": month})
+
+
+def refresh(source, cube):
+    return refresh_cube(source, cube, dimensions=["Item Description"], measures=["Revenue"])
+
+
+def test_refresh_cube_reads_only_changed_partitions(tmp_path):
+    data, cube = str(tmp_path / "data"), str(tmp_path / "cube")
+    write_partitions(pd.concat([transactions("01", ["1", "2"]), transactions("02", ["2"])]), data)
+    assert refresh(data, cube) == 2
+    assert refresh(data, cube) == 0
+
+    write_partitions(transactions("02", ["3", "4", "4"]), data)
+    assert refresh(data, cube) == 1
+
+    totals = query_cube(cube, ["Month"], measures=["Revenue"], partition_cols=PARTITION_COLUMNS).set_index("Month")
+    assert totals.loc["01", "Transactions"] == 2 and totals.loc["02", "Transactions"] == 3
+    assert totals.loc["02", "Revenue"] == 30.0 and totals.loc["02", "Patients"] == 2
+
+    whole = query_cube(cube, ["Item Description"], measures=[], partition_cols=PARTITION_COLUMNS)
+    assert whole["Patients"].tolist() == [4]
+
+
+def test_refresh_cube_leaves_a_single_file_untouched(tmp_path):
+    source, cube = str(tmp_path / "combined_all.parquet"), str(tmp_path / "cube")
+    transactions("01", ["1", "2"]).drop(columns=["Year", "DataCategory"]).to_parquet(source)
+    mtime = os.path.getmtime(source)
+
+    assert refresh(source, cube) == 1
+    assert refresh(source, cube) == 0
+    assert os.path.isfile(source) and os.path.getmtime(source) == mtime
+    assert not os.path.exists(source + ".legacy")
+
+    totals = query_cube(cube, ["BU"], measures=[], partition_cols=PARTITION_COLUMNS)
+    assert totals.set_index("BU").loc["PLC", "Transactions"] == 2
+
+
+def test_refresh_cube_rebuilds_when_the_key_version_differs(tmp_path):
+    data, cube = str(tmp_path / "data"), str(tmp_path / "cube")
+    write_partitions(transactions("01", ["1"]), data)
+    refresh(data, cube)
+
+    manifest_path = os.path.join(cube, "_manifest.json")
+    with open(manifest_path) as f:
+        text = f.read()
+    with open(manifest_path, "w") as f:
+        f.write(text.replace('"_key_version": ', '"_key_version": -'))
+    assert refresh(data, cube) == 1
+
+
+def test_stored_cubes_sketch_patients_unless_exact_is_asked_for(tmp_path):
+    import pyarrow.parquet as pq
+
+    df = transactions("01", [str(hn) for hn in range(50)] * 2)
+    update_cube(df, str(tmp_path / "sketched"), dimensions=["Item Description"], measures=["Revenue"],
+                partition_cols=PARTITION_COLUMNS)
+    update_cube(df, str(tmp_path / "exact"), dimensions=["Item Description"], measures=["Revenue"],
+                partition_cols=PARTITION_COLUMNS, distinct_error=None)
+
+    for name, rows, column in (("sketched", 1, "Sketch"), ("exact", 50, "Patient")):
+        table = pq.ParquetDataset(str(tmp_path / name)).read()
+        assert table.num_rows == rows and column in table.column_names
+        totals = query_cube(str(tmp_path / name), ["Item Description"], measures=["Revenue"],
+                            partition_cols=PARTITION_COLUMNS)
+        assert totals["Transactions"].tolist() == [100] and totals["Revenue"].tolist() == [1000.0]
+        assert abs(totals["Patients"][0] - 50) <= 1
+
+
+def test_add_month_column_accepts_serials_and_text():
+    df = pd.DataFrame({"VisitDate": [45306, "2024-02-03", "15/03/2024", None]})
+    assert add_month_column(df)["Month"].tolist()[:3] == ["2024-01", "2024-02", "2024-03"]
+    assert pd.isna(df["Month"][3])
@@ -0,0 +1,20 @@
+import json
+from function.config import load_config
+from function.configService import get_config, shared_config
+
+
+def test_get_config_returns_a_copy_of_the_cached_config(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"excluded": ["A"]}))
+
+    first = get_config(str(path))
+    first["excluded"].append("B")
+    assert get_config(str(path)) == {"excluded": ["A"]}
+    assert shared_config(str(path)) is shared_config(str(path))
+
+
+def test_load_config_resolves_relative_paths_from_the_working_directory(tmp_path, monkeypatch):
+    (tmp_path / "config.json").write_text(json.dumps({"where": "cwd"}))
+    monkeypatch.chdir(tmp_path)
+    assert load_config("config.json") == {"where": "cwd"}
+    assert load_config("missing.json") is None
@@ -0,0 +1,68 @@
+import os
+import pandas as pd
+import pytest
+from function.datasetStore import migrate_single_file, read_partitions, write_partitions
+
+
+def inventory(month, items, year="2024", bu="PLC"):
+    return pd.DataFrame({"Item": items, "Quantity": [1.0] * len(items),
+                         "Year": year, "BU": bu, "DataCategory": "INV_VALUE", "Month": month})
+
+
+def test_write_partitions_replaces_only_its_partitions(tmp_path):
+    root = str(tmp_path / "combined.parquet")
+    write_partitions(pd.concat([inventory("04", ["A", "B"]), inventory("05", ["C"])]), root)
+    write_partitions(inventory("04", ["D"]), root)
+
+    result = read_partitions(root).sort_values("Item")
+    assert result["Item"].tolist() == ["C", "D"]
+    assert sorted(result["Month"].unique()) == ["04", "05"]
+
+
+def test_migrated_rows_are_replaced_by_the_next_run(tmp_path):
+    root = str(tmp_path / "combined.parquet")
+    legacy = inventory("04", ["A", "B"]).drop(columns=["Year", "BU", "DataCategory"])
+    legacy.to_parquet(root)
+
+    migrate_single_file(root, values={"Year": "2024", "BU": "PLC", "DataCategory": "INV_VALUE"})
+    assert os.path.isdir(root)
+    write_partitions(inventory("04", ["A", "B"]), root)
+
+    result = read_partitions(root)
+    assert sorted(result["Item"]) == ["A", "B"]
+    assert not any("Unknown" in dirs for dirs, _, _ in os.walk(root))
+
+
+def test_migration_refuses_without_partition_values(tmp_path):
+    root = str(tmp_path / "combined.parquet")
+    inventory("04", ["A"]).drop(columns=["Year"]).to_parquet(root)
+
+    with pytest.raises(ValueError):
+        migrate_single_file(root)
+    assert os.path.isfile(root)
+    assert len(pd.read_parquet(root)) == 1
+
+
+def test_two_year_legacy_file_is_split_by_its_dates(tmp_path):
+    root = str(tmp_path / "combined.parquet")
+    legacy = pd.concat([inventory("04", ["A"], year="2023"), inventory("04", ["B"], year="2024")],
+                       ignore_index=True).drop(columns=["Year", "DataCategory"])
+    legacy["Transaction Date"] = pd.to_datetime(["2023-04-10", "2024-04-10"])
+    legacy.to_parquet(root)
+
+    migrate_single_file(root, values={"DataCategory": "INV_VALUE"}, date_column="Transaction Date")
+    write_partitions(inventory("04", ["C"], year="2024"), root)
+
+    result = read_partitions(root).sort_values("Item")
+    assert result[["Item", "Year"]].values.tolist() == [["A", "2023"], ["C", "2024"]]
+
+
+def test_two_year_legacy_file_without_dates_is_not_stamped_with_the_run_year(tmp_path):
+    root = str(tmp_path / "combined.parquet")
+    legacy = pd.concat([inventory("04", ["A"], year="2023"), inventory("04", ["B"], year="2024")],
+                       ignore_index=True).drop(columns=["Year", "DataCategory"])
+    legacy.to_parquet(root)
+
+    with pytest.raises(ValueError):
+        migrate_single_file(root, values={"DataCategory": "INV_VALUE"})
+    assert len(pd.read_parquet(root)) == 2
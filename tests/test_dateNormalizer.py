@@ -0,0 +1,17 @@
+import pandas as pd
+from function.dateNormalizer import normalize_dates
+
+
+def test_all_missing_columns_become_nat():
+    for series in (pd.Series([None, None]), pd.Series(pd.array([None], dtype="string")),
+                   pd.Series(pd.Categorical([None, None])), pd.Series([], dtype=object)):
+        result = normalize_dates(series)
+        assert result.dtype == "datetime64[ns]" and len(result) == len(series) and result.isna().all()
+
+
+def test_mixed_column_converts_each_kind():
+    series = pd.Series([45000, "2024-01-02", "15/03/2024", "20-มี.ค.-24", None, "not a date"])
+    result = normalize_dates(series)
+    assert result.tolist()[:4] == [pd.Timestamp("2023-03-15"), pd.Timestamp("2024-01-02"),
+                                   pd.Timestamp("2024-03-15"), pd.Timestamp("2024-03-20")]
+    assert result[4:].isna().all()
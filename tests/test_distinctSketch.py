@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from function.distinctSketch import (build_sketches, distinct_count, estimate_sketches, load_sketches,
+                                     merge_sketches, save_sketches)
+
+
+def visits(rows=60_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"Month": rng.choice(["01", "02", "03"], rows),
+                         "Hospital Site": rng.choice(["PT1", "PT2"], rows),
+                         "HN": rng.integers(0, 20_000, rows).astype(str)})
+
+
+def test_merged_sketches_estimate_the_union(tmp_path):
+    df = visits()
+    monthly = build_sketches(df, ["Month", "Hospital Site"], ["Hospital Site", "HN"], error=0.01)
+    path = str(tmp_path / "sketches.parquet")
+    save_sketches(monthly, path)
+
+    merged = merge_sketches(load_sketches(path), ["Hospital Site"]).set_index("Hospital Site")
+    estimates = pd.Series(estimate_sketches(merged.reset_index()), index=merged.index)
+    exact = df.groupby("Hospital Site")["HN"].nunique()
+    assert (abs(estimates - exact) / exact).max() < 0.05
+
+    total = estimate_sketches(merge_sketches(monthly))[0]
+    assert abs(total - len(df[["Hospital Site", "HN"]].drop_duplicates())) / total < 0.05
+
+
+def test_distinct_count_is_exact_without_error():
+    df = visits(rows=1_000)
+    expected = df.groupby("Month")["HN"].nunique()
+    pd.testing.assert_series_equal(distinct_count(df, ["Month"], ["HN"]), expected)
+
+
+def test_distinct_count_without_groups_is_a_number():
+    df = visits(rows=5_000)
+    exact = df["HN"].nunique()
+    assert distinct_count(df, [], ["HN"]) == exact
+    assert distinct_count(df, [], ["Hospital Site", "HN"]) == len(df[["Hospital Site", "HN"]].drop_duplicates())
+    assert abs(distinct_count(df, [], ["HN"], error=0.02) - exact) / exact < 0.1
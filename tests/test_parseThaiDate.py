@@ -0,0 +1,18 @@
+import pandas as pd
+from function.parseThaiDate import parse_thai_date, parse_thai_dates
+
+
+def test_parse_thai_dates_matches_the_scalar_parser():
+    series = pd.Series(["20-มี.ค.-24", "1-ม.ค.-2567", "20-มี.ค.-24", "31-ก.พ.-24", "x", None])
+    expected = [parse_thai_date(v) if isinstance(v, str) else pd.NaT for v in series]
+    assert parse_thai_dates(series).tolist()[:3] == expected[:3]
+    assert parse_thai_dates(series)[3:].isna().all()
+
+
+def test_non_string_values_become_nat():
+    for series in (pd.Series([45000, 45001], dtype=object), pd.Series([1.5, None, "20-มี.ค.-24"]),
+                   pd.Series([None, None]), pd.Series([], dtype=object)):
+        result = parse_thai_dates(series)
+        assert result.dtype == "datetime64[ns]" and len(result) == len(series)
+    assert parse_thai_dates(pd.Series([1.5, None, "20-มี.ค.-24"])).tolist()[2] == pd.Timestamp("2024-03-20")
+    assert parse_thai_dates(pd.Series([45000, 45001], dtype=object)).isna().all()
@@ -0,0 +1,44 @@
+import pandas as pd
+from function.rowDedup import RowDeduplicator
+
+
+def drop_counts(dedup, frames):
+    return [len(frame) - len(dedup.drop(frame, source=name)) for name, frame in frames]
+
+
+def test_files_with_other_columns_do_not_reset_the_index():
+    a = pd.DataFrame({"x": [1, 2, 3], "y": ["a", "b", "c"]})
+    b = pd.DataFrame({"x": [1, 2], "y": ["a", "b"], "w": [0.5, 0.5]})
+    c = a.copy()
+
+    dedup = RowDeduplicator(None)
+    assert drop_counts(dedup, [("A", a), ("B", b), ("C", c)]) == [0, 0, 3]
+
+
+def test_index_persists_between_runs(tmp_path):
+    index_path = str(tmp_path / "dedup" / "index.parquet")
+    a = pd.DataFrame({"x": [1, 2, 2], "y": ["a", "b", "b"]})
+    b = pd.DataFrame({"x": [1, 2], "y": ["a", "b"], "w": [0.5, 0.5]})
+
+    first = RowDeduplicator(None, index_path=index_path)
+    assert drop_counts(first, [("A", a), ("B", b)]) == [1, 0]
+    first.save()
+
+    # x read as float in the next run: still the same rows
+    second = RowDeduplicator(None, index_path=index_path)
+    assert drop_counts(second, [("C", a.astype({"x": float})), ("D", b)]) == [3, 2]
+
+
+def test_reprocessing_a_source_is_idempotent(tmp_path):
+    index_path = str(tmp_path / "index.parquet")
+    a = pd.DataFrame({"x": [1, 2], "y": ["a", "b"]})
+    b = pd.DataFrame({"x": [2, 3], "y": ["b", "c"]})
+
+    first = RowDeduplicator(None, index_path=index_path)
+    assert drop_counts(first, [("A", a), ("B", b)]) == [0, 1]
+    first.save()
+
+    second = RowDeduplicator(None, index_path=index_path)
+    assert drop_counts(second, [("A", a), ("B", b), ("B", b)]) == [0, 1, 1]
+    second.forget("A")
+    assert drop_counts(second, [("B", b)]) == [0]
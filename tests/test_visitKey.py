@@ -0,0 +1,18 @@
+import pandas as pd
+from function.visitKey import PATIENT_KEY_COLUMNS, factorize_key, hash_key
+
+
+def test_hash_key_ignores_the_dtype_a_key_was_read_with():
+    expected = hash_key(pd.DataFrame({"Hospital Site": ["PT1", "PT2", None], "HN": ["1", "2", "3"]}),
+                        PATIENT_KEY_COLUMNS)
+    for hn in ([1, 2, 3], [1.0, 2.0, 3.0], pd.array([1, 2, 3], dtype="Int64")):
+        frame = pd.DataFrame({"Hospital Site": pd.Categorical(["PT1", "PT2", None]), "HN": hn})
+        assert hash_key(frame, PATIENT_KEY_COLUMNS).tolist() == expected.tolist()
+
+
+def test_hash_key_separates_different_keys():
+    df = pd.DataFrame({"Hospital Site": ["PT1", "PT1", "PT2", "PT1"], "HN": ["1", "2", "1", "1"]})
+    keys = hash_key(df, PATIENT_KEY_COLUMNS)
+    assert keys.nunique() == 3
+    assert keys[0] == keys[3]
+    assert factorize_key(df, PATIENT_KEY_COLUMNS).tolist() == [0, 1, 2, 0]